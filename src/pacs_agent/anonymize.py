@@ -3,14 +3,28 @@
 Only tags in KEEP_TAGS survive. PHI tags are explicitly deleted,
 private tags are removed, and unknown tags are deleted. Patient
 identity fields are replaced with the case ID.
+
+``anonymize_stream`` applies the same rules to the encoded file
+without decoding it: kept elements (including PixelData) are copied
+through as slices of a memory-mapped source file.
 """
 
 from __future__ import annotations
 
+import mmap
+import struct
+from io import BytesIO
 from pathlib import Path
 
 from pydicom import dcmread
+from pydicom.datadict import dictionary_has_tag
+from pydicom.dataelem import RawDataElement, convert_raw_data_element
 from pydicom.dataset import Dataset
+from pydicom.filebase import DicomBytesIO
+from pydicom.filereader import read_file_meta_info
+from pydicom.filewriter import write_data_element, write_file_meta_info
+from pydicom.tag import Tag
+from pydicom.uid import UID
 
 from .tags import KEEP_TAGS, PHI_TAGS, is_private_tag
 
@@ -75,3 +89,238 @@ def anonymize_file(
     anonymize_dataset(ds, case_id)
     dst.parent.mkdir(parents=True, exist_ok=True)
     ds.save_as(dst)
+
+
+def anonymize_bytes(data: bytes, dst: Path, case_id: str) -> None:
+    """Decode an encoded DICOM file, anonymize it, and save to dst.
+
+    Module-level and free of shared state so it can run in a worker
+    process.
+
+    Args:
+        data: Encoded dataset in DICOM File Format (preamble + file meta).
+        dst: Destination path for anonymized file.
+        case_id: Case identifier for patient fields.
+    """
+    ds = dcmread(BytesIO(data))
+    anonymize_dataset(ds, case_id)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    ds.save_as(dst, enforce_file_format=True)
+
+
+# ── Streaming (byte-level) anonymization ─────────────────────────
+
+_ITEM = 0xFFFEE000
+_ITEM_END = 0xFFFEE00D
+_SEQUENCE_END = 0xFFFEE0DD
+_UNDEFINED_LENGTH = 0xFFFFFFFF
+
+# Explicit VRs with a 2-byte reserved field and a 4-byte length
+_LONG_VRS = {
+    b"OB", b"OD", b"OF", b"OL", b"OV", b"OW", b"SQ",
+    b"SV", b"UC", b"UN", b"UR", b"UT", b"UV",
+}
+
+
+def anonymize_stream(src: Path, dst: Path, case_id: str) -> None:
+    """Anonymize a DICOM file without decoding element values.
+
+    Walks the encoded top-level elements of src and applies the same
+    rules as anonymize_dataset(): only non-private, non-PHI tags in
+    KEEP_TAGS survive, and the patient identity fields are replaced.
+    Kept elements — PixelData included — are written to dst as slices
+    of the memory-mapped source, so pixel data is never materialized.
+    For conformant files the output is byte-identical to
+    anonymize_file().
+
+    Files this walker cannot handle (no preamble, deflated or unknown
+    transfer syntax, truncated elements) are passed to anonymize_file()
+    instead.
+
+    Args:
+        src: Source DICOM file path.
+        dst: Destination path for anonymized file.
+        case_id: Case identifier for patient fields.
+    """
+    with open(src, "rb") as f, mmap.mmap(
+        f.fileno(), 0, access=mmap.ACCESS_READ,
+    ) as mm:
+        buf = memoryview(mm)
+        try:
+            encoding = _stream_encoding(src, buf)
+            if encoding is None:
+                anonymize_file(src, dst, case_id)
+                return
+            file_meta, body, implicit, endian = encoding
+            try:
+                _write_stream(
+                    buf, body, file_meta, implicit, endian, dst, case_id,
+                )
+            except (ValueError, struct.error):
+                # Truncated or malformed stream: pydicom is more lenient
+                anonymize_file(src, dst, case_id)
+        finally:
+            buf.release()
+
+
+def _stream_encoding(src: Path, buf: memoryview):
+    """Return (file_meta, body offset, implicit VR, struct endian) or None."""
+    if len(buf) < 132 or bytes(buf[128:132]) != b"DICM":
+        return None
+
+    # File meta is always explicit VR little endian
+    pos = 132
+    while pos + 8 <= len(buf):
+        group = struct.unpack_from("<H", buf, pos)[0]
+        if group != 0x0002:
+            break
+        _, pos = _element_end(buf, pos, False, "<")
+
+    file_meta = read_file_meta_info(src)
+    tsyntax = file_meta.get("TransferSyntaxUID")
+    if tsyntax is None:
+        return None
+    tsyntax = UID(tsyntax)
+    if not tsyntax.is_transfer_syntax or tsyntax.is_deflated:
+        return None
+
+    endian = "<" if tsyntax.is_little_endian else ">"
+    return file_meta, pos, tsyntax.is_implicit_VR, endian
+
+
+def _write_stream(
+    buf: memoryview,
+    pos: int,
+    file_meta,
+    implicit: bool,
+    endian: str,
+    dst: Path,
+    case_id: str,
+) -> None:
+    # Identity elements, encoded exactly as anonymize_dataset() sets them
+    identity = anonymize_dataset(Dataset(), case_id)
+    inserts: list[tuple[int, bytes]] = []
+    for elem in identity:
+        fp = DicomBytesIO()
+        fp.is_implicit_VR = implicit
+        fp.is_little_endian = endian == "<"
+        write_data_element(fp, elem)
+        inserts.append((int(elem.tag), fp.getvalue()))
+    replaced = {tag for tag, _ in inserts}
+
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    with open(dst, "wb") as out:
+        out.write(buf[:128])
+        out.write(b"DICM")
+        write_file_meta_info(out, file_meta, enforce_standard=False)
+
+        # Copy runs of consecutive kept elements in one write
+        run_start = run_end = pos
+        while pos < len(buf):
+            tag, end = _element_end(buf, pos, implicit, endian)
+            while inserts and inserts[0][0] <= tag:
+                out.write(buf[run_start:run_end])
+                out.write(inserts.pop(0)[1])
+                run_start = run_end = pos
+            if _stream_keep(tag) and tag not in replaced:
+                reencoded = _reencode_un(buf, pos, end, implicit, endian)
+                if reencoded is not None:
+                    out.write(buf[run_start:run_end])
+                    out.write(reencoded)
+                    run_start = run_end = end
+                elif run_end != pos:
+                    out.write(buf[run_start:run_end])
+                    run_start = pos
+                    run_end = end
+                else:
+                    run_end = end
+            pos = end
+        out.write(buf[run_start:run_end])
+        for _, data in inserts:
+            out.write(data)
+
+
+def _reencode_un(
+    buf: memoryview, pos: int, end: int, implicit: bool, endian: str,
+) -> bytes | None:
+    """Re-encode an explicit VR UN element of a known tag with its real VR.
+
+    pydicom replaces UN with the dictionary VR on read, so the element
+    must be re-encoded to match anonymize_file() output.
+    """
+    if implicit:
+        return None
+    tag, vr, length, value_pos = _element_header(buf, pos, implicit, endian)
+    if vr != b"UN" or length == _UNDEFINED_LENGTH:
+        return None
+    if not dictionary_has_tag(tag):
+        return None
+    little = endian == "<"
+    raw = RawDataElement(
+        Tag(tag), "UN", length, bytes(buf[value_pos:end]), value_pos,
+        False, little,
+    )
+    fp = DicomBytesIO()
+    fp.is_implicit_VR = False
+    fp.is_little_endian = little
+    write_data_element(fp, convert_raw_data_element(raw))
+    return fp.getvalue()
+
+
+def _stream_keep(tag: int) -> bool:
+    """Same decision as anonymize_dataset(), on a raw tag number."""
+    group = tag >> 16
+    if group % 2 != 0:
+        return False
+    return tag not in PHI_TAGS and tag in KEEP_TAGS
+
+
+def _element_header(
+    buf: memoryview, pos: int, implicit: bool, endian: str,
+) -> tuple[int, bytes | None, int, int]:
+    """Parse an element header: (tag, VR, length, value offset)."""
+    group, elem = struct.unpack_from(endian + "HH", buf, pos)
+    tag = group << 16 | elem
+    # Items and delimiters carry no VR, even in explicit VR encodings
+    if implicit or group == 0xFFFE:
+        length = struct.unpack_from(endian + "L", buf, pos + 4)[0]
+        return tag, None, length, pos + 8
+    vr = bytes(buf[pos + 4:pos + 6])
+    if vr in _LONG_VRS:
+        length = struct.unpack_from(endian + "L", buf, pos + 8)[0]
+        return tag, vr, length, pos + 12
+    length = struct.unpack_from(endian + "H", buf, pos + 6)[0]
+    return tag, vr, length, pos + 8
+
+
+def _element_end(
+    buf: memoryview, pos: int, implicit: bool, endian: str,
+) -> tuple[int, int]:
+    """Return (tag, offset just past the element) for the element at pos."""
+    tag, vr, length, value_pos = _element_header(buf, pos, implicit, endian)
+    if length != _UNDEFINED_LENGTH:
+        end = value_pos + length
+        if end > len(buf):
+            raise ValueError(f"truncated element {tag:08X}")
+        return tag, end
+    # Sequence or encapsulated pixel data; UN wraps implicit VR content
+    return tag, _skip_items(buf, value_pos, implicit or vr == b"UN", endian)
+
+
+def _skip_items(buf: memoryview, pos: int, implicit: bool, endian: str) -> int:
+    """Skip items of an undefined-length value, past the sequence delimiter."""
+    while True:
+        tag, _, length, pos = _element_header(buf, pos, implicit, endian)
+        if tag == _SEQUENCE_END:
+            return pos
+        if tag != _ITEM:
+            raise ValueError(f"unexpected tag {tag:08X} in sequence")
+        if length != _UNDEFINED_LENGTH:
+            pos += length
+            continue
+        # Undefined-length item: walk its elements up to the item delimiter
+        while True:
+            tag, end = _element_end(buf, pos, implicit, endian)
+            pos = end
+            if tag == _ITEM_END:
+                break
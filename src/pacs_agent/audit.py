@@ -7,6 +7,18 @@ import sqlite3
 from datetime import datetime, timezone
 from pathlib import Path
 
+# Per-stage timings of a retrieval (LoadResult.timings), one column each
+_TIMING_COLUMNS = {
+    "find_s": "REAL",
+    "associate_s": "REAL",
+    "first_byte_s": "REAL",
+    "move_s": "REAL",
+    "drain_s": "REAL",
+    "anonymize_s": "REAL",
+    "write_s": "REAL",
+    "bytes_received": "INTEGER",
+}
+
 
 def get_db(base_dir: Path) -> sqlite3.Connection:
     """Open (and create if needed) the audit database."""
@@ -25,12 +37,22 @@ def get_db(base_dir: Path) -> sqlite3.Connection:
         image_count INTEGER,
         series_count INTEGER,
         duration_s REAL,
-        error TEXT
+        error TEXT,
+        bytes INTEGER
     )""")
+    _add_missing_columns(conn, {"bytes": "INTEGER", **_TIMING_COLUMNS})
     conn.commit()
     return conn
 
 
+def _add_missing_columns(conn: sqlite3.Connection, columns: dict[str, str]) -> None:
+    """Add columns introduced after an audit.db was created."""
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(audit)")}
+    for name, sql_type in columns.items():
+        if name not in existing:
+            conn.execute(f"ALTER TABLE audit ADD COLUMN {name} {sql_type}")
+
+
 def log_results(
     base_dir: Path, project: str, results: list, dry_run: bool = False,
 ) -> None:
@@ -38,12 +60,15 @@ def log_results(
     conn = get_db(base_dir)
     operator = getpass.getuser()
     timestamp = datetime.now(timezone.utc).isoformat()
+    columns = ",".join(_TIMING_COLUMNS)
+    marks = ",".join("?" * len(_TIMING_COLUMNS))
     for r in results:
+        timings = getattr(r, "timings", None)
         conn.execute(
             "INSERT INTO audit"
             " (timestamp,operator,project,accession,case_id,status,"
-            "modality,image_count,series_count,duration_s,error)"
-            " VALUES (?,?,?,?,?,?,?,?,?,?,?)",
+            f"modality,image_count,series_count,duration_s,error,bytes,{columns})"
+            f" VALUES (?,?,?,?,?,?,?,?,?,?,?,?,{marks})",
             (
                 timestamp,
                 operator,
@@ -56,6 +81,11 @@ def log_results(
                 r.series_count,
                 r.duration_s,
                 r.error,
+                getattr(r, "bytes_written", None) or None,
+                *(
+                    getattr(timings, name, None)
+                    for name in _TIMING_COLUMNS
+                ),
             ),
         )
     conn.commit()
@@ -79,3 +109,15 @@ def query_audit(
         ).fetchall()
     conn.close()
     return [dict(r) for r in reversed(rows)]
+
+
+def average_instance_bytes(base_dir: Path) -> dict[str, float]:
+    """Bytes per image of earlier successful loads, by modality."""
+    conn = get_db(base_dir)
+    rows = conn.execute(
+        "SELECT modality, SUM(bytes) * 1.0 / SUM(image_count) FROM audit"
+        " WHERE status='ok' AND bytes > 0 AND image_count > 0"
+        " AND modality IS NOT NULL GROUP BY modality"
+    ).fetchall()
+    conn.close()
+    return {modality: avg for modality, avg in rows}
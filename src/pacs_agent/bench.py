@@ -0,0 +1,897 @@
+"""Benchmarks of the loader: end-to-end throughput and anonymization.
+
+``rad-loader bench load`` generates synthetic cohorts, serves each
+from a stand-in PACS (fakepacs.py) and loads it with ``load_studies``,
+measuring what a change to the loader costs or gains:
+
+- ``ct``: CT studies of 500 to 5,000 slices (one series each);
+- ``mr-multiframe``: Enhanced MR, one multi-frame instance per series;
+- ``many-series``: studies of a hundred-odd small series;
+- ``private-tags``: instances with hundreds of vendor private tags,
+  a private sequence and large private blobs (CSA-style headers).
+
+Each cohort is reported as studies/h, images/s, MB/s (as received
+over C-STORE), loader CPU time per instance and peak RSS. The fake
+PACS runs in a process of its own, and the load in another, so its
+CPU time and memory are not counted, and peak RSS is that cohort's.
+
+Cohorts come in three sizes: ``quick`` (seconds, a smoke test),
+``standard`` and ``full`` (several GB on disk). Generated files are
+kept in the work directory and reused by later runs.
+
+``rad-loader bench anonymize`` times ``anonymize_dataset``,
+``anonymize_file``, ``anonymize_stream`` and ``save_as`` on single
+instances (MICRO_CASES): plain CT, vendor-private heavy (2,000 private
+elements), sequence-deep (an SR-style content tree) and enhanced
+multi-frame MR, reporting µs per call and peak Python allocations.
+
+Both write JSON results (``results``: metrics by cohort, or by
+case/function); ``compare`` checks them against the results of
+another commit, with a tolerance per metric (THRESHOLDS).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field, replace
+from datetime import datetime
+from io import BytesIO
+from pathlib import Path
+
+import pydicom
+import pynetdicom
+from pydicom import dcmread
+from pydicom.dataset import Dataset, FileMetaDataset
+from pydicom.sequence import Sequence
+from pydicom.uid import (
+    CTImageStorage,
+    EnhancedMRImageStorage,
+    ExplicitVRLittleEndian,
+    MRImageStorage,
+)
+
+from .config import Config, OutputConfig, PacsConfig, ScpConfig
+from .fakepacs import FakePacs
+
+log = logging.getLogger(__name__)
+
+RESULTS_VERSION = 1
+SIZES = ("quick", "standard", "full")
+_SCP_AE_TITLE = "RAD_BENCH"
+
+# Allowed change before compare() reports a regression, as a fraction
+# of the baseline, by kind of results; "higher" metrics regress when
+# they drop.
+THRESHOLDS = {
+    "load": {
+        "studies_per_h": 0.10,
+        "images_per_s": 0.10,
+        "mb_per_s": 0.10,
+        "cpu_ms_per_instance": 0.15,
+        "peak_rss_mb": 0.20,
+    },
+    "anonymize": {
+        "median_us": 0.15,
+        "alloc_peak_kb": 0.10,
+    },
+}
+_HIGHER_IS_BETTER = {"studies_per_h", "images_per_s", "mb_per_s"}
+
+# Root of the generated UIDs (2.25: UUID-derived, no registration needed)
+_UID_ROOT = "2.25.4242"
+
+
+# ── Cohorts ───────────────────────────────────────────────────
+
+
+@dataclass
+class StudySpec:
+    """One synthetic study."""
+
+    kind: str  # ct, mr-multiframe, private-tags or sequence-deep
+    series: int
+    images: int  # per series
+    frames: int = 1  # per image (mr-multiframe)
+    rows: int = 512
+    columns: int = 512
+    private_tags: int = 0  # per image, besides the private sequence
+
+
+@dataclass
+class Cohort:
+    name: str
+    studies: list[StudySpec]
+
+    @property
+    def images(self) -> int:
+        return sum(s.series * s.images for s in self.studies)
+
+    def accessions(self) -> list[str]:
+        prefix = "".join(c for c in self.name.upper() if c.isalnum())[:8]
+        return [f"B{prefix}{i + 1:04d}" for i in range(len(self.studies))]
+
+
+def cohorts(size: str = "standard") -> dict[str, Cohort]:
+    """The benchmark cohorts of a size (quick, standard or full)."""
+    if size == "quick":
+        ct = [StudySpec("ct", 1, 50, rows=128, columns=128)]
+        mr = [StudySpec("mr-multiframe", 2, 1, frames=20, rows=64, columns=64)]
+        many = [StudySpec("ct", 20, 3, rows=64, columns=64)]
+        private = [StudySpec("private-tags", 1, 40, rows=64, columns=64,
+                             private_tags=200)]
+    elif size == "standard":
+        ct = [StudySpec("ct", 1, 500)]
+        mr = [StudySpec("mr-multiframe", 4, 1, frames=100, rows=256, columns=256)
+              for _ in range(2)]
+        many = [StudySpec("ct", 120, 4, rows=256, columns=256) for _ in range(2)]
+        private = [StudySpec("private-tags", 2, 100, rows=256, columns=256,
+                             private_tags=400) for _ in range(2)]
+    elif size == "full":
+        ct = [StudySpec("ct", 1, n) for n in (500, 1000, 2000, 5000)]
+        mr = [StudySpec("mr-multiframe", 6, 1, frames=200, rows=256, columns=256)
+              for _ in range(5)]
+        many = [StudySpec("ct", 150, 8, rows=256, columns=256) for _ in range(5)]
+        private = [StudySpec("private-tags", 4, 250, rows=256, columns=256,
+                             private_tags=400) for _ in range(5)]
+    else:
+        raise ValueError(f"size must be one of {', '.join(SIZES)}, not {size!r}")
+    return {
+        "ct": Cohort("ct", ct),
+        "mr-multiframe": Cohort("mr-multiframe", mr),
+        "many-series": Cohort("many-series", many),
+        "private-tags": Cohort("private-tags", private),
+    }
+
+
+def generate(cohort: Cohort, root: Path) -> Path:
+    """Write the cohort's files under root/<name>, unless already there.
+
+    A cohort.json written last marks a complete directory; one from a
+    different spec (or none) makes the directory written again.
+    """
+    directory = root / cohort.name
+    marker = directory / "cohort.json"
+    spec = {"studies": [asdict(s) for s in cohort.studies]}
+    if marker.exists() and json.loads(marker.read_text()) == spec:
+        return directory
+    if directory.exists():
+        shutil.rmtree(directory)
+    t0 = time.monotonic()
+    for n, (study, accession) in enumerate(
+        zip(cohort.studies, cohort.accessions()), start=1,
+    ):
+        _write_study(directory / accession, study, accession, n)
+    marker.write_text(json.dumps(spec))
+    log.info(
+        "Generated %s: %d studies, %d images (%.0f s)",
+        cohort.name, len(cohort.studies), cohort.images, time.monotonic() - t0,
+    )
+    return directory
+
+
+def _write_study(directory: Path, spec: StudySpec, accession: str, n: int) -> None:
+    directory.mkdir(parents=True, exist_ok=True)
+    study_uid = f"{_UID_ROOT}.{_kind_code(spec.kind)}.{n}"
+    pixels = _pixel_data(spec.rows * spec.columns * spec.frames * 2)
+    for s in range(spec.series):
+        series_uid = f"{study_uid}.{s + 1}"
+        for i in range(spec.images):
+            ds = _instance(spec, accession, study_uid, series_uid, s, i, pixels)
+            ds.save_as(
+                directory / f"{s + 1:03d}_{i + 1:05d}.dcm",
+                enforce_file_format=True,
+            )
+
+
+def _kind_code(kind: str) -> int:
+    return {"ct": 1, "mr-multiframe": 2, "private-tags": 3, "sequence-deep": 4}[kind]
+
+
+def _instance(
+    spec: StudySpec,
+    accession: str,
+    study_uid: str,
+    series_uid: str,
+    series: int,
+    image: int,
+    pixels: bytes,
+) -> Dataset:
+    """A complete instance of the spec's kind."""
+    ds = _base_instance(spec, accession, study_uid, series_uid, series, image)
+    ds.PixelData = pixels
+    if spec.kind == "mr-multiframe":
+        _add_frames(ds, spec.frames)
+    elif spec.kind == "private-tags":
+        _add_private_tags(ds, spec.private_tags)
+    elif spec.kind == "sequence-deep":
+        _add_content_tree(ds, depth=5, breadth=4)
+    return ds
+
+
+def _pixel_data(size: int) -> bytes:
+    pattern = bytes(range(256))
+    return (pattern * (size // len(pattern) + 1))[:size]
+
+
+def _base_instance(
+    spec: StudySpec,
+    accession: str,
+    study_uid: str,
+    series_uid: str,
+    series: int,
+    image: int,
+) -> Dataset:
+    sop_uid = f"{series_uid}.{image + 1}"
+    if spec.kind == "mr-multiframe":
+        sop_class, modality = EnhancedMRImageStorage, "MR"
+    elif spec.kind == "private-tags":
+        sop_class, modality = MRImageStorage, "MR"
+    else:
+        sop_class, modality = CTImageStorage, "CT"
+
+    meta = FileMetaDataset()
+    meta.MediaStorageSOPClassUID = sop_class
+    meta.MediaStorageSOPInstanceUID = sop_uid
+    meta.TransferSyntaxUID = ExplicitVRLittleEndian
+
+    ds = Dataset()
+    ds.file_meta = meta
+    ds.SOPClassUID = sop_class
+    ds.SOPInstanceUID = sop_uid
+    ds.StudyInstanceUID = study_uid
+    ds.SeriesInstanceUID = series_uid
+    ds.FrameOfReferenceUID = f"{study_uid}.0"
+    ds.AccessionNumber = accession
+    ds.PatientName = "Bench^Patient"
+    ds.PatientID = f"P{accession}"
+    ds.PatientBirthDate = "19700101"
+    ds.PatientSex = "O"
+    ds.InstitutionName = "BENCHMARK HOSPITAL"
+    ds.ReferringPhysicianName = "Referrer^Doctor"
+    ds.StudyDate = "20240101"
+    ds.StudyTime = "120000"
+    ds.StudyDescription = f"Benchmark {spec.kind}"
+    ds.Modality = modality
+    ds.SeriesNumber = series + 1
+    ds.SeriesDescription = f"Series {series + 1}"
+    ds.InstanceNumber = image + 1
+    ds.ImageType = ["ORIGINAL", "PRIMARY", "AXIAL"]
+    ds.ImagePositionPatient = [0.0, 0.0, float(image)]
+    ds.ImageOrientationPatient = [1.0, 0.0, 0.0, 0.0, 1.0, 0.0]
+    ds.PixelSpacing = [0.5, 0.5]
+    ds.SliceThickness = 1.0
+    ds.Rows = spec.rows
+    ds.Columns = spec.columns
+    ds.BitsAllocated = 16
+    ds.BitsStored = 12
+    ds.HighBit = 11
+    ds.PixelRepresentation = 0
+    ds.SamplesPerPixel = 1
+    ds.PhotometricInterpretation = "MONOCHROME2"
+    return ds
+
+
+def _add_frames(ds: Dataset, frames: int) -> None:
+    """Multi-frame attributes and functional groups of Enhanced MR."""
+    ds.NumberOfFrames = frames
+    measures = Dataset()
+    measures.PixelSpacing = [0.5, 0.5]
+    measures.SliceThickness = 1.0
+    shared = Dataset()
+    shared.PixelMeasuresSequence = Sequence([measures])
+    ds.SharedFunctionalGroupsSequence = Sequence([shared])
+    per_frame = []
+    for f in range(frames):
+        content = Dataset()
+        content.InStackPositionNumber = f + 1
+        content.DimensionIndexValues = [1, f + 1]
+        position = Dataset()
+        position.ImagePositionPatient = [0.0, 0.0, float(f)]
+        item = Dataset()
+        item.FrameContentSequence = Sequence([content])
+        item.PlanePositionSequence = Sequence([position])
+        per_frame.append(item)
+    ds.PerFrameFunctionalGroupsSequence = Sequence(per_frame)
+
+
+# Private groups of the private-tags cohort: (group, creator). The
+# creators are made up, so that no value clashes with the VR pydicom's
+# private dictionary gives a real vendor's tag (implicit VR decoding).
+_PRIVATE_BLOCKS = [
+    (0x0019, "ACME_ACQU_01"),
+    (0x0021, "ACME MR HEADER"),
+    (0x0043, "ACME_PARM_01"),
+    (0x0051, "ACME MR HEADER"),
+    (0x0071, "ACME MED"),
+]
+
+
+def _add_private_tags(ds: Dataset, count: int) -> None:
+    """Vendor-style private data: many small elements, a private
+    sequence and two large CSA-like blobs."""
+    for n in range(count):
+        group, creator = _PRIVATE_BLOCKS[n % len(_PRIVATE_BLOCKS)]
+        # A creator reserves 256 elements; 0x10-0xFF are used, then
+        # the next (numbered) creator of the group takes over
+        index, offset = divmod(n // len(_PRIVATE_BLOCKS), 0xF0)
+        if index:
+            creator = f"{creator} {index}"
+        block = ds.private_block(group, creator, create=True)
+        offset += 0x10
+        if n % 3 == 0:
+            block.add_new(offset, "DS", f"{n}.5")
+        elif n % 3 == 1:
+            block.add_new(offset, "LO", f"vendor value {n}")
+        else:
+            block.add_new(offset, "SL", n)
+    csa = ds.private_block(0x0029, "SIEMENS CSA HEADER", create=True)
+    csa.add_new(0x10, "OB", _pixel_data(8 * 1024))
+    csa.add_new(0x20, "OB", _pixel_data(32 * 1024))
+    items = []
+    for n in range(8):
+        item = Dataset()
+        inner = item.private_block(0x0045, "ACME_STEPS", create=True)
+        inner.add_new(0x10, "LO", f"protocol step {n}")
+        inner.add_new(0x11, "DS", "1.0")
+        item.PatientName = "Nested^Name"  # PHI inside a private sequence
+        items.append(item)
+    seq = ds.private_block(0x0009, "ACME_NESTED", create=True)
+    seq.add_new(0x10, "SQ", Sequence(items))
+
+
+def _add_content_tree(ds: Dataset, depth: int, breadth: int) -> None:
+    """An SR-style content tree: breadth items per level, depth levels,
+    with coded concepts, text and names (PHI) in every item."""
+
+    def items(level: int) -> Sequence:
+        children = []
+        for n in range(breadth):
+            concept = Dataset()
+            concept.CodeValue = f"{level}{n}"
+            concept.CodingSchemeDesignator = "99BENCH"
+            concept.CodeMeaning = f"Finding {level}.{n}"
+            item = Dataset()
+            item.RelationshipType = "CONTAINS"
+            item.ValueType = "CONTAINER" if level < depth else "TEXT"
+            item.ConceptNameCodeSequence = Sequence([concept])
+            if level < depth:
+                item.ContinuityOfContent = "SEPARATE"
+                item.ContentSequence = items(level + 1)
+            else:
+                item.TextValue = f"Observation {level}.{n} by Dr. Reader"
+            item.PersonName = "Observer^Name"
+            children.append(item)
+        return Sequence(children)
+
+    ds.ValueType = "CONTAINER"
+    ds.ContentSequence = items(1)
+    requested = Dataset()
+    requested.RequestedProcedureID = "RP1"
+    requested.ScheduledProcedureStepID = "SPS1"
+    ds.RequestAttributesSequence = Sequence([requested])
+
+
+# ── Running ───────────────────────────────────────────────────
+
+
+@dataclass
+class CohortResult:
+    """Measurements of one cohort (the median of the repeats)."""
+
+    studies: int
+    images: int
+    bytes_received: int
+    errors: int
+    wall_s: float
+    studies_per_h: float
+    images_per_s: float
+    mb_per_s: float
+    cpu_s: float
+    cpu_ms_per_instance: float
+    peak_rss_mb: float  # loader process
+    peak_worker_rss_mb: float  # largest anonymize worker, if any
+    stages: dict[str, float] = field(default_factory=dict)  # summed seconds
+
+
+def bench_config(base: Config | None, work_dir: Path, pacs_port: int) -> Config:
+    """base (or defaults) pointed at the fake PACS and the work directory.
+
+    Tuning (scp writers and processes, load concurrency, series moves,
+    ...) is kept from base, so a config's settings can be benchmarked.
+    """
+    scp = replace(base.scp) if base else ScpConfig()
+    scp.ae_title = _SCP_AE_TITLE
+    scp.port = 0
+    config = Config(
+        pacs=PacsConfig(
+            host="127.0.0.1",
+            port=pacs_port,
+            ae_title="FAKEPACS",
+            retrieval=base.pacs.retrieval if base else "c-move",
+        ),
+        scp=scp,
+        output=OutputConfig(
+            base_dir=work_dir / "out",
+            key_store=base.output.key_store if base else "csv",
+        ),
+    )
+    if base:
+        config.load = replace(base.load)
+    config.find_cache.ttl_hours = 0
+    return config
+
+
+def run_cohort(
+    cohort: Cohort,
+    directory: Path,
+    config: Config,
+    repeat: int = 1,
+    latency: float = 0.0,
+    bandwidth: float | None = None,
+) -> CohortResult:
+    """Load the cohort from a fake PACS over directory, repeat times.
+
+    config is completed with the ports; its output.base_dir is emptied
+    before each run and removed at the end.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    runs = []
+    for _ in range(repeat):
+        out_dir = config.output.base_dir
+        if out_dir.exists():
+            shutil.rmtree(out_dir)
+        pacs_conn, child = ctx.Pipe()
+        pacs = ctx.Process(
+            target=_serve_fake_pacs,
+            args=(child, directory, latency, bandwidth),
+            daemon=True,
+        )
+        pacs.start()
+        try:
+            pacs_port = _receive(pacs_conn, pacs)
+            run_config = replace(
+                config,
+                pacs=replace(config.pacs, port=pacs_port),
+                scp=replace(config.scp, port=_free_port()),
+            )
+            pacs_conn.send(run_config.scp.port)  # the C-MOVE destination
+            _receive(pacs_conn, pacs)  # ready
+            loader_conn, child = ctx.Pipe()
+            loader = ctx.Process(
+                target=_load_and_measure,
+                args=(child, run_config, cohort.accessions()),
+            )
+            loader.start()
+            runs.append(_receive(loader_conn, loader))
+            loader.join()
+        finally:
+            pacs_conn.send("stop")
+            pacs.join(timeout=10)
+            shutil.rmtree(config.output.base_dir, ignore_errors=True)
+    return _median(runs)
+
+
+def _receive(conn, process):
+    """The next message from a child process (which may have died)."""
+    while not conn.poll(1.0):
+        if not process.is_alive():
+            raise RuntimeError(
+                f"Benchmark process exited with code {process.exitcode}"
+            )
+    return conn.recv()
+
+
+def _serve_fake_pacs(conn, directory: Path, latency, bandwidth) -> None:
+    """Fake PACS process: send our port, take the destination port,
+    serve until told to stop."""
+    logging.basicConfig(level=logging.WARNING)
+    pacs = FakePacs(directory, latency=latency, bandwidth=bandwidth)
+    pacs.start()
+    try:
+        conn.send(pacs.port)
+        scp_port = conn.recv()
+        pacs.destinations[_SCP_AE_TITLE] = ("127.0.0.1", scp_port)
+        conn.send("ready")
+        conn.recv()
+    finally:
+        pacs.stop()
+
+
+def _load_and_measure(conn, config: Config, accessions: list[str]) -> None:
+    """Loader process: load, and send back measurements of this process."""
+    from .loader import load_studies
+
+    logging.basicConfig(level=logging.WARNING)
+    self0 = resource.getrusage(resource.RUSAGE_SELF)
+    children0 = resource.getrusage(resource.RUSAGE_CHILDREN)
+    t0 = time.perf_counter()
+    results, _ = load_studies(config, "bench", accessions)
+    wall_s = time.perf_counter() - t0
+    # Worker processes are joined by now, so they count as children
+    self1 = resource.getrusage(resource.RUSAGE_SELF)
+    children1 = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    cpu_s = sum(
+        (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+        for before, after in ((self0, self1), (children0, children1))
+    )
+    ok = [r for r in results if r.status == "ok"]
+    for r in results:
+        if r.status != "ok":
+            log.warning("%s: %s %s", r.accession, r.status, r.error or "")
+    images = sum(r.image_count for r in ok)
+    received = sum(r.timings.bytes_received for r in ok if r.timings)
+    stages: dict[str, float] = {}
+    for r in ok:
+        if r.timings is None:
+            continue
+        for name, value in asdict(r.timings).items():
+            if name.endswith("_s") and value is not None:
+                stages[name] = stages.get(name, 0.0) + value
+    conn.send(CohortResult(
+        studies=len(ok),
+        images=images,
+        bytes_received=received,
+        errors=len(results) - len(ok),
+        wall_s=round(wall_s, 3),
+        studies_per_h=round(len(ok) / wall_s * 3600, 1),
+        images_per_s=round(images / wall_s, 1),
+        mb_per_s=round(received / wall_s / 1e6, 2),
+        cpu_s=round(cpu_s, 3),
+        cpu_ms_per_instance=round(cpu_s / images * 1000, 3) if images else 0.0,
+        peak_rss_mb=round(_max_rss_mb(self1), 1),
+        peak_worker_rss_mb=round(_max_rss_mb(children1), 1),
+        stages={k: round(v, 3) for k, v in stages.items()},
+    ))
+
+
+def _max_rss_mb(usage) -> float:
+    # ru_maxrss is in KiB on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return usage.ru_maxrss * scale / 1e6
+
+
+def _median(runs: list[CohortResult]) -> CohortResult:
+    """Field-wise median of repeated runs (the first run's stages)."""
+    if len(runs) == 1:
+        return runs[0]
+    values = {
+        name: round(statistics.median(getattr(r, name) for r in runs), 3)
+        for name in asdict(runs[0])
+        if name != "stages"
+    }
+    for name in ("studies", "images", "bytes_received", "errors"):
+        values[name] = int(values[name])
+    return CohortResult(**values, stages=runs[0].stages)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def run(
+    size: str,
+    work_dir: Path,
+    base: Config | None = None,
+    names: list[str] | None = None,
+    repeat: int = 1,
+    latency: float = 0.0,
+    bandwidth: float | None = None,
+) -> dict:
+    """Generate and load the cohorts; return the results document."""
+    available = cohorts(size)
+    unknown = set(names or []) - set(available)
+    if unknown:
+        raise ValueError(f"Unknown cohorts: {', '.join(sorted(unknown))}")
+    config = bench_config(base, work_dir, pacs_port=0)
+    results = {}
+    for name in names or list(available):
+        cohort = available[name]
+        directory = generate(cohort, work_dir / "cohorts" / size)
+        log.info("Loading %s (%d images)", name, cohort.images)
+        result = run_cohort(cohort, directory, config, repeat, latency, bandwidth)
+        log.info(
+            "%s: %.1f images/s, %.2f MB/s, %.2f CPU ms/instance, %.0f MB peak RSS",
+            name, result.images_per_s, result.mb_per_s,
+            result.cpu_ms_per_instance, result.peak_rss_mb,
+        )
+        results[name] = asdict(result)
+    return {
+        "version": RESULTS_VERSION,
+        "kind": "load",
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "size": size,
+        "repeat": repeat,
+        "environment": environment(),
+        "settings": {
+            "retrieval": config.pacs.retrieval,
+            "scp": {k: v for k, v in asdict(config.scp).items()
+                    if k not in ("ae_title", "port")},
+            "load": {
+                k: v for k, v in asdict(config.load).items()
+                if k in ("concurrency", "prefetch", "series_moves", "order")
+            },
+            "latency_s": latency,
+            "bandwidth": bandwidth,
+        },
+        "results": results,
+    }
+
+
+def environment() -> dict[str, str | int | None]:
+    """Where results were measured (compared results should match)."""
+    return {
+        "python": platform.python_version(),
+        "pydicom": pydicom.__version__,
+        "pynetdicom": pynetdicom.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def _git_commit() -> str | None:
+    """Commit of the working tree the package runs from, if any."""
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).parent,
+            capture_output=True, text=True, timeout=5,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+# ── Micro-benchmarks ──────────────────────────────────────────
+
+
+# Datasets of ``rad-loader bench anonymize``, one instance each
+MICRO_CASES = {
+    "ct": StudySpec("ct", 1, 1),
+    "vendor-private": StudySpec("private-tags", 1, 1, rows=256, columns=256,
+                                private_tags=2000),
+    "sequence-deep": StudySpec("sequence-deep", 1, 1, rows=64, columns=64),
+    "enhanced-multiframe": StudySpec("mr-multiframe", 1, 1, frames=200,
+                                     rows=256, columns=256),
+}
+MICRO_FUNCTIONS = ("anonymize_dataset", "anonymize_file", "anonymize_stream",
+                   "save_as")
+
+
+@dataclass
+class MicroResult:
+    """Timings of one function on one dataset, per call."""
+
+    elements: int  # in the input dataset, nested ones included
+    iterations: int
+    median_us: float
+    min_us: float
+    mean_us: float
+    alloc_peak_kb: float  # Python allocations live at once (tracemalloc)
+
+
+def micro_dataset(case: str) -> bytes:
+    """The encoded file (with file meta) of a MICRO_CASES dataset."""
+    spec = MICRO_CASES[case]
+    study_uid = f"{_UID_ROOT}.9.{_kind_code(spec.kind)}"
+    pixels = _pixel_data(spec.rows * spec.columns * spec.frames * 2)
+    ds = _instance(spec, "BMICRO0001", study_uid, f"{study_uid}.1", 0, 0, pixels)
+    buffer = BytesIO()
+    ds.save_as(buffer, enforce_file_format=True)
+    return buffer.getvalue()
+
+
+def time_function(
+    function: str,
+    data: bytes,
+    work_dir: Path,
+    iterations: int | None = None,
+    min_time: float = 1.0,
+) -> MicroResult:
+    """Time one of MICRO_FUNCTIONS on an encoded dataset.
+
+    Each call gets a fresh input, prepared outside the timing. The
+    datasets are read lazily, as the SCP's are, so anonymize_dataset
+    includes decoding the elements it visits. save_as writes an
+    anonymized dataset. Allocations are measured in a separate pass
+    under tracemalloc, which would distort the timings.
+
+    Args:
+        function: Name in MICRO_FUNCTIONS.
+        data: Encoded DICOM file.
+        work_dir: Directory for the source and destination files.
+        iterations: Timed calls; by default as many as fit in
+            min_time seconds (at least 5, at most 1,000).
+        min_time: Seconds to keep calling for, without iterations.
+    """
+    from .anonymize import anonymize_dataset, anonymize_file, anonymize_stream
+
+    work_dir.mkdir(parents=True, exist_ok=True)
+    src = work_dir / "src.dcm"
+    dst = work_dir / "dst.dcm"
+    src.write_bytes(data)
+
+    def prepare():
+        if function == "anonymize_dataset":
+            return dcmread(BytesIO(data))
+        if function == "save_as":
+            return anonymize_dataset(dcmread(BytesIO(data)), "case0001")
+        return None
+
+    def call(ds) -> None:
+        if function == "anonymize_dataset":
+            anonymize_dataset(ds, "case0001")
+        elif function == "anonymize_file":
+            anonymize_file(src, dst, "case0001")
+        elif function == "anonymize_stream":
+            anonymize_stream(src, dst, "case0001")
+        elif function == "save_as":
+            ds.save_as(dst, enforce_file_format=True)
+        else:
+            raise ValueError(f"Unknown function {function!r}")
+
+    call(prepare())  # warm-up: imports, dictionary lookups, page cache
+    samples: list[float] = []
+    started = time.perf_counter()
+    while True:
+        ds = prepare()
+        t0 = time.perf_counter_ns()
+        call(ds)
+        samples.append((time.perf_counter_ns() - t0) / 1000)
+        if iterations is not None:
+            if len(samples) >= iterations:
+                break
+        elif len(samples) >= 1000 or (
+            len(samples) >= 5 and time.perf_counter() - started >= min_time
+        ):
+            break
+
+    peak = 0
+    tracemalloc.start()
+    try:
+        for _ in range(3):
+            ds = prepare()
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            call(ds)
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+    dst.unlink(missing_ok=True)
+
+    return MicroResult(
+        elements=sum(1 for _ in dcmread(BytesIO(data)).iterall()),
+        iterations=len(samples),
+        median_us=round(statistics.median(samples), 1),
+        min_us=round(min(samples), 1),
+        mean_us=round(statistics.fmean(samples), 1),
+        alloc_peak_kb=round(peak / 1024, 1),
+    )
+
+
+def run_micro(
+    work_dir: Path,
+    cases: list[str] | None = None,
+    functions: list[str] | None = None,
+    iterations: int | None = None,
+) -> dict:
+    """Time the functions on the datasets; return the results document."""
+    for name, known in ((cases, MICRO_CASES), (functions, MICRO_FUNCTIONS)):
+        unknown = set(name or []) - set(known)
+        if unknown:
+            raise ValueError(f"Unknown: {', '.join(sorted(unknown))}")
+    results = {}
+    for case in cases or list(MICRO_CASES):
+        data = micro_dataset(case)
+        for function in functions or MICRO_FUNCTIONS:
+            result = time_function(function, data, work_dir, iterations)
+            log.info(
+                "%s/%s: %.0f us median, %.0f KiB peak allocations",
+                case, function, result.median_us, result.alloc_peak_kb,
+            )
+            results[f"{case}/{function}"] = asdict(result)
+    shutil.rmtree(work_dir, ignore_errors=True)
+    return {
+        "version": RESULTS_VERSION,
+        "kind": "anonymize",
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "environment": environment(),
+        "results": results,
+    }
+
+
+# ── Comparing ─────────────────────────────────────────────────
+
+
+@dataclass
+class Change:
+    """A metric of one result, baseline vs current."""
+
+    name: str  # cohort, or case/function
+    metric: str
+    baseline: float
+    current: float
+    threshold: float
+    regression: bool
+
+    @property
+    def change(self) -> float:
+        """Relative change, positive when the metric grew."""
+        if not self.baseline:
+            return 0.0
+        return self.current / self.baseline - 1
+
+
+def compare(
+    baseline: dict,
+    current: dict,
+    thresholds: dict[str, float] | None = None,
+) -> list[Change]:
+    """Metrics of current vs baseline results, regressions flagged.
+
+    A metric regresses when it worsens by more than its threshold (a
+    fraction of the baseline value; THRESHOLDS of the results' kind,
+    updated with thresholds). Only results and metrics present in both
+    are compared.
+    """
+    defaults = THRESHOLDS.get(current.get("kind", "load"), {})
+    thresholds = {**defaults, **(thresholds or {})}
+    changes = []
+    for name, now in current["results"].items():
+        then = baseline["results"].get(name)
+        if then is None:
+            continue
+        for metric, threshold in thresholds.items():
+            if metric not in then or metric not in now:
+                continue
+            before, after = float(then[metric]), float(now[metric])
+            if metric in _HIGHER_IS_BETTER:
+                worse = after < before * (1 - threshold)
+            else:
+                worse = after > before * (1 + threshold)
+            changes.append(Change(name, metric, before, after, threshold, worse))
+    return changes
+
+
+def mismatches(baseline: dict, current: dict) -> list[str]:
+    """Why the two results may not be comparable (empty: no reason)."""
+    notes = []
+    for key in ("kind", "size", "settings"):
+        if baseline.get(key) != current.get(key):
+            notes.append(f"{key} differs")
+    for key, value in current.get("environment", {}).items():
+        if baseline.get("environment", {}).get(key) != value:
+            notes.append(f"environment {key} differs")
+    return notes
+
+
+def format_changes(changes: list[Change]) -> str:
+    """A table of the changes, regressions marked."""
+    width = max([len(c.name) for c in changes] + [4])
+    lines = [
+        f"{'name':<{width}} {'metric':<20} {'baseline':>12} {'current':>12}"
+        f" {'change':>8}"
+    ]
+    for c in changes:
+        mark = "  REGRESSION" if c.regression else ""
+        lines.append(
+            f"{c.name:<{width}} {c.metric:<20} {c.baseline:>12g}"
+            f" {c.current:>12g} {c.change:>+8.1%}{mark}"
+        )
+    return "\n".join(lines)
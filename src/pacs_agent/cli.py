@@ -3,11 +3,25 @@
 Usage:
     rad-loader echo
     rad-loader query ACCESSION
+    rad-loader query --file accessions.txt --associations 2
     rad-loader load PROJECT AC1 AC2 ...
     rad-loader load PROJECT --file accessions.txt
+    rad-loader load PROJECT --file accessions.txt --concurrency 4
+    rad-loader load PROJECT --file accessions.txt --prefetch-range 2024-01-01:2024-12-31
+    rad-loader load PROJECT --file accessions.txt --series-modality CT --min-instances 20
+    rad-loader serve
+    rad-loader load PROJECT --file accessions.txt --server [--no-wait]
+    rad-loader jobs [JOB]
     rad-loader status PROJECT
+    rad-loader compact PROJECT
+    rad-loader cache clear [ACCESSION ...]
     rad-loader audit PROJECT [--last N]
     rad-loader audit --all [--last N]
+    rad-loader metrics [--write]
+    rad-loader fake-pacs DIR --destination RAD_LOADER=127.0.0.1:11113
+    rad-loader bench load [--size quick] [--output FILE] [--baseline FILE]
+    rad-loader bench anonymize [--case NAME] [--output FILE] [--baseline FILE]
+    rad-loader bench compare CURRENT --baseline FILE
 """
 
 from __future__ import annotations
@@ -16,10 +30,10 @@ import argparse
 import json
 import logging
 import sys
+from datetime import date, datetime
 from pathlib import Path
 
-from .config import Config
-from .keyfile import read_key_file
+from .config import Config, SeriesFilter
 
 
 def main(argv: list[str] | None = None) -> None:
@@ -51,7 +65,24 @@ def main(argv: list[str] | None = None) -> None:
 
     # query
     p_query = sub.add_parser("query", help="Query accession number (C-FIND)")
-    p_query.add_argument("accession", help="Accession number to query")
+    p_query.add_argument("accession", nargs="?", help="Accession number to query")
+    p_query.add_argument(
+        "--file", "-f",
+        type=Path,
+        dest="accession_file",
+        help="File with accession numbers (one per line)",
+    )
+    p_query.add_argument(
+        "--associations",
+        type=int,
+        default=1,
+        help="Parallel C-FIND associations for --file (default: 1)",
+    )
+    p_query.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Query the PACS even for accessions in the C-FIND cache",
+    )
 
     # load
     p_load = sub.add_parser("load", help="Load studies from PACS")
@@ -68,11 +99,126 @@ def main(argv: list[str] | None = None) -> None:
         action="store_true",
         help="Query only, don't retrieve images",
     )
+    p_load.add_argument(
+        "--concurrency", "-j",
+        type=int,
+        default=None,
+        help="Studies to retrieve in parallel (default: load.concurrency, 1)",
+    )
+    p_load.add_argument(
+        "--prefetch",
+        type=int,
+        default=None,
+        help="Accessions to resolve (C-FIND) ahead of the running C-MOVE"
+        " (default: load.prefetch, 0 = off)",
+    )
+    p_load.add_argument(
+        "--prefetch-range",
+        default=None,
+        metavar="FROM:TO",
+        help="Resolve accessions with STUDY-level C-FINDs by StudyDate range"
+        " (e.g. 2024-01-01:2024-12-31); misses are queried one by one",
+    )
+    p_load.add_argument(
+        "--prefetch-modality",
+        default=None,
+        metavar="MODALITY",
+        help="With --prefetch-range: only studies with this modality",
+    )
+    p_load.add_argument(
+        "--order",
+        choices=("file", "smallest", "largest", "balanced"),
+        default=None,
+        help="Retrieval order by study size from C-FIND (default: load.order,"
+        " file); results are still reported in file order",
+    )
+    p_load.add_argument(
+        "--series-moves",
+        type=int,
+        default=None,
+        help="Move each study as parallel SERIES-level C-MOVEs, up to N at"
+        " once (default: load.series_moves, 0 = one STUDY-level C-MOVE)",
+    )
+    p_load.add_argument(
+        "--series-modality",
+        default=None,
+        metavar="MODALITIES",
+        help="Retrieve only series of these modalities (comma-separated)",
+    )
+    p_load.add_argument(
+        "--series-description",
+        default=None,
+        metavar="REGEX",
+        help="Retrieve only series whose SeriesDescription matches REGEX"
+        " (case-insensitive search)",
+    )
+    p_load.add_argument(
+        "--min-instances",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Retrieve only series with at least N instances",
+    )
+    p_load.add_argument(
+        "--image-type",
+        action="append",
+        default=None,
+        metavar="VALUE",
+        help="Retrieve only series whose ImageType contains VALUE"
+        " (repeatable; all must be present)",
+    )
+    p_load.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Query the PACS even for accessions in the C-FIND cache",
+    )
+    p_load.add_argument(
+        "--server",
+        action="store_true",
+        help="Submit the load to a running 'rad-loader serve'",
+    )
+    p_load.add_argument(
+        "--no-wait",
+        action="store_true",
+        help="With --server: return the job ID instead of waiting",
+    )
+
+    # serve
+    p_serve = sub.add_parser(
+        "serve", help="Run the loader daemon (warm SCP, job queue)",
+    )
+    p_serve.add_argument(
+        "--socket", type=Path, default=None,
+        help="Unix socket path (default: serve.socket, base_dir/rad-loader.sock)",
+    )
+
+    # jobs
+    p_jobs = sub.add_parser("jobs", help="List daemon jobs, or show one")
+    p_jobs.add_argument("job", nargs="?", type=int, help="Job ID")
+    p_jobs.add_argument(
+        "--last", type=int, default=20,
+        help="Number of jobs to list (default: 20)",
+    )
 
     # status
     p_status = sub.add_parser("status", help="Check project status")
     p_status.add_argument("project", help="Project name")
 
+    # compact
+    p_compact = sub.add_parser(
+        "compact",
+        help="Rewrite key.csv (drops a partial last line; re-exports key.db)",
+    )
+    p_compact.add_argument("project", help="Project name")
+
+    # cache
+    p_cache = sub.add_parser("cache", help="Manage the C-FIND result cache")
+    cache_sub = p_cache.add_subparsers(dest="cache_command", required=True)
+    p_clear = cache_sub.add_parser(
+        "clear", help="Drop cached C-FIND results (all, or of some accessions)",
+    )
+    p_clear.add_argument("accessions", nargs="*", help="Accession numbers")
+
     # audit
     p_audit = sub.add_parser("audit", help="View audit log")
     p_audit.add_argument("project", nargs="?", help="Project name (omit with --all)")
@@ -85,6 +231,137 @@ def main(argv: list[str] | None = None) -> None:
         help="Number of entries to show (default: 20)",
     )
 
+    # metrics
+    p_metrics = sub.add_parser(
+        "metrics", help="Loader metrics from the audit log (Prometheus text)",
+    )
+    p_metrics.add_argument(
+        "--write", action="store_true",
+        help="Write them to metrics.textfile_dir instead of printing",
+    )
+
+    # fake-pacs
+    p_fake = sub.add_parser(
+        "fake-pacs",
+        help="Serve a directory of DICOM files as a stand-in PACS (no config)",
+    )
+    p_fake.add_argument("root", type=Path, help="Directory of DICOM files")
+    p_fake.add_argument(
+        "--port", type=int, default=11112, help="Port (default: 11112)",
+    )
+    p_fake.add_argument(
+        "--host", default="127.0.0.1", help="Address (default: 127.0.0.1)",
+    )
+    p_fake.add_argument(
+        "--ae-title", default="FAKEPACS", help="AE title (default: FAKEPACS)",
+    )
+    p_fake.add_argument(
+        "--destination", action="append", default=[], metavar="AE=HOST:PORT",
+        help="C-MOVE destination (repeatable)",
+    )
+    p_fake.add_argument(
+        "--latency-ms", type=float, default=0.0,
+        help="Delay before each instance is sent (default: 0)",
+    )
+    p_fake.add_argument(
+        "--bandwidth-mbps", type=float, default=None,
+        help="Cap on megabits per second sent by one retrieve",
+    )
+    p_fake.add_argument(
+        "--max-associations", type=int, default=10,
+        help="Associations accepted at once (default: 10)",
+    )
+    p_fake.add_argument(
+        "--max-retrieves", type=int, default=None,
+        help="C-MOVE/C-GETs served at once; more get 0xA702",
+    )
+    p_fake.add_argument(
+        "--find-status", type=_hex, default=None, metavar="0xHHHH",
+        help="Answer C-FINDs with this status",
+    )
+    p_fake.add_argument(
+        "--retrieve-status", type=_hex, default=None, metavar="0xHHHH",
+        help="End retrieves with this status (after --fail-after instances)",
+    )
+    p_fake.add_argument(
+        "--fail-after", type=int, default=0,
+        help="Instances sent before --retrieve-status (default: 0)",
+    )
+    p_fake.add_argument(
+        "--drop-after", type=int, default=None,
+        help="Abort retrieve associations after N instances",
+    )
+    p_fake.add_argument(
+        "--fault-times", type=int, default=None,
+        help="Only the first N operations (of each kind) fail (default: all)",
+    )
+
+    # bench
+    p_bench = sub.add_parser(
+        "bench", help="Benchmark the loader on synthetic data (no PACS needed)",
+    )
+    bench_sub = p_bench.add_subparsers(dest="bench_command", required=True)
+    p_bench_load = bench_sub.add_parser(
+        "load", help="Load synthetic cohorts from a fake PACS, measure throughput",
+    )
+    p_bench_load.add_argument(
+        "--size", choices=["quick", "standard", "full"], default="standard",
+        help="Cohort sizes (default: standard; full needs several GB)",
+    )
+    p_bench_load.add_argument(
+        "--cohort", action="append", dest="cohorts", metavar="NAME",
+        help="Run only this cohort: ct, mr-multiframe, many-series,"
+        " private-tags (repeatable)",
+    )
+    p_bench_load.add_argument(
+        "--repeat", type=int, default=1,
+        help="Runs per cohort; the median is reported (default: 1)",
+    )
+    p_bench_load.add_argument(
+        "--work-dir", type=Path, default=None,
+        help="Generated cohorts and scratch output (default: a temp directory)",
+    )
+    p_bench_load.add_argument(
+        "--latency-ms", type=float, default=0.0,
+        help="Fake PACS delay before each instance (default: 0)",
+    )
+    p_bench_load.add_argument(
+        "--bandwidth-mbps", type=float, default=None,
+        help="Fake PACS cap on megabits per second per retrieve",
+    )
+    p_bench_load.add_argument(
+        "--output", "-o", type=Path, default=None,
+        help="Write the results JSON here (default: print it)",
+    )
+    _add_baseline_arguments(p_bench_load, required=False)
+    p_bench_anonymize = bench_sub.add_parser(
+        "anonymize", help="Time anonymization and save_as per instance",
+    )
+    p_bench_anonymize.add_argument(
+        "--case", action="append", dest="cases", metavar="NAME",
+        help="Only this dataset: ct, vendor-private, sequence-deep,"
+        " enhanced-multiframe (repeatable)",
+    )
+    p_bench_anonymize.add_argument(
+        "--function", action="append", dest="functions", metavar="NAME",
+        help="Only this function: anonymize_dataset, anonymize_file,"
+        " anonymize_stream, save_as (repeatable)",
+    )
+    p_bench_anonymize.add_argument(
+        "--iterations", type=int, default=None,
+        help="Calls timed per function (default: as many as fit in 1 s)",
+    )
+    p_bench_anonymize.add_argument(
+        "--output", "-o", type=Path, default=None,
+        help="Write the results JSON here (default: print it)",
+    )
+    _add_baseline_arguments(p_bench_anonymize, required=False)
+    p_bench_compare = bench_sub.add_parser(
+        "compare", help="Compare benchmark results (exit 1 on a regression)",
+    )
+    p_bench_compare.add_argument("current", type=Path, help="Results to check")
+    _add_baseline_arguments(p_bench_compare, required=True)
+
     args = parser.parse_args(argv)
 
     logging.basicConfig(
@@ -102,10 +379,43 @@ def main(argv: list[str] | None = None) -> None:
         _cmd_query(args)
     elif args.command == "load":
         _cmd_load(args)
+    elif args.command == "serve":
+        _cmd_serve(args)
+    elif args.command == "jobs":
+        _cmd_jobs(args)
     elif args.command == "status":
         _cmd_status(args)
+    elif args.command == "compact":
+        _cmd_compact(args)
+    elif args.command == "cache":
+        _cmd_cache(args)
     elif args.command == "audit":
         _cmd_audit(args)
+    elif args.command == "metrics":
+        _cmd_metrics(args)
+    elif args.command == "fake-pacs":
+        _cmd_fake_pacs(args)
+    elif args.command == "bench":
+        _cmd_bench(args)
+
+
+def _add_baseline_arguments(
+    parser: argparse.ArgumentParser, required: bool,
+) -> None:
+    parser.add_argument(
+        "--baseline", type=Path, required=required,
+        help="Results of an earlier commit to compare with",
+    )
+    parser.add_argument(
+        "--threshold", action="append", default=[], metavar="METRIC=PCT",
+        help="Allowed worsening of a metric in percent (repeatable;"
+        " default: bench.THRESHOLDS)",
+    )
+
+
+def _hex(value: str) -> int:
+    """A DICOM status given as hex (0xA702 or A702)."""
+    return int(value, 16)
 
 
 def _load_config(args: argparse.Namespace) -> Config:
@@ -161,53 +471,251 @@ def _cmd_echo(args: argparse.Namespace) -> None:
         sys.exit(1)
 
 
+def _read_accession_file(path: Path) -> list[str]:
+    """Read accession numbers, one per line; blank lines and # comments skipped."""
+    if not path.exists():
+        _error(f"Accession file not found: {path}")
+    return [
+        line.strip()
+        for line in path.read_text().splitlines()
+        if line.strip() and not line.strip().startswith("#")
+    ]
+
+
 def _cmd_query(args: argparse.Namespace) -> None:
-    from .pacs import find_by_accession
+    from .findcache import open_find_cache
 
     config = _load_config(args)
-    studies = find_by_accession(config, args.accession)
+    cache = open_find_cache(config, refresh=args.refresh)
+    try:
+        _query(args, config, cache)
+    finally:
+        if cache is not None:
+            cache.close()
+
+
+def _query(args: argparse.Namespace, config: Config, cache) -> None:
+    from .pacs import find_by_accession, find_many
+
+    if args.accession_file:
+        accessions = _read_accession_file(args.accession_file)
+        if args.accession:
+            accessions.insert(0, args.accession)
+        if not accessions:
+            _error("No accession numbers provided")
+        if args.associations < 1:
+            _error("--associations must be at least 1")
+        found = find_many(
+            config, accessions, associations=args.associations, cache=cache,
+        )
+        _output(
+            {
+                "status": "ok",
+                "count": len(found),
+                "queries": [
+                    {"accession": ac, "results": studies}
+                    for ac, studies in found.items()
+                ],
+                **_cache_stats(cache),
+            },
+            args.human,
+        )
+        return
+
+    if not args.accession:
+        _error("Specify an accession number or use --file")
+    studies = find_by_accession(config, args.accession, cache=cache)
     _output(
         {
             "status": "ok",
             "accession": args.accession,
             "results": studies,
+            **_cache_stats(cache),
         },
         args.human,
     )
 
 
+def _cache_stats(cache) -> dict:
+    """{"find_cache": hit/miss counts}, or {} without a cache."""
+    return {"find_cache": cache.stats()} if cache is not None else {}
+
+
 def _cmd_load(args: argparse.Namespace) -> None:
-    from .loader import load_studies, result_to_dict
+    from .findcache import open_find_cache
+    from .loader import load_studies, load_summary
 
     config = _load_config(args)
 
     accessions = list(args.accessions or [])
     if args.accession_file:
-        if not args.accession_file.exists():
-            _error(f"Accession file not found: {args.accession_file}")
-        text = args.accession_file.read_text()
-        accessions.extend(
-            line.strip()
-            for line in text.splitlines()
-            if line.strip() and not line.strip().startswith("#")
-        )
+        accessions.extend(_read_accession_file(args.accession_file))
 
     if not accessions:
         _error("No accession numbers provided")
 
-    results, verification = load_studies(
-        config, args.project, accessions, dry_run=args.dry_run
-    )
+    if args.concurrency is not None and args.concurrency < 1:
+        _error("--concurrency must be at least 1")
+    if args.prefetch is not None and args.prefetch < 0:
+        _error("--prefetch cannot be negative")
+    if args.series_moves is not None and args.series_moves < 0:
+        _error("--series-moves cannot be negative")
+    prefetch_range = None
+    if args.prefetch_range is not None:
+        prefetch_range = _date_range(args.prefetch_range)
+    elif args.prefetch_modality is not None:
+        _error("--prefetch-modality needs --prefetch-range")
+    series_filter = _series_filter(args)
+    if series_filter is not None:
+        from .filters import check_filter
+
+        error = check_filter(series_filter)
+        if error:
+            _error(error)
+
+    if args.server:
+        _submit_load(args, config, accessions, series_filter, prefetch_range)
+        return
 
-    _output(
-        {
-            "status": "ok",
+    cache = open_find_cache(config, refresh=args.refresh)
+    try:
+        results, verification = load_studies(
+            config,
+            args.project,
+            accessions,
+            dry_run=args.dry_run,
+            concurrency=args.concurrency,
+            prefetch=args.prefetch,
+            series_moves=args.series_moves,
+            series_filter=series_filter,
+            prefetch_range=prefetch_range,
+            prefetch_modality=args.prefetch_modality,
+            find_cache=cache,
+            order=args.order,
+        )
+        summary = load_summary(args.project, results, verification, cache)
+    finally:
+        if cache is not None:
+            cache.close()
+
+    _output(summary, args.human)
+
+
+def _date_range(text: str) -> tuple[date, date]:
+    """Parse FROM:TO (YYYY-MM-DD or YYYYMMDD each) into a date pair."""
+    parts = text.split(":")
+    if len(parts) != 2:
+        _error(f"Invalid date range (expected FROM:TO): {text}")
+    dates = []
+    for part in parts:
+        part = part.strip()
+        for fmt in ("%Y-%m-%d", "%Y%m%d"):
+            try:
+                dates.append(datetime.strptime(part, fmt).date())
+                break
+            except ValueError:
+                pass
+        else:
+            _error(f"Invalid date in range: {part}")
+    if dates[1] < dates[0]:
+        _error(f"Date range ends before it starts: {text}")
+    return dates[0], dates[1]
+
+
+def _series_filter(args: argparse.Namespace) -> SeriesFilter | None:
+    """Series filter from the --series-* options; None if none given."""
+    if (
+        args.series_modality is None
+        and args.series_description is None
+        and args.min_instances is None
+        and not args.image_type
+    ):
+        return None
+    return SeriesFilter.from_dict({
+        "modalities": [
+            m.strip() for m in (args.series_modality or "").split(",") if m.strip()
+        ],
+        "description": args.series_description,
+        "min_instances": args.min_instances or 0,
+        "image_type": args.image_type or [],
+    })
+
+
+def _submit_load(
+    args: argparse.Namespace,
+    config: Config,
+    accessions: list[str],
+    series_filter: SeriesFilter | None = None,
+    prefetch_range: tuple[date, date] | None = None,
+) -> None:
+    from .server import request
+
+    try:
+        reply = request(config.socket_path, {
+            "op": "load",
             "project": args.project,
-            "results": [result_to_dict(r) for r in results],
-            "verification": verification,
-        },
-        args.human,
-    )
+            "accessions": accessions,
+            "dry_run": args.dry_run,
+            "concurrency": args.concurrency,
+            "prefetch": args.prefetch,
+            "series_moves": args.series_moves,
+            "series_filter": series_filter.to_dict() if series_filter else None,
+            "prefetch_range": (
+                [d.isoformat() for d in prefetch_range] if prefetch_range else None
+            ),
+            "prefetch_modality": args.prefetch_modality,
+            "refresh": args.refresh,
+            "order": args.order,
+            "wait": not args.no_wait,
+        })
+    except ConnectionError as e:
+        _error(str(e))
+    _output(reply, args.human)
+    if reply.get("status") != "ok":
+        sys.exit(1)
+
+
+def _cmd_serve(args: argparse.Namespace) -> None:
+    import signal
+
+    from .server import LoaderServer
+
+    config = _load_config(args)
+    server = LoaderServer(config, args.socket)
+    try:
+        server.start()
+    except RuntimeError as e:
+        _error(str(e))
+    except OSError as e:
+        _error(f"Cannot start daemon on {server.socket_path}: {e}")
+
+    def _terminate(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, _terminate)
+    try:
+        server.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+def _cmd_jobs(args: argparse.Namespace) -> None:
+    from .server import request
+
+    config = _load_config(args)
+    if args.job is not None:
+        payload = {"op": "job", "job": args.job}
+    else:
+        payload = {"op": "jobs", "last": args.last}
+    try:
+        reply = request(config.socket_path, payload)
+    except ConnectionError as e:
+        _error(str(e))
+    _output(reply, args.human)
+    if reply.get("status") != "ok":
+        sys.exit(1)
 
 
 def _cmd_status(args: argparse.Namespace) -> None:
@@ -215,7 +723,6 @@ def _cmd_status(args: argparse.Namespace) -> None:
 
     config = _load_config(args)
     project_dir = config.output.base_dir / args.project
-    key_path = project_dir / "key.csv"
 
     if not project_dir.exists():
         _output(
@@ -229,7 +736,13 @@ def _cmd_status(args: argparse.Namespace) -> None:
         )
         return
 
-    entries = read_key_file(key_path)
+    from .keystore import open_key_store
+
+    keys = open_key_store(project_dir, config.output.key_store)
+    try:
+        entries = keys.entries()
+    finally:
+        keys.close()
     total_images = sum(e.image_count for e in entries)
     outliers = verify_project(entries)
 
@@ -258,6 +771,45 @@ def _cmd_status(args: argparse.Namespace) -> None:
     )
 
 
+def _cmd_compact(args: argparse.Namespace) -> None:
+    from .keystore import open_key_store
+
+    config = _load_config(args)
+    project_dir = config.output.base_dir / args.project
+    if not project_dir.exists():
+        _error(f"Project not found: {args.project}")
+
+    # CSV: rewrite key.csv from its complete rows; SQLite: re-export it
+    keys = open_key_store(project_dir, config.output.key_store)
+    try:
+        keys.export_csv()
+        cases = len(keys)
+    finally:
+        keys.close()
+    _output(
+        {
+            "status": "ok",
+            "project": args.project,
+            "cases": cases,
+        },
+        args.human,
+    )
+
+
+def _cmd_cache(args: argparse.Namespace) -> None:
+    from .findcache import open_find_cache
+
+    config = _load_config(args)
+    cache = open_find_cache(config)
+    if cache is None:
+        _error("The C-FIND cache is disabled (find_cache.ttl_hours: 0)")
+    try:
+        removed = cache.clear(args.accessions or None)
+    finally:
+        cache.close()
+    _output({"status": "ok", "removed": removed}, args.human)
+
+
 def _cmd_audit(args: argparse.Namespace) -> None:
     from .audit import query_audit
 
@@ -278,5 +830,161 @@ def _cmd_audit(args: argparse.Namespace) -> None:
     )
 
 
+def _cmd_metrics(args: argparse.Namespace) -> None:
+    from .metrics import TEXTFILE_NAME, LoadTotals, write_textfile
+
+    config = _load_config(args)
+    text = LoadTotals.from_audit(config.output.base_dir).render()
+    if not args.write:
+        sys.stdout.write(text)
+        return
+    if config.metrics.textfile_dir is None:
+        _error("No metrics.textfile_dir configured")
+    path = config.metrics.textfile_dir / TEXTFILE_NAME
+    write_textfile(path, text)
+    _output({"status": "ok", "path": str(path)}, args.human)
+
+
+def _cmd_fake_pacs(args: argparse.Namespace) -> None:
+    import signal
+    import time
+
+    from .fakepacs import FakePacs, Faults
+
+    if not args.root.is_dir():
+        _error(f"Not a directory: {args.root}")
+    destinations = {}
+    for spec in args.destination:
+        try:
+            ae_title, address = spec.split("=", 1)
+            host, port = address.rsplit(":", 1)
+            destinations[ae_title] = (host, int(port))
+        except ValueError:
+            _error(f"Invalid --destination {spec!r} (expected AE=HOST:PORT)")
+
+    pacs = FakePacs(
+        args.root,
+        ae_title=args.ae_title,
+        port=args.port,
+        host=args.host,
+        destinations=destinations,
+        latency=args.latency_ms / 1000,
+        bandwidth=(
+            args.bandwidth_mbps * 1_000_000 / 8 if args.bandwidth_mbps else None
+        ),
+        max_associations=args.max_associations,
+        max_retrieves=args.max_retrieves,
+        faults=Faults(
+            find_status=args.find_status,
+            retrieve_status=args.retrieve_status,
+            fail_after=args.fail_after,
+            drop_after=args.drop_after,
+            times=args.fault_times,
+        ),
+    )
+    try:
+        pacs.start()
+    except OSError as e:
+        _error(f"Cannot listen on {args.host}:{args.port}: {e}")
+
+    def _terminate(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, _terminate)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pacs.stop()
+
+
+def _cmd_bench(args: argparse.Namespace) -> None:
+    import tempfile
+
+    from . import bench
+
+    if args.bench_command == "compare":
+        _bench_compare(args, _read_results(args.current))
+        return
+
+    try:
+        if args.bench_command == "anonymize":
+            results = bench.run_micro(
+                Path(tempfile.mkdtemp(prefix="rad-loader-bench-")),
+                cases=args.cases,
+                functions=args.functions,
+                iterations=args.iterations,
+            )
+        else:
+            base = Config.from_file(args.config) if args.config.exists() else None
+            results = bench.run(
+                args.size,
+                args.work_dir or Path(tempfile.gettempdir()) / "rad-loader-bench",
+                base=base,
+                names=args.cohorts,
+                repeat=args.repeat,
+                latency=args.latency_ms / 1000,
+                bandwidth=(
+                    args.bandwidth_mbps * 1_000_000 / 8
+                    if args.bandwidth_mbps else None
+                ),
+            )
+    except (ValueError, RuntimeError) as e:
+        _error(str(e))
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+    if args.baseline:
+        _bench_compare(args, results)
+    elif not args.output:
+        _output(results, args.human)
+    failed = [n for n, r in results["results"].items() if r.get("errors")]
+    if failed:
+        _error(f"Studies failed to load in: {', '.join(failed)}")
+
+
+def _bench_compare(args: argparse.Namespace, current: dict) -> None:
+    """Print current vs --baseline; exit 1 on a regression."""
+    from dataclasses import asdict
+
+    from . import bench
+
+    thresholds = {}
+    for spec in args.threshold:
+        metric, _, percent = spec.partition("=")
+        try:
+            thresholds[metric] = float(percent) / 100
+        except ValueError:
+            _error(f"Invalid --threshold {spec!r} (expected METRIC=PCT)")
+    baseline = _read_results(args.baseline)
+    changes = bench.compare(baseline, current, thresholds)
+    notes = bench.mismatches(baseline, current)
+    regressions = [c for c in changes if c.regression]
+    if args.human:
+        for note in notes:
+            print(f"Note: {note}")
+        print(bench.format_changes(changes))
+    else:
+        _output({
+            "status": "regression" if regressions else "ok",
+            "baseline": baseline.get("commit"),
+            "current": current.get("commit"),
+            "notes": notes,
+            "changes": [
+                {**asdict(c), "change": round(c.change, 4)} for c in changes
+            ],
+        }, False)
+    if regressions:
+        sys.exit(1)
+
+
+def _read_results(path: Path) -> dict:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError) as e:
+        _error(f"Cannot read benchmark results {path}: {e}")
+
+
 if __name__ == "__main__":
     main()
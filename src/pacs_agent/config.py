@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
+from datetime import time
 from pathlib import Path
 
 import yaml
@@ -13,17 +14,147 @@ class PacsConfig:
     host: str
     port: int
     ae_title: str  # PACS AE title (called AE)
+    retrieval: str = "c-move"  # "c-move" (PACS connects to our SCP) or "c-get"
 
 
 @dataclass
 class ScpConfig:
     ae_title: str = "MY-LOADER"  # Our AE title
     port: int = 9012
+    writer_threads: int = 0  # 0 = anonymize and write in the C-STORE handler
+    anonymize_processes: int = 0  # >0: decode/anonymize/write in worker processes
+    max_pending_mb: int = 512  # Cap on queued, not yet written datasets
+    stream_to_disk: bool = False  # Spool C-STOREs to disk, not RAM
 
 
 @dataclass
 class OutputConfig:
     base_dir: Path = field(default_factory=lambda: Path("/data/research"))
+    key_store: str = "csv"  # "csv" (key.csv) or "sqlite" (key.db + key.csv export)
+
+
+@dataclass
+class SeriesFilter:
+    """Which series of a study to retrieve (all criteria must match)."""
+
+    modalities: list[str] = field(default_factory=list)  # e.g. ["CT"]
+    description: str | None = None  # regex searched in SeriesDescription
+    min_instances: int = 0  # NumberOfSeriesRelatedInstances at least
+    image_type: list[str] = field(default_factory=list)  # values all present
+
+    @property
+    def active(self) -> bool:
+        return bool(
+            self.modalities or self.description
+            or self.min_instances or self.image_type
+        )
+
+    @classmethod
+    def from_dict(cls, raw: dict | None) -> SeriesFilter:
+        raw = raw or {}
+        return cls(
+            modalities=[m.upper() for m in raw.get("modalities", []) or []],
+            description=raw.get("description") or None,
+            min_instances=int(raw.get("min_instances", 0) or 0),
+            image_type=[t.upper() for t in raw.get("image_type", []) or []],
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "modalities": self.modalities,
+            "description": self.description,
+            "min_instances": self.min_instances,
+            "image_type": self.image_type,
+        }
+
+
+@dataclass
+class TimeCap:
+    """At most ``limit`` parallel moves between start and end (local time)."""
+
+    start: time
+    end: time  # before start: the window runs past midnight
+    limit: int  # 0 pauses retrieval in the window
+
+    def covers(self, t: time) -> bool:
+        if self.start <= self.end:
+            return self.start <= t < self.end
+        return t >= self.start or t < self.end
+
+
+@dataclass
+class ThrottleConfig:
+    """Adaptive (AIMD) limit on parallel study moves, see throttle.py."""
+
+    enabled: bool = False
+    floor: int = 1  # Never fewer parallel moves than this
+    ceiling: int = 4  # Never more parallel moves than this
+    increase: float = 1.0  # Added per round of healthy moves
+    decrease: float = 0.5  # Limit multiplied by this on trouble
+    spike_factor: float = 2.0  # Latency above factor × baseline is a spike
+    cooldown: float = 30.0  # Seconds between two decreases
+    caps: list[TimeCap] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, raw: dict | None) -> ThrottleConfig:
+        raw = raw or {}
+        cfg = cls(
+            enabled=bool(raw.get("enabled", False)),
+            floor=int(raw.get("floor", 1)),
+            ceiling=int(raw.get("ceiling", 4)),
+            increase=float(raw.get("increase", 1.0)),
+            decrease=float(raw.get("decrease", 0.5)),
+            spike_factor=float(raw.get("spike_factor", 2.0)),
+            cooldown=float(raw.get("cooldown", 30.0)),
+            caps=[
+                TimeCap(
+                    start=_clock(c["from"]),
+                    end=_clock(c["to"]),
+                    limit=int(c["max"]),
+                )
+                for c in raw.get("caps", []) or []
+            ],
+        )
+        if cfg.floor < 1 or cfg.ceiling < cfg.floor:
+            raise ValueError("load.throttle needs 1 <= floor <= ceiling")
+        if not 0 < cfg.decrease < 1:
+            raise ValueError("load.throttle.decrease must be between 0 and 1")
+        return cfg
+
+
+def _clock(value: str | int) -> time:
+    """Parse "HH:MM" (YAML 1.1 reads unquoted 17:00 as the int 1020)."""
+    if isinstance(value, int):
+        return time(value // 60, value % 60)
+    return time.fromisoformat(value)
+
+
+@dataclass
+class LoadConfig:
+    concurrency: int = 1  # Parallel C-MOVE associations
+    store_timeout: float = 30.0  # Max seconds to wait for trailing C-STOREs
+    prefetch: int = 0  # Accessions resolved (C-FIND) ahead of the C-MOVE
+    series_moves: int = 0  # >0: parallel SERIES-level C-MOVEs per study
+    series_filter: SeriesFilter = field(default_factory=SeriesFilter)
+    throttle: ThrottleConfig = field(default_factory=ThrottleConfig)
+    order: str = "file"  # file, smallest, largest or balanced (schedule.py)
+    disk_check: str = "off"  # Projected footprint vs free space: refuse, warn, off
+    disk_reserve_gb: float = 1.0  # Space to leave free in output.base_dir
+
+
+@dataclass
+class ServeConfig:
+    socket: Path | None = None  # Unix socket; default base_dir/rad-loader.sock
+
+
+@dataclass
+class FindCacheConfig:
+    ttl_hours: float = 0.0  # Reuse C-FIND results this long; 0 = no cache
+
+
+@dataclass
+class MetricsConfig:
+    textfile_dir: Path | None = None  # node-exporter textfile directory; None = off
 
 
 @dataclass
@@ -31,6 +162,15 @@ class Config:
     pacs: PacsConfig
     scp: ScpConfig
     output: OutputConfig
+    load: LoadConfig = field(default_factory=LoadConfig)
+    serve: ServeConfig = field(default_factory=ServeConfig)
+    find_cache: FindCacheConfig = field(default_factory=FindCacheConfig)
+    metrics: MetricsConfig = field(default_factory=MetricsConfig)
+
+    @property
+    def socket_path(self) -> Path:
+        """Unix socket of ``rad-loader serve``."""
+        return self.serve.socket or self.output.base_dir / "rad-loader.sock"
 
     @classmethod
     def from_file(cls, path: Path) -> Config:
@@ -42,17 +182,70 @@ class Config:
             host=pacs_raw["host"],
             port=int(pacs_raw["port"]),
             ae_title=pacs_raw["ae_title"],
+            retrieval=str(pacs_raw.get("retrieval", "c-move")).lower(),
         )
+        if pacs.retrieval not in ("c-move", "c-get"):
+            raise ValueError(
+                f"pacs.retrieval must be c-move or c-get, not {pacs.retrieval!r}"
+            )
 
         scp_raw = raw.get("scp", {})
         scp = ScpConfig(
             ae_title=scp_raw.get("ae_title", "MY-LOADER"),
             port=int(scp_raw.get("port", 9012)),
+            writer_threads=int(scp_raw.get("writer_threads", 0)),
+            anonymize_processes=int(scp_raw.get("anonymize_processes", 0)),
+            max_pending_mb=int(scp_raw.get("max_pending_mb", 512)),
+            stream_to_disk=bool(scp_raw.get("stream_to_disk", False)),
         )
 
         out_raw = raw.get("output", {})
         output = OutputConfig(
             base_dir=Path(out_raw.get("base_dir", "/data/research")),
+            key_store=str(out_raw.get("key_store", "csv")),
+        )
+
+        load_raw = raw.get("load", {})
+        disk_check = load_raw.get("disk_check", "off")
+        if disk_check is False:
+            disk_check = "off"  # YAML 1.1 reads an unquoted off as false
+        load = LoadConfig(
+            concurrency=int(load_raw.get("concurrency", 1)),
+            store_timeout=float(load_raw.get("store_timeout", 30.0)),
+            prefetch=int(load_raw.get("prefetch", 0)),
+            series_moves=int(load_raw.get("series_moves", 0)),
+            series_filter=SeriesFilter.from_dict(load_raw.get("series_filter")),
+            throttle=ThrottleConfig.from_dict(load_raw.get("throttle")),
+            order=str(load_raw.get("order", "file")).lower(),
+            disk_check=str(disk_check).lower(),
+            disk_reserve_gb=float(load_raw.get("disk_reserve_gb", 1.0)),
+        )
+        if load.disk_check not in ("refuse", "warn", "off"):
+            raise ValueError(
+                f"load.disk_check must be refuse, warn or off, not {load.disk_check!r}"
+            )
+        if load.order not in ("file", "smallest", "largest", "balanced"):
+            raise ValueError(
+                "load.order must be file, smallest, largest or balanced,"
+                f" not {load.order!r}"
+            )
+
+        serve_raw = raw.get("serve", {})
+        socket = serve_raw.get("socket")
+        serve = ServeConfig(socket=Path(socket) if socket else None)
+
+        cache_raw = raw.get("find_cache", {})
+        find_cache = FindCacheConfig(
+            ttl_hours=float(cache_raw.get("ttl_hours", 0.0)),
         )
 
-        return cls(pacs=pacs, scp=scp, output=output)
+        metrics_raw = raw.get("metrics", {}) or {}
+        textfile_dir = metrics_raw.get("textfile_dir")
+        metrics = MetricsConfig(
+            textfile_dir=Path(textfile_dir) if textfile_dir else None,
+        )
+
+        return cls(
+            pacs=pacs, scp=scp, output=output, load=load, serve=serve,
+            find_cache=find_cache, metrics=metrics,
+        )
@@ -0,0 +1,463 @@
+"""Stand-in PACS: a Query/Retrieve SCP serving a directory of DICOM files.
+
+For end-to-end tests and load tests of the loader without a hospital
+PACS (``rad-loader fake-pacs DIR`` or the ``fake_pacs`` test fixture).
+It answers C-ECHO and Study Root C-FIND (STUDY, SERIES and IMAGE
+level), C-MOVE and C-GET, from an index of the files built at start.
+
+It can be made to behave like a loaded or failing PACS:
+
+- ``latency`` seconds before each instance is sent, and a
+  ``bandwidth`` cap (bytes per second) on what it sends;
+- ``max_associations`` at once (more are rejected), and
+  ``max_retrieves`` C-MOVE/C-GETs at once (more are answered with
+  0xA702, out of resources);
+- ``Faults``: a status for every C-FIND, a status that ends each
+  retrieve after ``fail_after`` instances (0xA7xx, 0xC000, or 0xB000
+  for partial sub-operations), or an association aborted after
+  ``drop_after`` instances — for the first ``times`` operations, or
+  all of them.
+
+Like PACS servers, it sends with TCP_NODELAY, so the transfer rate
+is that of the loader, not of delayed ACKs.
+
+Not a PACS: no C-STORE SCP, no Patient Root, no relational queries.
+"""
+
+from __future__ import annotations
+
+import fnmatch
+import logging
+import socket
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator
+
+from pydicom import dcmread
+from pydicom.dataset import Dataset
+from pydicom.errors import InvalidDicomError
+from pydicom.uid import ExplicitVRLittleEndian, ImplicitVRLittleEndian
+from pynetdicom import AE, evt
+from pynetdicom.presentation import AllStoragePresentationContexts
+from pynetdicom.sop_class import (
+    StudyRootQueryRetrieveInformationModelFind,
+    StudyRootQueryRetrieveInformationModelGet,
+    StudyRootQueryRetrieveInformationModelMove,
+    Verification,
+)
+
+log = logging.getLogger(__name__)
+
+# Attributes indexed from each file, by level
+_STUDY_KEYWORDS = [
+    "PatientID",
+    "PatientName",
+    "PatientSex",
+    "PatientAge",
+    "AccessionNumber",
+    "StudyInstanceUID",
+    "StudyDate",
+    "StudyTime",
+    "StudyDescription",
+]
+_SERIES_KEYWORDS = [
+    "SeriesInstanceUID",
+    "SeriesNumber",
+    "Modality",
+    "SeriesDescription",
+    "ImageType",
+]
+_IMAGE_KEYWORDS = ["SOPInstanceUID", "SOPClassUID", "InstanceNumber"]
+
+# Query keys matched as lists of UIDs
+_UID_KEYWORDS = {"StudyInstanceUID", "SeriesInstanceUID", "SOPInstanceUID"}
+# Instances of a retrieve are grouped by these, per level
+_LEVEL_KEY = {
+    "STUDY": "StudyInstanceUID",
+    "SERIES": "SeriesInstanceUID",
+    "IMAGE": "SOPInstanceUID",
+}
+
+_STATUS_OUT_OF_RESOURCES = 0xA702  # Unable to perform sub-operations
+
+
+@dataclass
+class Faults:
+    """Failures to inject (each None: never)."""
+
+    find_status: int | None = None  # Answer C-FINDs with this status
+    retrieve_status: int | None = None  # End retrieves with this status...
+    fail_after: int = 0  # ...after sending this many instances
+    drop_after: int | None = None  # Abort the association after N instances
+    times: int | None = None  # Faulty operations (of each kind); None = all
+
+
+@dataclass
+class _Instance:
+    path: Path
+    size: int
+    attrs: dict[str, str] = field(default_factory=dict)
+
+
+class FakePacs:
+    """Query/Retrieve SCP over the DICOM files under a directory.
+
+    Args:
+        root: Directory searched (recursively) for DICOM files.
+        ae_title: Our AE title.
+        port: Port to listen on (0: any free port, see ``port``).
+        host: Address to listen on.
+        destinations: C-MOVE destinations, {AE title: (host, port)}.
+        latency: Seconds to wait before sending each instance.
+        bandwidth: Cap on bytes per second sent by one retrieve.
+        max_associations: Associations accepted at once.
+        max_retrieves: C-MOVE/C-GETs served at once (None: no limit).
+        faults: Failures to inject.
+
+    Usage:
+        pacs = FakePacs(root, destinations={"MY-LOADER": ("127.0.0.1", 9012)})
+        pacs.start()
+        ...  # point pacs.host/port/ae_title at pacs.port, "FAKEPACS"
+        pacs.stop()
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        ae_title: str = "FAKEPACS",
+        port: int = 0,
+        host: str = "127.0.0.1",
+        destinations: dict[str, tuple[str, int]] | None = None,
+        latency: float = 0.0,
+        bandwidth: float | None = None,
+        max_associations: int = 10,
+        max_retrieves: int | None = None,
+        faults: Faults | None = None,
+    ) -> None:
+        self.root = root
+        self.ae_title = ae_title
+        self.host = host
+        self.destinations = dict(destinations or {})
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.max_associations = max_associations
+        self.max_retrieves = max_retrieves
+        self.faults = faults or Faults()
+        self._port = port
+        self._server = None
+        self._instances: list[_Instance] = []
+        self._lock = threading.Lock()
+        self._retrieving = 0
+        # Operation counts, for tests and the fake-pacs log
+        self.finds = 0
+        self.retrieves = 0
+        self.instances_sent = 0
+        self.max_retrieves_in_flight = 0
+
+    @property
+    def port(self) -> int:
+        """Port the running server is bound to."""
+        if self._server is None:
+            return self._port
+        return self._server.server_address[1]
+
+    @property
+    def studies(self) -> int:
+        return len({i.attrs["StudyInstanceUID"] for i in self._instances})
+
+    def start(self) -> None:
+        """Index the directory and start serving in a background thread."""
+        self._instances = index_directory(self.root)
+        ae = AE(ae_title=self.ae_title)
+        ae.maximum_associations = self.max_associations
+        ae.add_supported_context(Verification)
+        ae.add_supported_context(StudyRootQueryRetrieveInformationModelFind)
+        ae.add_supported_context(StudyRootQueryRetrieveInformationModelMove)
+        ae.add_supported_context(StudyRootQueryRetrieveInformationModelGet)
+        # C-GET: the requestor takes the storage SCP role
+        held = self._storage_syntaxes()
+        for sop_class in dict.fromkeys(
+            [cx.abstract_syntax for cx in AllStoragePresentationContexts] + list(held)
+        ):
+            ae.add_supported_context(sop_class, scu_role=True, scp_role=True)
+        # C-MOVE: contexts proposed to the destination
+        for sop_class, syntaxes in sorted(held.items())[:128]:
+            ae.add_requested_context(sop_class, syntaxes)
+
+        self._server = ae.start_server(
+            (self.host, self._port),
+            block=False,
+            evt_handlers=[
+                (evt.EVT_C_FIND, self._handle_find),
+                (evt.EVT_C_MOVE, self._handle_move),
+                (evt.EVT_C_GET, self._handle_get),
+                (evt.EVT_CONN_OPEN, _no_delay),
+            ],
+        )
+        log.info(
+            "Fake PACS %s on %s:%d: %d studies, %d instances",
+            self.ae_title, self.host, self.port, self.studies,
+            len(self._instances),
+        )
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server = None
+            log.info(
+                "Fake PACS stopped: %d C-FINDs, %d retrieves, %d instances sent",
+                self.finds, self.retrieves, self.instances_sent,
+            )
+
+    def __enter__(self) -> FakePacs:
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _storage_syntaxes(self) -> dict[str, list[str]]:
+        syntaxes: dict[str, list[str]] = {}
+        for instance in self._instances:
+            sop_class = instance.attrs.get("SOPClassUID", "")
+            if not sop_class:
+                continue
+            ts = syntaxes.setdefault(
+                sop_class, [ExplicitVRLittleEndian, ImplicitVRLittleEndian],
+            )
+            file_ts = instance.attrs.get("TransferSyntaxUID", "")
+            if file_ts and file_ts not in ts:
+                ts.append(file_ts)
+        return syntaxes
+
+    # ── C-FIND ──────────────────────────────────────────────
+
+    def _handle_find(self, event: evt.Event) -> Iterator[tuple[int, Dataset | None]]:
+        with self._lock:
+            self.finds += 1
+            n = self.finds
+        status = self.faults.find_status
+        if status is not None and _faulty(n, self.faults.times):
+            yield status, None
+            return
+        query = event.identifier
+        for match in find(self._instances, query):
+            if event.is_cancelled:
+                yield 0xFE00, None
+                return
+            yield 0xFF00, match
+
+    # ── C-MOVE / C-GET ──────────────────────────────────────
+
+    def _handle_move(self, event: evt.Event) -> Iterator:
+        destination = self.destinations.get(event.move_destination.strip())
+        if destination is None:
+            log.warning("Unknown move destination %r", event.move_destination)
+            yield None, None
+            return
+        # Sub-association to the destination: sent over without delay too
+        yield (*destination, {"evt_handlers": [(evt.EVT_CONN_OPEN, _no_delay)]})
+        yield from self._retrieve(event)
+
+    def _handle_get(self, event: evt.Event) -> Iterator:
+        yield from self._retrieve(event)
+
+    def _retrieve(self, event: evt.Event) -> Iterator:
+        """Number of sub-operations, then (status, dataset) per instance."""
+        instances = retrieve(self._instances, event.identifier)
+        yield len(instances)
+        if not instances:
+            return
+
+        with self._lock:
+            self.retrieves += 1
+            n = self.retrieves
+            busy = (
+                self.max_retrieves is not None
+                and self._retrieving >= self.max_retrieves
+            )
+            if not busy:
+                self._retrieving += 1
+                self.max_retrieves_in_flight = max(
+                    self.max_retrieves_in_flight, self._retrieving,
+                )
+        if busy:
+            yield _STATUS_OUT_OF_RESOURCES, None
+            return
+
+        faulty = _faulty(n, self.faults.times)
+        try:
+            for sent, instance in enumerate(instances):
+                if event.is_cancelled:
+                    yield 0xFE00, None
+                    return
+                if faulty and self.faults.drop_after == sent:
+                    log.info("Dropping the association after %d instances", sent)
+                    event.assoc.abort()
+                    return
+                if faulty and self.faults.retrieve_status is not None:
+                    if self.faults.fail_after == sent:
+                        yield self.faults.retrieve_status, None
+                        return
+                self._pace(instance.size)
+                ds = dcmread(instance.path)
+                with self._lock:
+                    self.instances_sent += 1
+                yield 0xFF00, ds
+        finally:
+            with self._lock:
+                self._retrieving -= 1
+
+    def _pace(self, size: int) -> None:
+        """Wait as the configured latency and bandwidth would."""
+        delay = self.latency
+        if self.bandwidth:
+            delay += size / self.bandwidth
+        if delay > 0:
+            time.sleep(delay)
+
+
+def index_directory(root: Path) -> list[_Instance]:
+    """Index the DICOM files under root (other files are skipped).
+
+    Each instance carries its study and series attributes, plus the
+    counts a PACS computes (NumberOfStudyRelated*, ModalitiesInStudy,
+    NumberOfSeriesRelatedInstances), so every level is matched alike.
+    """
+    instances = []
+    for path in sorted(p for p in root.rglob("*") if p.is_file()):
+        try:
+            ds = dcmread(path, stop_before_pixels=True)
+        except (InvalidDicomError, OSError):
+            continue
+        if "StudyInstanceUID" not in ds or "SOPInstanceUID" not in ds:
+            continue
+        attrs = {}
+        for keyword in _STUDY_KEYWORDS + _SERIES_KEYWORDS + _IMAGE_KEYWORDS:
+            value = ds.get(keyword)
+            if value is None:
+                continue
+            if not isinstance(value, (str, bytes)) and hasattr(value, "__iter__"):
+                attrs[keyword] = "\\".join(str(v) for v in value)
+            else:
+                attrs[keyword] = str(value)
+        attrs.setdefault("SeriesInstanceUID", "")
+        meta = getattr(ds, "file_meta", None)
+        if meta is not None and "TransferSyntaxUID" in meta:
+            attrs["TransferSyntaxUID"] = str(meta.TransferSyntaxUID)
+        instances.append(_Instance(path, path.stat().st_size, attrs))
+
+    studies: dict[str, list[_Instance]] = {}
+    series: dict[str, int] = {}
+    for instance in instances:
+        studies.setdefault(instance.attrs["StudyInstanceUID"], []).append(instance)
+        uid = instance.attrs["SeriesInstanceUID"]
+        series[uid] = series.get(uid, 0) + 1
+    for members in studies.values():
+        modalities = sorted({
+            i.attrs["Modality"] for i in members if i.attrs.get("Modality")
+        })
+        sop_classes = sorted({
+            i.attrs["SOPClassUID"] for i in members if i.attrs.get("SOPClassUID")
+        })
+        study_series = {i.attrs["SeriesInstanceUID"] for i in members}
+        for instance in members:
+            instance.attrs["ModalitiesInStudy"] = "\\".join(modalities)
+            instance.attrs["SOPClassesInStudy"] = "\\".join(sop_classes)
+            instance.attrs["NumberOfStudyRelatedSeries"] = str(len(study_series))
+            instance.attrs["NumberOfStudyRelatedInstances"] = str(len(members))
+            instance.attrs["NumberOfSeriesRelatedInstances"] = str(
+                series[instance.attrs["SeriesInstanceUID"]]
+            )
+    return instances
+
+
+def find(instances: list[_Instance], query: Dataset) -> list[Dataset]:
+    """C-FIND responses: one per matching study, series or instance."""
+    level = str(query.get("QueryRetrieveLevel", "STUDY"))
+    key = _LEVEL_KEY.get(level)
+    if key is None:
+        return []
+    keys = _query_keys(query)
+    matches: dict[str, _Instance] = {}
+    for instance in instances:
+        if _matches(instance, keys):
+            matches.setdefault(instance.attrs.get(key, ""), instance)
+
+    responses = []
+    for instance in matches.values():
+        ds = Dataset()
+        ds.QueryRetrieveLevel = level
+        for keyword in keys:
+            setattr(ds, keyword, instance.attrs.get(keyword, ""))
+        responses.append(ds)
+    return responses
+
+
+def retrieve(instances: list[_Instance], query: Dataset) -> list[_Instance]:
+    """Instances a C-MOVE/C-GET identifier asks for (unique keys only)."""
+    keys = {
+        keyword: value
+        for keyword, value in _query_keys(query).items()
+        if keyword in _UID_KEYWORDS and value
+    }
+    if not keys:
+        return []
+    return [i for i in instances if _matches(i, keys)]
+
+
+def _query_keys(query: Dataset) -> dict[str, str]:
+    """Query keys and their values ("" = return, do not match)."""
+    keys = {}
+    for elem in query:
+        if elem.keyword in ("QueryRetrieveLevel", "SpecificCharacterSet", ""):
+            continue
+        value = elem.value
+        if value is None:
+            value = ""
+        elif not isinstance(value, (str, bytes)) and hasattr(value, "__iter__"):
+            value = "\\".join(str(v) for v in value)
+        keys[elem.keyword] = str(value)
+    return keys
+
+
+def _matches(instance: _Instance, keys: dict[str, str]) -> bool:
+    for keyword, wanted in keys.items():
+        if not wanted or wanted == "*":
+            continue
+        have = instance.attrs.get(keyword, "")
+        if keyword in _UID_KEYWORDS:
+            if have not in wanted.split("\\"):
+                return False
+        elif keyword == "ModalitiesInStudy":
+            if not set(wanted.split("\\")) & set(have.split("\\")):
+                return False
+        elif keyword.endswith("Date") and "-" in wanted:
+            first, _, last = wanted.partition("-")
+            if not have or (first and have < first) or (last and have > last):
+                return False
+        elif "*" in wanted or "?" in wanted:
+            if not fnmatch.fnmatchcase(have, wanted):
+                return False
+        elif have != wanted:
+            return False
+    return True
+
+
+def _no_delay(event: evt.Event) -> None:
+    """Disable Nagle's algorithm on a new connection.
+
+    A C-STORE is written as several small PDUs; with Nagle, each
+    instance then waits on the receiver's delayed ACK (~40 ms), which
+    caps a retrieve at ~20 instances/s whatever the loader does.
+    """
+    sock = event.assoc.dul.socket
+    if sock is not None and sock.socket is not None:
+        sock.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+
+def _faulty(n: int, times: int | None) -> bool:
+    """Whether the n-th operation (1-based) gets the injected fault."""
+    return times is None or n <= times
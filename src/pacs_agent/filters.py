@@ -0,0 +1,91 @@
+"""Series selection: match SERIES-level C-FIND results against a filter.
+
+Evaluated before any C-MOVE, so unwanted series (scouts, dose reports,
+secondary captures, ...) are never transferred.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+
+from .config import SeriesFilter
+
+log = logging.getLogger(__name__)
+
+
+class NoMatchingSeries(Exception):
+    """No series of a study passed the series filter."""
+
+
+def select_series(
+    series: list[dict[str, str]], flt: SeriesFilter,
+) -> list[dict[str, str]]:
+    """Return the series that match every criterion of flt.
+
+    A criterion whose attribute the PACS did not return at all (e.g.
+    ImageType, optional at series level) does not exclude the series.
+
+    Args:
+        series: Safe series fields from find_series().
+        flt: Series filter.
+
+    Returns:
+        Matching series, in input order.
+    """
+    pattern = re.compile(flt.description, re.IGNORECASE) if flt.description else None
+    selected = []
+    for s in series:
+        reason = _mismatch(s, flt, pattern)
+        if reason is None:
+            selected.append(s)
+        else:
+            log.debug(
+                "Skipping series %s (%s): %s",
+                s.get("SeriesNumber", "?"), s.get("SeriesDescription", ""), reason,
+            )
+    return selected
+
+
+def check_filter(flt: SeriesFilter) -> str | None:
+    """Validation error of a series filter, or None."""
+    if flt.description:
+        try:
+            re.compile(flt.description)
+        except re.error as e:
+            return f"Invalid series description pattern: {e}"
+    if flt.min_instances < 0:
+        return "Minimum instance count cannot be negative"
+    return None
+
+
+def _mismatch(
+    s: dict[str, str], flt: SeriesFilter, pattern: re.Pattern | None,
+) -> str | None:
+    """Why a series does not match, or None if it does."""
+    modality = s.get("Modality")
+    if flt.modalities and modality is not None:
+        if modality.upper() not in flt.modalities:
+            return f"modality {modality}"
+
+    description = s.get("SeriesDescription")
+    if pattern is not None and description is not None:
+        if not pattern.search(description):
+            return "description"
+
+    count = s.get("NumberOfSeriesRelatedInstances")
+    if flt.min_instances and count:
+        try:
+            if int(count) < flt.min_instances:
+                return f"{count} instances"
+        except ValueError:
+            pass
+
+    image_type = s.get("ImageType")
+    if flt.image_type and image_type:
+        values = {v.strip().upper() for v in image_type.split("\\")}
+        missing = [v for v in flt.image_type if v not in values]
+        if missing:
+            return f"image type lacks {'/'.join(missing)}"
+
+    return None
@@ -0,0 +1,147 @@
+"""Local cache of study-level C-FIND results.
+
+``load --dry-run`` on a list, review, then ``load`` on the same list
+would query every accession twice. Results are kept in SQLite at
+base_dir/find_cache.db, keyed by PACS and accession number, and reused
+for ``find_cache.ttl_hours`` (0 disables the cache).
+
+Only the safe fields returned by the C-FIND functions are stored, never
+PHI. Accessions the PACS did not find are not cached, so a study that
+arrives later is picked up by the next query.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable
+
+from .config import Config
+
+log = logging.getLogger(__name__)
+
+
+def open_find_cache(config: Config, refresh: bool = False) -> FindCache | None:
+    """Open the C-FIND cache of base_dir, or None if it is disabled.
+
+    Args:
+        config: Application configuration.
+        refresh: Ignore cached results (still store fresh ones).
+    """
+    if config.find_cache.ttl_hours <= 0:
+        return None
+    pacs = f"{config.pacs.ae_title}@{config.pacs.host}:{config.pacs.port}"
+    return FindCache(
+        config.output.base_dir / "find_cache.db",
+        pacs,
+        ttl=config.find_cache.ttl_hours * 3600,
+        refresh=refresh,
+    )
+
+
+class FindCache:
+    """C-FIND results by accession number, with hit/miss counts.
+
+    Safe to share between threads.
+
+    Usage:
+        cache = FindCache(db_path, "PACS@host:104", ttl=86400)
+        studies = cache.find(accession, session.find)
+        cache.stats()   # {"hits": ..., "misses": ...}
+        cache.close()
+    """
+
+    def __init__(
+        self, db_path: Path, pacs: str, ttl: float, refresh: bool = False,
+    ) -> None:
+        self.pacs = pacs
+        self.ttl = ttl
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS studies (
+            pacs TEXT NOT NULL,
+            accession TEXT NOT NULL,
+            fetched REAL NOT NULL,
+            results TEXT NOT NULL,
+            PRIMARY KEY (pacs, accession)
+        )""")
+        # Drop expired entries of every PACS
+        self._conn.execute(
+            "DELETE FROM studies WHERE fetched<?", (time.time() - ttl,),
+        )
+        self._conn.commit()
+
+    def find(
+        self, accession: str, query: Callable[[str], list[dict[str, str]]],
+    ) -> list[dict[str, str]]:
+        """Cached results of accession, else query(accession) (then cached)."""
+        studies = self.get(accession)
+        if studies is None:
+            studies = query(accession)
+            self.put(accession, studies)
+        return studies
+
+    def get(self, accession: str) -> list[dict[str, str]] | None:
+        """Unexpired results of accession, or None (counted as a miss)."""
+        row = None
+        if not self.refresh:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT results FROM studies"
+                    " WHERE pacs=? AND accession=? AND fetched>=?",
+                    (self.pacs, accession, time.time() - self.ttl),
+                ).fetchone()
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, accession: str, studies: list[dict[str, str]]) -> None:
+        """Store the results of accession (not-found results are skipped)."""
+        if not studies:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO studies (pacs,accession,fetched,results)"
+                " VALUES (?,?,?,?)",
+                (self.pacs, accession, time.time(), json.dumps(studies)),
+            )
+            self._conn.commit()
+
+    def clear(self, accessions: list[str] | None = None) -> int:
+        """Remove cached results (of the given accessions, or all).
+
+        Returns:
+            Number of entries removed.
+        """
+        with self._lock:
+            if accessions is None:
+                n = self._conn.execute(
+                    "DELETE FROM studies WHERE pacs=?", (self.pacs,),
+                ).rowcount
+            else:
+                n = self._conn.executemany(
+                    "DELETE FROM studies WHERE pacs=? AND accession=?",
+                    [(self.pacs, ac) for ac in accessions],
+                ).rowcount
+            self._conn.commit()
+        return n
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,219 @@
+"""Load journal: checkpoints of studies being retrieved.
+
+An append-only JSON-lines file at project_dir/journal.jsonl records,
+for every study in flight, its case ID and StudyInstanceUID and each
+instance the SCP has written:
+
+    {"event": "start", "case_id": ..., "accession": ..., "study_uid": ...}
+    {"event": "stored", "case_id": ..., "series_uid": ..., "sop_uid": ...,
+     "path": "case0001/series01/00001.dcm"}
+    {"event": "done", "case_id": ...}
+
+A study whose "done" record is missing was interrupted. The next load
+of its accession reuses the case ID and retrieves only the instances
+not journaled. Completed cases are dropped when the journal is next
+opened; a partial last line (crash mid-write) is ignored.
+
+Durability: every record is flushed to the OS as it is written, so all
+of them survive the process dying. Records are fsynced only at study
+boundaries ("start", "done", and ``sync`` when a study stops short of
+done), so a power loss can drop the "stored" records of the studies in
+flight since then; their instances are simply retrieved again. The
+instance files themselves are not fsynced.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class JournalCase:
+    """An interrupted (or running) study retrieval."""
+
+    case_id: str
+    accession: str
+    study_uid: str
+    # {SOPInstanceUID: (SeriesInstanceUID, path relative to project dir)}
+    stored: dict[str, tuple[str, str]] = field(default_factory=dict)
+
+
+class LoadJournal:
+    """Per-project journal of in-progress studies.
+
+    Usage:
+        journal = LoadJournal(project_dir)
+        case = journal.pending(accession)   # interrupted earlier?
+        journal.start(case_id, accession, study_uid)
+        journal.stored(case_id, series_uid, sop_uid, path)  # per instance
+        journal.done(case_id)      # or journal.sync() to leave it resumable
+        journal.close()
+    """
+
+    def __init__(self, project_dir: Path) -> None:
+        self.project_dir = project_dir
+        self.path = project_dir / "journal.jsonl"
+        self._root = project_dir.resolve()
+        self._cases: dict[str, JournalCase] = {}  # by case_id
+        self._lock = threading.Lock()
+        self._file = None
+        if self.path.exists() and self._replay():
+            self._compact()
+
+    def pending(self, accession: str) -> JournalCase | None:
+        """The interrupted case of an accession, if any."""
+        with self._lock:
+            for case in self._cases.values():
+                if case.accession == accession:
+                    return case
+        return None
+
+    def cases(self) -> list[JournalCase]:
+        """The unfinished studies."""
+        with self._lock:
+            return list(self._cases.values())
+
+    def case_ids(self) -> list[str]:
+        """Case IDs held by unfinished studies (not to be reassigned)."""
+        with self._lock:
+            return list(self._cases)
+
+    def start(self, case_id: str, accession: str, study_uid: str) -> None:
+        """Record that a study is being retrieved into case_id."""
+        with self._lock:
+            case = self._cases.get(case_id)
+            if case is None or case.study_uid != study_uid:
+                self._cases[case_id] = JournalCase(case_id, accession, study_uid)
+            self._append(
+                {
+                    "event": "start",
+                    "case_id": case_id,
+                    "accession": accession,
+                    "study_uid": study_uid,
+                },
+                sync=True,
+            )
+
+    def stored(
+        self, case_id: str, series_uid: str, sop_uid: str, path: Path,
+    ) -> None:
+        """Record an instance written to path.
+
+        path is under the project dir (absolute, or relative to the
+        working directory when base_dir is relative) or already
+        project-relative; it is journaled project-relative.
+        """
+        try:
+            rel = path.resolve().relative_to(self._root)
+        except ValueError:
+            if path.is_absolute():
+                raise
+            rel = path
+        with self._lock:
+            case = self._cases.get(case_id)
+            if case is not None and sop_uid:
+                case.stored[sop_uid] = (series_uid, str(rel))
+            self._append(
+                {
+                    "event": "stored",
+                    "case_id": case_id,
+                    "series_uid": series_uid,
+                    "sop_uid": sop_uid,
+                    "path": str(rel),
+                }
+            )
+
+    def done(self, case_id: str) -> None:
+        """Record that a study finished (its key entry is written)."""
+        with self._lock:
+            self._cases.pop(case_id, None)
+            self._append({"event": "done", "case_id": case_id}, sync=True)
+
+    def sync(self) -> None:
+        """Force the records written so far to disk."""
+        with self._lock:
+            if self._file is not None:
+                os.fsync(self._file.fileno())
+
+    def abandon(self, case_id: str) -> None:
+        """Forget a study that stored nothing (nothing to resume)."""
+        self.done(case_id)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _append(self, record: dict, sync: bool = False) -> None:
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "a")
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+        if sync:
+            os.fsync(self._file.fileno())
+
+    def _replay(self) -> bool:
+        """Rebuild in-progress cases; True if the file should be compacted."""
+        compact = False
+        with open(self.path) as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    log.warning("Ignoring partial last line in %s", self.path)
+                    compact = True
+                    break
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    log.warning("Ignoring bad line in %s", self.path)
+                    compact = True
+                    continue
+                event = record.get("event")
+                case_id = record.get("case_id", "")
+                if event == "start":
+                    case = self._cases.get(case_id)
+                    if case is None or case.study_uid != record["study_uid"]:
+                        self._cases[case_id] = JournalCase(
+                            case_id, record["accession"], record["study_uid"],
+                        )
+                elif event == "stored":
+                    case = self._cases.get(case_id)
+                    if case is not None and record.get("sop_uid"):
+                        case.stored[record["sop_uid"]] = (
+                            record["series_uid"], record["path"],
+                        )
+                elif event == "done":
+                    self._cases.pop(case_id, None)
+                    compact = True
+        return compact
+
+    def _compact(self) -> None:
+        """Rewrite the journal with only the unfinished cases."""
+        tmp = self.path.with_name(f".{self.path.name}.tmp")
+        with open(tmp, "w") as f:
+            for case in self._cases.values():
+                f.write(json.dumps({
+                    "event": "start",
+                    "case_id": case.case_id,
+                    "accession": case.accession,
+                    "study_uid": case.study_uid,
+                }) + "\n")
+                for sop_uid, (series_uid, rel) in case.stored.items():
+                    f.write(json.dumps({
+                        "event": "stored",
+                        "case_id": case.case_id,
+                        "series_uid": series_uid,
+                        "sop_uid": sop_uid,
+                        "path": rel,
+                    }) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
@@ -1,15 +1,25 @@
 """Key CSV file handling.
 
 The key file maps case IDs to accession numbers and study metadata.
-Written after each successful load, read to determine next case ID.
+One row is appended (and fsynced) after each successful load; the
+file is read to determine the next case ID. Full rewrites happen only
+on explicit compaction, via a temporary file and an atomic rename.
+
+A crash mid-append can leave a partial last line. Readers ignore it
+and the next append cuts it off before writing.
 """
 
 from __future__ import annotations
 
 import csv
+import io
+import logging
+import os
 from dataclasses import dataclass
 from pathlib import Path
 
+log = logging.getLogger(__name__)
+
 
 @dataclass
 class KeyEntry:
@@ -38,42 +48,134 @@ def read_key_file(path: Path) -> list[KeyEntry]:
     if not path.exists():
         return []
 
-    entries = []
     with open(path, newline="") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            entries.append(
-                KeyEntry(
-                    case_id=row["case_id"],
-                    accession=row["accession"],
-                    study_date=row.get("study_date", ""),
-                    modality=row.get("modality", ""),
-                    description=row.get("description", ""),
-                    series_count=int(row.get("series_count", 0)),
-                    image_count=int(row.get("image_count", 0)),
-                )
+        text = f.read()
+    complete = _complete_length(text)
+    if complete < len(text):
+        log.warning("Ignoring partial last line in %s", path)
+        text = text[:complete]
+
+    entries = []
+    reader = csv.DictReader(io.StringIO(text, newline=""))
+    for row in reader:
+        entries.append(
+            KeyEntry(
+                case_id=row["case_id"],
+                accession=row["accession"],
+                study_date=row.get("study_date", ""),
+                modality=row.get("modality", ""),
+                description=row.get("description", ""),
+                series_count=int(row.get("series_count", 0)),
+                image_count=int(row.get("image_count", 0)),
             )
+        )
     return entries
 
 
 def write_key_file(path: Path, entries: list[KeyEntry]) -> None:
-    """Write key.csv with all entries."""
+    """Rewrite key.csv with all entries (atomic: temp file + rename).
+
+    Use for compaction only; loads add rows with append_key_entry().
+    """
     path.parent.mkdir(parents=True, exist_ok=True)
-    with open(path, "w", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
-        writer.writeheader()
-        for e in entries:
-            writer.writerow(
-                {
-                    "case_id": e.case_id,
-                    "accession": e.accession,
-                    "study_date": e.study_date,
-                    "modality": e.modality,
-                    "description": e.description,
-                    "series_count": e.series_count,
-                    "image_count": e.image_count,
-                }
-            )
+    buf = io.StringIO(newline="")
+    writer = csv.DictWriter(buf, fieldnames=FIELDNAMES)
+    writer.writeheader()
+    for e in entries:
+        writer.writerow(_row(e))
+
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, "w", newline="") as f:
+        f.write(buf.getvalue())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    _fsync_dir(path.parent)
+
+
+def append_key_entry(path: Path, entry: KeyEntry) -> None:
+    """Append one row to key.csv and fsync it.
+
+    Writes the header if the file is new or empty, and first truncates
+    a partial last line left by an interrupted append. The row goes out
+    in a single write() on an O_APPEND descriptor.
+
+    Args:
+        path: key.csv path.
+        entry: Entry to record.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    buf = io.StringIO(newline="")
+    writer = csv.DictWriter(buf, fieldnames=FIELDNAMES)
+
+    fd = os.open(path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        size = os.fstat(fd).st_size
+        if size == 0:
+            writer.writeheader()
+        else:
+            _truncate_partial(fd, path, size)
+        writer.writerow(_row(entry))
+        os.write(fd, buf.getvalue().encode())
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    if size == 0:
+        _fsync_dir(path.parent)
+
+
+def compact_key_file(path: Path) -> list[KeyEntry]:
+    """Rewrite key.csv from its complete rows, dropping any partial line.
+
+    Returns:
+        The entries kept.
+    """
+    entries = read_key_file(path)
+    write_key_file(path, entries)
+    return entries
+
+
+def _row(e: KeyEntry) -> dict:
+    return {
+        "case_id": e.case_id,
+        "accession": e.accession,
+        "study_date": e.study_date,
+        "modality": e.modality,
+        "description": e.description,
+        "series_count": e.series_count,
+        "image_count": e.image_count,
+    }
+
+
+def _complete_length(text: str) -> int:
+    """Length of text up to and including its last complete CSV row."""
+    if not text or text.endswith("\n"):
+        return len(text)
+    return text.rfind("\n") + 1
+
+
+def _truncate_partial(fd: int, path: Path, size: int) -> None:
+    """Cut a partial last line (no trailing newline) off an open key file."""
+    data = os.pread(fd, size, 0)
+    if data.endswith(b"\n"):
+        return
+    keep = data.rfind(b"\n") + 1
+    log.warning("Truncating partial last line in %s", path)
+    os.ftruncate(fd, keep)
+
+
+def _fsync_dir(path: Path) -> None:
+    """Persist a directory entry (new or renamed file)."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
 
 
 def next_case_id(entries: list[KeyEntry]) -> str:
@@ -0,0 +1,203 @@
+"""Key store backends: key.csv or an indexed SQLite table.
+
+Both backends expose the same small API over KeyEntry rows:
+
+- ``has_accession`` and ``last_case_number`` for the loader's skip
+  check and case ID allocation,
+- ``add`` to record a loaded study,
+- ``entries`` / ``export_csv`` for status and the researcher-facing
+  key.csv.
+
+The CSV backend parses key.csv once and appends rows (see keyfile.py).
+The SQLite backend keeps project_dir/key.db with unique constraints on
+case_id and accession and an index on the case number, so lookups and
+ID allocation do not scan the table. key.csv is regenerated from it by
+``export_csv``.
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+
+from .keyfile import (
+    KeyEntry,
+    append_key_entry,
+    read_key_file,
+    write_key_file,
+)
+
+log = logging.getLogger(__name__)
+
+BACKENDS = ("csv", "sqlite")
+
+
+def open_key_store(project_dir: Path, backend: str = "csv"):
+    """Open the key store of a project.
+
+    Args:
+        project_dir: Project directory (holds key.csv / key.db).
+        backend: "csv" or "sqlite".
+
+    Returns:
+        CsvKeyStore or SqliteKeyStore.
+    """
+    if backend == "csv":
+        return CsvKeyStore(project_dir / "key.csv")
+    if backend == "sqlite":
+        return SqliteKeyStore(project_dir / "key.db", project_dir / "key.csv")
+    raise ValueError(f"Unknown key store {backend!r} (expected one of {BACKENDS})")
+
+
+def case_number(case_id: str) -> int | None:
+    """Numeric part of a "caseNNNN" ID, None for non-standard IDs."""
+    if case_id.startswith("case"):
+        try:
+            return int(case_id[4:])
+        except ValueError:
+            return None
+    return None
+
+
+class CsvKeyStore:
+    """key.csv, parsed once and appended to per study."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._entries = read_key_file(path)
+        self._accessions = {e.accession for e in self._entries}
+        self._last = max(
+            (n for e in self._entries if (n := case_number(e.case_id))),
+            default=0,
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def entries(self) -> list[KeyEntry]:
+        return list(self._entries)
+
+    def has_accession(self, accession: str) -> bool:
+        return accession in self._accessions
+
+    def last_case_number(self) -> int:
+        return self._last
+
+    def add(self, entry: KeyEntry) -> None:
+        append_key_entry(self.path, entry)
+        self._entries.append(entry)
+        self._accessions.add(entry.accession)
+        self._last = max(self._last, case_number(entry.case_id) or 0)
+
+    def export_csv(self, path: Path | None = None) -> None:
+        """Write the entries as CSV (a compacted copy of key.csv)."""
+        write_key_file(path or self.path, self._entries)
+
+    def close(self) -> None:
+        pass
+
+
+class SqliteKeyStore:
+    """Indexed key table in key.db; key.csv is an export.
+
+    On first open, rows of an existing key.csv are imported.
+    """
+
+    def __init__(self, path: Path, csv_path: Path) -> None:
+        self.path = path
+        self.csv_path = csv_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        is_new = not path.exists()
+        # Loader threads share the connection; calls are serialized here
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS keys (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            case_id TEXT NOT NULL UNIQUE,
+            case_num INTEGER,
+            accession TEXT NOT NULL UNIQUE,
+            study_date TEXT,
+            modality TEXT,
+            description TEXT,
+            series_count INTEGER,
+            image_count INTEGER
+        )""")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS keys_case_num ON keys (case_num)"
+        )
+        self._conn.commit()
+        if is_new and csv_path.exists():
+            entries = read_key_file(csv_path)
+            log.info("Importing %d rows from %s", len(entries), csv_path)
+            for e in entries:
+                try:
+                    self._insert(e)
+                except sqlite3.IntegrityError:
+                    log.warning("Skipping duplicate key row %s", e.case_id)
+            self._conn.commit()
+        self._last = self._conn.execute(
+            "SELECT COALESCE(MAX(case_num), 0) FROM keys"
+        ).fetchone()[0]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM keys").fetchone()[0]
+
+    def entries(self) -> list[KeyEntry]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT case_id,accession,study_date,modality,description,"
+                "series_count,image_count FROM keys ORDER BY id"
+            ).fetchall()
+        return [KeyEntry(*row) for row in rows]
+
+    def has_accession(self, accession: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM keys WHERE accession=?", (accession,),
+            ).fetchone()
+        return row is not None
+
+    def last_case_number(self) -> int:
+        return self._last
+
+    def add(self, entry: KeyEntry) -> None:
+        """Insert an entry; ValueError if its case_id or accession exists."""
+        with self._lock:
+            try:
+                self._insert(entry)
+            except sqlite3.IntegrityError as e:
+                self._conn.rollback()
+                raise ValueError(
+                    f"{entry.case_id} / {entry.accession} already in key store"
+                ) from e
+            self._conn.commit()
+            self._last = max(self._last, case_number(entry.case_id) or 0)
+
+    def export_csv(self, path: Path | None = None) -> None:
+        """Write all entries to key.csv (atomic rewrite)."""
+        write_key_file(path or self.csv_path, self.entries())
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _insert(self, e: KeyEntry) -> None:
+        self._conn.execute(
+            "INSERT INTO keys"
+            " (case_id,case_num,accession,study_date,modality,description,"
+            "series_count,image_count) VALUES (?,?,?,?,?,?,?,?)",
+            (
+                e.case_id,
+                case_number(e.case_id),
+                e.accession,
+                e.study_date,
+                e.modality,
+                e.description,
+                e.series_count,
+                e.image_count,
+            ),
+        )
@@ -2,31 +2,120 @@
 
 1. Read accession numbers
 2. C-FIND each to get StudyInstanceUID + metadata
-3. Start temporary SCP
-4. C-MOVE each study to SCP (anonymize on receive)
-5. Stop SCP
-6. Update key.csv
+3. Start temporary SCP (once, shared by all studies)
+4. C-MOVE each study to SCP (anonymize on receive),
+   optionally several studies in parallel
+5. Record the case in the key store (key.csv or key.db)
+6. Stop SCP
 7. Return summary
+
+Every written instance is checkpointed in the project journal
+(journal.py). A study interrupted by a crash or a failed C-MOVE is
+resumed on the next load of its accession: same case ID, and only the
+series/instances not yet stored are moved.
+
+With ``load.series_moves`` set, a study is retrieved series by series:
+a SERIES-level C-FIND lists its series, which are then moved with up
+to that many parallel SERIES-level C-MOVEs into the same SCP. Series
+folders are numbered in C-FIND order, not arrival order, so the layout
+does not depend on how the moves interleave.
+
+With a prefetch range (``load --prefetch-range``), a few STUDY-level
+C-FINDs by StudyDate range resolve the cohort up front; only accessions
+they miss are queried one by one.
+
+With an order other than ``file`` (``load.order``, ``--order``), every
+accession is resolved first and the studies are then retrieved in
+order of size (schedule.py); results are still reported in input order.
+
+With ``load.disk_check`` set to ``warn`` or ``refuse``, every accession
+is resolved (``concurrency`` C-FINDs at a time) before the first move and
+the projected footprint checked against free disk space (preflight.py);
+a load that does not fit is refused (or warned about) before anything is
+moved. This gives up the overlap of ``prefetch``, so it is off by
+default. Dry runs always report the estimate.
+
+With ``load.throttle.enabled``, the number of studies moved at once
+adapts to PACS latency and errors (throttle.py), starting from
+``concurrency`` and staying within the throttle's floor and ceiling.
+
+With ``load.series_filter`` set (or the ``--series-*`` options), the
+series are listed the same way and only those matching the filter
+(filters.py) are moved; a study with no matching series is skipped.
 """
 
 from __future__ import annotations
 
 import json
 import logging
+import queue
+import shutil
+import sqlite3
+import threading
 import time
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from dataclasses import asdict, dataclass
+from datetime import date
+from functools import partial
 from pathlib import Path
+from typing import Callable
 
-from .audit import log_results
-from .config import Config
-from .keyfile import KeyEntry, next_case_id, read_key_file, write_key_file
-from .pacs import find_by_accession, move_study
-from .scp import TemporarySCP
+from .audit import average_instance_bytes, log_results
+from .config import Config, SeriesFilter
+from .filters import NoMatchingSeries, check_filter, select_series
+from .findcache import FindCache, open_find_cache
+from .keyfile import KeyEntry
+from .journal import JournalCase, LoadJournal
+from .keystore import case_number, open_key_store
+from .metrics import LoadMetrics, open_metrics
+from .pacs import (
+    FindSession,
+    PacsBusy,
+    StoreHandler,
+    find_by_date_range,
+    find_instances,
+    find_series,
+    move_instances,
+    move_series,
+    move_study,
+)
+from .preflight import Footprint, directory_bytes, estimate, free_space
+from .schedule import ORDERS, schedule, study_size
+from .scp import StudyReceipt, TemporarySCP
+from .throttle import Throttle
 from .verify import verify_load
 
 log = logging.getLogger(__name__)
 
 
+@dataclass
+class StageTimings:
+    """Where the time of one study went, in seconds."""
+
+    find_s: float | None = None  # C-FIND (None if resolved by date range)
+    associate_s: float | None = None  # Opening the retrieve association(s)
+    first_byte_s: float | None = None  # Move request to first instance received
+    move_s: float | None = None  # C-MOVE/C-GET until the final response
+    drain_s: float | None = None  # Waiting for trailing C-STOREs and writes
+    anonymize_s: float = 0.0  # CPU time of write jobs (anonymize, encode)
+    write_s: float = 0.0  # Rest of their wall time (mostly disk)
+    bytes_received: int = 0  # Encoded size of the instances received
+
+    def to_dict(self, images: int = 0) -> dict:
+        """Rounded timings, with receive rates over the move time."""
+        d = {
+            key: round(value, 3)
+            for key, value in asdict(self).items()
+            if value is not None and key != "bytes_received"
+        }
+        d["bytes_received"] = self.bytes_received
+        if self.move_s:
+            d["mb_per_s"] = round(self.bytes_received / 1e6 / self.move_s, 2)
+            d["images_per_s"] = round(images / self.move_s, 1)
+        return d
+
+
 @dataclass
 class LoadResult:
     case_id: str
@@ -40,6 +129,11 @@ class LoadResult:
     status: str  # "ok", "error", "skipped", or "dry-run"
     error: str | None = None
     duration_s: float | None = None
+    expected_images: int | None = None  # completed + warning sub-operations
+    missing_images: int = 0  # expected but not stored before timeout
+    resumed_images: int = 0  # stored by an earlier, interrupted run
+    bytes_written: int = 0  # size of the case directory after the load
+    timings: StageTimings | None = None  # per-stage times of a retrieval
 
 
 def load_studies(
@@ -47,154 +141,811 @@ def load_studies(
     project: str,
     accessions: list[str],
     dry_run: bool = False,
+    concurrency: int | None = None,
+    prefetch: int | None = None,
+    scp: TemporarySCP | None = None,
+    find_session: FindSession | None = None,
+    series_moves: int | None = None,
+    series_filter: SeriesFilter | None = None,
+    prefetch_range: tuple[date, date] | None = None,
+    prefetch_modality: str | None = None,
+    find_cache: FindCache | None = None,
+    order: str | None = None,
+    metrics: LoadMetrics | None = None,
 ) -> tuple[list[LoadResult], dict]:
     """Load studies from PACS, anonymize, and save.
 
+    One SCP is started on first use and kept up for the whole run;
+    incoming instances are routed to their case directory by
+    StudyInstanceUID, so up to ``concurrency`` C-MOVEs can run at once.
+
+    With ``prefetch`` > 0 the load is pipelined: a resolver thread runs
+    C-FIND for up to ``prefetch`` upcoming accessions while the
+    retrieval workers move the current ones.
+
     Args:
         config: Application configuration.
         project: Project name (subdirectory under base_dir).
         accessions: List of accession numbers to load.
         dry_run: If True, only query PACS, don't retrieve images.
+        concurrency: Parallel studies (default: config.load.concurrency).
+        prefetch: Accessions resolved ahead (default: config.load.prefetch).
+        scp: Running SCP to receive into (left running); by default one
+            is started for this call.
+        find_session: Open C-FIND session to query on (left open); by
+            default each worker opens its own.
+        series_moves: Parallel SERIES-level C-MOVEs per study, 0 for one
+            STUDY-level C-MOVE (default: config.load.series_moves).
+        series_filter: Retrieve only the matching series of each study
+            (default: config.load.series_filter).
+        prefetch_range: (first, last) StudyDate of the cohort; resolve
+            accessions with date-range C-FINDs before per-accession ones.
+        prefetch_modality: Restrict the date-range C-FINDs to studies
+            with this modality.
+        find_cache: C-FIND result cache (left open; its hit/miss counts
+            cover this run); by default the one of base_dir is opened.
+        order: Retrieval order, one of schedule.ORDERS (default:
+            config.load.order). Other than "file", all accessions are
+            resolved before the first retrieval and prefetch is unused.
+        metrics: Textfile metrics to update as studies finish; by
+            default those of metrics.textfile_dir, if configured.
 
     Returns:
-        Tuple of (results list, verification dict).
+        Tuple of (results list, verification dict), results in input order.
+        A repeated accession is loaded once; later copies are skipped.
+
+    Raises:
+        ValueError: If the series filter or order is invalid.
     """
+    if concurrency is None:
+        concurrency = config.load.concurrency
+    concurrency = max(1, concurrency)
+    if prefetch is None:
+        prefetch = config.load.prefetch
+    if series_moves is None:
+        series_moves = config.load.series_moves
+    if series_filter is None:
+        series_filter = config.load.series_filter
+    error = check_filter(series_filter)
+    if error:
+        raise ValueError(error)
+    if order is None:
+        order = config.load.order
+    if order not in ORDERS:
+        raise ValueError(f"Unknown order {order!r} (expected one of {ORDERS})")
+
     project_dir = config.output.base_dir / project
-    key_path = project_dir / "key.csv"
-    existing = read_key_file(key_path)
+    own_cache = find_cache is None
+    if own_cache:
+        find_cache = open_find_cache(config)
+    if metrics is None:
+        metrics = open_metrics(config)
+    run = _LoadRun(config, project_dir, scp, find_session, find_cache)
+    run.metrics = metrics
+    run.series_moves = max(0, series_moves)
+    run.series_filter = series_filter
+    if config.load.throttle.enabled:
+        # Enough workers for the ceiling; the throttle decides how many move
+        run.throttle = Throttle(config.load.throttle, start=concurrency)
+        concurrency = max(concurrency, config.load.throttle.ceiling)
 
-    # Check for already-loaded accessions
-    loaded_accessions = {e.accession for e in existing}
+    # A repeated accession is loaded once; later copies are reported as skipped
+    requested, accessions = accessions, list(dict.fromkeys(accessions))
 
-    results: list[LoadResult] = []
+    footprint = None
+    try:
+        if prefetch_range is not None:
+            run.prefind(accessions, *prefetch_range, prefetch_modality)
+        if dry_run or config.load.disk_check != "off":
+            footprint = run.preflight(accessions, concurrency)
+        if (
+            footprint is not None
+            and not footprint.fits
+            and not dry_run
+            and config.load.disk_check == "refuse"
+        ):
+            log.error("Refusing load: %s", footprint.describe())
+            results = [_refuse(run, ac, footprint) for ac in accessions]
+        elif order != "file":
+            results = _load_scheduled(
+                run, accessions, dry_run, concurrency, order,
+            )
+        elif prefetch > 0:
+            results = _load_pipelined(
+                run, accessions, dry_run, concurrency, prefetch,
+            )
+        elif concurrency == 1:
+            results = [_load_one(run, ac, dry_run) for ac in accessions]
+        else:
+            with ThreadPoolExecutor(
+                max_workers=concurrency, thread_name_prefix="load",
+            ) as pool:
+                futures = [
+                    pool.submit(_load_one, run, ac, dry_run) for ac in accessions
+                ]
+                results = [f.result() for f in futures]
+        if config.output.key_store != "csv":
+            # Keep the researcher-facing key.csv in step with key.db
+            run.keys.export_csv()
+    finally:
+        run.close()
+        if own_cache and find_cache is not None:
+            find_cache.close()
+    if run.throttle is not None:
+        log.info("Throttle at end of run: %s", run.throttle.stats())
+    if len(requested) != len(accessions):
+        results = _with_repeats(requested, results)
 
-    for ac in accessions:
-        if ac in loaded_accessions:
-            log.info("Skipping %s — already loaded", ac)
-            results.append(
-                LoadResult(
-                    case_id="",
-                    accession=ac,
-                    study_uid="",
-                    series_count=0,
-                    image_count=0,
-                    study_date="",
-                    modality="",
-                    description="",
-                    status="skipped",
-                    error="already loaded",
-                )
+    # Verify results
+    verification = verify_load(results)
+    if footprint is not None:
+        verification["footprint"] = footprint.to_dict()
+        if not footprint.fits:
+            verification["warnings"].append(
+                f"Not enough disk space: {footprint.describe()}"
             )
-            continue
+            verification["ok"] = False
+
+    # Write load summary (includes verification)
+    _write_load_json(
+        project_dir / "load.json", results, verification,
+        series_filter if series_filter.active else None,
+    )
+
+    # Audit log
+    log_results(config.output.base_dir, project, results, dry_run=dry_run)
+    if metrics is not None:
+        metrics.reload()
+
+    return results, verification
+
+
+class _LoadRun:
+    """State shared by the studies of one load run.
+
+    Case ID allocation, key.csv updates and the SCP are guarded by a
+    lock so several studies can be loaded from worker threads. An SCP
+    or C-FIND session passed in by the caller (``rad-loader serve``)
+    is used but not shut down.
+    """
+
+    def __init__(
+        self,
+        config: Config,
+        project_dir: Path,
+        scp: TemporarySCP | None = None,
+        find_session: FindSession | None = None,
+        find_cache: FindCache | None = None,
+    ) -> None:
+        self.config = config
+        self.project_dir = project_dir
+        self.keys = open_key_store(project_dir, config.output.key_store)
+        self.journal = LoadJournal(project_dir)
+        self._reserved: list[KeyEntry] = []
+        self._scp = scp
+        self._own_scp = scp is None
+        self._lock = threading.Lock()
+        # One reusable C-FIND association per worker thread, unless shared
+        self._local = threading.local()
+        self._sessions: list[FindSession] = []
+        self._shared_session = find_session
+        self._find_lock = threading.Lock()
+        self.find_cache = find_cache
+        self.throttle: Throttle | None = None
+        self.metrics: LoadMetrics | None = None
+        # Studies resolved up front (date range, preflight); read-only after
+        self._prefound: dict[str, list[dict[str, str]]] = {}
+        self._find_s: dict[str, float] = {}  # C-FIND seconds by accession
+        self.series_moves = config.load.series_moves
+        self.series_filter = config.load.series_filter
+        self._close_recorded_cases()
+
+    def _close_recorded_cases(self) -> None:
+        """Close journal cases whose key row was written but not their done.
+
+        commit() makes the key row durable before it journals "done", so
+        a crash (or a failing journal write) in between leaves such a case.
+        """
+        for case in self.journal.cases():
+            if self.keys.has_accession(case.accession):
+                log.info("%s was recorded; closing %s", case.accession, case.case_id)
+                self.journal.done(case.case_id)
+
+    def is_loaded(self, accession: str) -> bool:
+        """True if the accession is already in the key store."""
+        with self._lock:
+            return self.keys.has_accession(accession)
 
-        # C-FIND
+    def prefind(
+        self,
+        accessions: list[str],
+        start: date,
+        end: date,
+        modality: str | None = None,
+    ) -> None:
+        """Resolve accessions by StudyDate range ahead of the load.
+
+        Accessions the range queries miss (or all of them, if the
+        queries fail) are resolved one by one as usual.
+        """
         try:
-            studies = find_by_accession(config, ac)
+            if self._shared_session is not None:
+                with self._find_lock:
+                    found = find_by_date_range(
+                        self.config, start, end, modality, self._shared_session,
+                    )
+            else:
+                found = find_by_date_range(self.config, start, end, modality)
         except Exception as e:
-            log.error("C-FIND failed for %s: %s", ac, e)
-            results.append(
-                LoadResult(
-                    case_id="",
-                    accession=ac,
-                    study_uid="",
-                    series_count=0,
-                    image_count=0,
-                    study_date="",
-                    modality="",
-                    description="",
-                    status="error",
-                    error=f"C-FIND failed: {e}",
-                )
+            log.warning("Date-range C-FIND failed, querying per accession: %s", e)
+            return
+        wanted = set(accessions)
+        self._prefound = {ac: s for ac, s in found.items() if ac in wanted}
+        log.info(
+            "Resolved %d of %d accessions by date range %s..%s",
+            len(self._prefound), len(wanted), start, end,
+        )
+
+    def preflight(self, accessions: list[str], workers: int = 1) -> Footprint:
+        """Resolve every accession up front and estimate the load's size.
+
+        The C-FINDs run on up to ``workers`` threads, each with its own
+        association. Results are kept for the load, so each accession is
+        still queried only once. Accessions already loaded are not counted.
+        """
+        pending = [ac for ac in dict.fromkeys(accessions) if not self.is_loaded(ac)]
+
+        def _find(ac: str) -> list[dict[str, str]] | None:
+            try:
+                return self.find(ac)
+            except Exception as e:
+                log.warning("C-FIND for %s failed during preflight: %s", ac, e)
+                return None
+
+        if workers > 1 and len(pending) > 1:
+            with ThreadPoolExecutor(
+                max_workers=min(workers, len(pending)),
+                thread_name_prefix="preflight",
+            ) as pool:
+                resolved = list(pool.map(_find, pending))
+        else:
+            resolved = [_find(ac) for ac in pending]
+
+        studies = []
+        for ac, found in zip(pending, resolved):
+            if found is None:
+                continue
+            self._prefound[ac] = found
+            studies.extend(found[:1])
+        footprint = estimate(
+            studies,
+            average_instance_bytes(self.config.output.base_dir),
+            free_space(self.config.output.base_dir, self.config.load.disk_reserve_gb),
+        )
+        log.info("Preflight: %s", footprint.describe())
+        if footprint.unknown_studies:
+            log.warning(
+                "Preflight: %d studies report no instance count (not estimated)",
+                footprint.unknown_studies,
             )
-            continue
+        return footprint
 
-        if not studies:
-            results.append(
-                LoadResult(
-                    case_id="",
-                    accession=ac,
-                    study_uid="",
-                    series_count=0,
-                    image_count=0,
-                    study_date="",
-                    modality="",
-                    description="",
-                    status="error",
-                    error="not found on PACS",
+    def find(self, accession: str) -> list[dict[str, str]]:
+        """Studies of an accession: resolved by date range, cached or queried."""
+        prefound = self._prefound.get(accession)
+        if prefound is not None:
+            return prefound
+        t0 = time.monotonic()
+        if self.find_cache is not None:
+            studies = self.find_cache.find(accession, self._query)
+        else:
+            studies = self._query(accession)
+        with self._lock:
+            self._find_s[accession] = time.monotonic() - t0
+        return studies
+
+    def find_seconds(self, accession: str) -> float | None:
+        """Time the C-FIND of accession took (None: resolved by date range)."""
+        with self._lock:
+            return self._find_s.get(accession)
+
+    def _query(self, accession: str) -> list[dict[str, str]]:
+        """C-FIND on this thread's session (association reused)."""
+        if self._shared_session is not None:
+            with self._find_lock:
+                return self._timed_find(self._shared_session, accession)
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = FindSession(self.config)
+            self._local.session = session
+            with self._lock:
+                self._sessions.append(session)
+        return self._timed_find(session, accession)
+
+    def _timed_find(
+        self, session: FindSession, accession: str,
+    ) -> list[dict[str, str]]:
+        """session.find, with its latency reported to the throttle."""
+        if self.throttle is None:
+            return session.find(accession)
+        t0 = time.monotonic()
+        try:
+            studies = session.find(accession)
+        except Exception as e:
+            self.throttle.failed(busy=isinstance(e, PacsBusy))
+            raise
+        self.throttle.found(time.monotonic() - t0)
+        return studies
+
+    def close(self) -> None:
+        """Release C-FIND associations and stop the SCP."""
+        with self._lock:
+            sessions, self._sessions = self._sessions, []
+        for session in sessions:
+            session.close()
+        self.stop_scp()
+        self.keys.close()
+        self.journal.close()
+
+    def scp(self) -> TemporarySCP:
+        """Return the shared SCP, starting it on first use."""
+        with self._lock:
+            if self._scp is None:
+                scp = TemporarySCP(self.config)
+                scp.start()
+                self._scp = scp
+            return self._scp
+
+    def stop_scp(self) -> None:
+        with self._lock:
+            if self._scp is not None and self._own_scp:
+                self._scp.stop()
+                self._scp = None
+
+    def reserve_case_id(self, accession: str, resume: str | None = None) -> str:
+        """Assign a case ID: ``resume`` if given and free, else the next one.
+
+        Studies in flight and interrupted studies in the journal keep
+        their IDs.
+        """
+        with self._lock:
+            if resume is not None and all(
+                e.case_id != resume for e in self._reserved
+            ):
+                case_id = resume
+            else:
+                last = max(
+                    [self.keys.last_case_number()]
+                    + [case_number(e.case_id) or 0 for e in self._reserved]
+                    + [case_number(c) or 0 for c in self.journal.case_ids()]
                 )
+                case_id = f"case{last + 1:04d}"
+            self._reserved.append(
+                KeyEntry(case_id, accession, "", "", "", 0, 0)
             )
-            continue
+            return case_id
 
-        study = studies[0]
-        study_uid = study.get("StudyInstanceUID", "")
+    def release_case_id(self, case_id: str) -> None:
+        with self._lock:
+            self._reserved = [e for e in self._reserved if e.case_id != case_id]
 
-        if dry_run:
-            results.append(
-                LoadResult(
-                    case_id="(dry-run)",
-                    accession=ac,
-                    study_uid=study_uid,
-                    series_count=int(study.get("NumberOfStudyRelatedSeries", 0) or 0),
-                    image_count=int(study.get("NumberOfStudyRelatedInstances", 0) or 0),
-                    study_date=study.get("StudyDate", ""),
-                    modality=study.get("Modality", "") or study.get("ModalitiesInStudy", ""),
-                    description=study.get("StudyDescription", ""),
-                    status="dry-run",
-                )
+    def commit(self, entry: KeyEntry) -> None:
+        """Record a loaded study: its key row first, then the journal's done.
+
+        The key store returns once the row is durable (key.csv fsynced,
+        key.db committed); only then is the journal case closed. If the
+        key store raises, the case stays pending, fsynced, for the next
+        run to resume and record; the caller releases the case ID.
+        """
+        with self._lock:
+            try:
+                self.keys.add(entry)
+            except Exception:
+                self.journal.sync()
+                raise
+            self._reserved = [
+                e for e in self._reserved if e.case_id != entry.case_id
+            ]
+        self.journal.done(entry.case_id)
+
+
+def _load_pipelined(
+    run: _LoadRun,
+    accessions: list[str],
+    dry_run: bool,
+    concurrency: int,
+    prefetch: int,
+) -> list[LoadResult]:
+    """Resolve accessions on one thread, retrieve them on others.
+
+    The resolver stays at most ``prefetch`` accessions ahead of the
+    retrieval workers (bounded queue). Results keep input order.
+    """
+    resolved: queue.Queue = queue.Queue(maxsize=prefetch)
+    results: list[LoadResult | None] = [None] * len(accessions)
+    failure = threading.Event()
+
+    def _resolver() -> None:
+        try:
+            for i, ac in enumerate(accessions):
+                if failure.is_set():
+                    break
+                resolved.put((i, ac, _resolve(run, ac, dry_run)))
+        finally:
+            for _ in range(concurrency):
+                resolved.put(None)
+
+    def _retriever() -> None:
+        error = None
+        while (item := resolved.get()) is not None:
+            if failure.is_set():
+                continue  # drain so the resolver never blocks
+            i, ac, found = item
+            try:
+                if isinstance(found, LoadResult):
+                    results[i] = found
+                else:
+                    results[i] = _retrieve(run, ac, found, dry_run)
+            except BaseException as e:
+                # Keep draining until the resolver's sentinel: with a
+                # single retriever nothing else would empty the queue
+                failure.set()
+                error = e
+        if error is not None:
+            raise error
+
+    with ThreadPoolExecutor(
+        max_workers=concurrency + 1, thread_name_prefix="load",
+    ) as pool:
+        futures = [pool.submit(_resolver)]
+        futures += [pool.submit(_retriever) for _ in range(concurrency)]
+        for f in futures:
+            f.result()
+
+    return results
+
+
+def _refuse(run: _LoadRun, ac: str, footprint: Footprint) -> LoadResult:
+    """Result of an accession when the whole load was refused."""
+    found = _resolve(run, ac, dry_run=False)
+    if isinstance(found, LoadResult):
+        return found
+    result = LoadResult(
+        case_id="",
+        accession=ac,
+        study_uid=found.get("StudyInstanceUID", ""),
+        series_count=0,
+        image_count=0,
+        study_date=found.get("StudyDate", ""),
+        modality=found.get("Modality", "") or found.get("ModalitiesInStudy", ""),
+        description=found.get("StudyDescription", ""),
+        status="error",
+        error=f"insufficient disk space ({footprint.describe()})",
+    )
+    _observe(run, result, dry_run=False)
+    return result
+
+
+def _load_scheduled(
+    run: _LoadRun,
+    accessions: list[str],
+    dry_run: bool,
+    concurrency: int,
+    order: str,
+) -> list[LoadResult]:
+    """Resolve every accession, then retrieve the studies by size order.
+
+    Results keep input order.
+    """
+    results: list[LoadResult | None] = [None] * len(accessions)
+
+    with ThreadPoolExecutor(
+        max_workers=concurrency, thread_name_prefix="load",
+    ) as pool:
+        resolved = list(pool.map(
+            partial(_resolve, run, dry_run=dry_run), accessions,
+        ))
+
+        pending: list[tuple[int, dict[str, str]]] = []
+        for i, found in enumerate(resolved):
+            if isinstance(found, LoadResult):
+                results[i] = found
+            else:
+                pending.append((i, found))
+
+        plan = schedule(
+            [study_size(study) for _, study in pending], order, concurrency,
+        )
+        log.info("Retrieving %d studies in %s order", len(plan), order)
+        # The pool runs submissions first-come first-served
+        futures = {
+            pending[k][0]: pool.submit(
+                _retrieve, run, accessions[pending[k][0]], pending[k][1], dry_run,
             )
+            for k in plan
+        }
+        for i, future in futures.items():
+            results[i] = future.result()
+
+    return results
+
+
+def _with_repeats(
+    requested: list[str], results: list[LoadResult],
+) -> list[LoadResult]:
+    """Expand results of the distinct accessions back to the requested list.
+
+    The first copy of an accession gets its result; later copies are
+    reported as skipped.
+    """
+    first = {r.accession: r for r in results}
+    seen: set[str] = set()
+    expanded = []
+    for ac in requested:
+        if ac not in seen:
+            seen.add(ac)
+            expanded.append(first[ac])
             continue
+        expanded.append(LoadResult(
+            case_id="",
+            accession=ac,
+            study_uid=first[ac].study_uid,
+            series_count=0,
+            image_count=0,
+            study_date="",
+            modality="",
+            description="",
+            status="skipped",
+            error="repeated in accession list",
+        ))
+    return expanded
 
-        # Assign case ID
-        case_id = next_case_id(existing)
 
-        # C-MOVE with temporary SCP
-        scp = TemporarySCP(config, project_dir, case_id)
-        t0 = time.monotonic()
-        try:
-            scp.start()
-            move_result = move_study(config, study_uid)
-            # Wait briefly for any trailing C-STORE packets
-            time.sleep(1)
-        except Exception as e:
-            elapsed = round(time.monotonic() - t0, 1)
-            log.error("C-MOVE failed for %s: %s", ac, e)
-            results.append(
-                LoadResult(
-                    case_id=case_id,
+def _load_one(run: _LoadRun, ac: str, dry_run: bool) -> LoadResult:
+    """Query, retrieve and record a single accession."""
+    found = _resolve(run, ac, dry_run)
+    if isinstance(found, LoadResult):
+        return found
+    return _retrieve(run, ac, found, dry_run)
+
+
+def _resolve(
+    run: _LoadRun, ac: str, dry_run: bool,
+) -> LoadResult | dict[str, str]:
+    """C-FIND stage: the study to load, or the final result if there is none."""
+    found = _resolve_study(run, ac)
+    if isinstance(found, LoadResult):
+        _observe(run, found, dry_run)
+    return found
+
+
+def _resolve_study(run: _LoadRun, ac: str) -> LoadResult | dict[str, str]:
+    if run.is_loaded(ac):
+        log.info("Skipping %s — already loaded", ac)
+        return LoadResult(
+            case_id="",
+            accession=ac,
+            study_uid="",
+            series_count=0,
+            image_count=0,
+            study_date="",
+            modality="",
+            description="",
+            status="skipped",
+            error="already loaded",
+        )
+
+    # C-FIND
+    try:
+        studies = run.find(ac)
+    except Exception as e:
+        log.error("C-FIND failed for %s: %s", ac, e)
+        return LoadResult(
+            case_id="",
+            accession=ac,
+            study_uid="",
+            series_count=0,
+            image_count=0,
+            study_date="",
+            modality="",
+            description="",
+            status="error",
+            error=f"C-FIND failed: {e}",
+        )
+
+    if not studies:
+        return LoadResult(
+            case_id="",
+            accession=ac,
+            study_uid="",
+            series_count=0,
+            image_count=0,
+            study_date="",
+            modality="",
+            description="",
+            status="error",
+            error="not found on PACS",
+        )
+
+    return studies[0]
+
+
+def _retrieve(
+    run: _LoadRun, ac: str, study: dict[str, str], dry_run: bool,
+) -> LoadResult:
+    """C-MOVE stage: retrieve a resolved study and record it."""
+    result = _retrieve_study(run, ac, study, dry_run)
+    _observe(run, result, dry_run)
+    return result
+
+
+def _observe(run: _LoadRun, result: LoadResult, dry_run: bool) -> None:
+    """Count a finished accession in the live metrics (not in dry runs)."""
+    if run.metrics is not None and not dry_run:
+        run.metrics.observe(result)
+
+
+def _retrieve_study(
+    run: _LoadRun, ac: str, study: dict[str, str], dry_run: bool,
+) -> LoadResult:
+    config = run.config
+    study_uid = study.get("StudyInstanceUID", "")
+
+    if dry_run:
+        series_count = int(study.get("NumberOfStudyRelatedSeries", 0) or 0)
+        image_count = int(study.get("NumberOfStudyRelatedInstances", 0) or 0)
+        if run.series_filter.active:
+            try:
+                found = find_series(config, study_uid)
+            except Exception as e:
+                log.error("Series C-FIND failed for %s: %s", ac, e)
+                return LoadResult(
+                    case_id="",
                     accession=ac,
                     study_uid=study_uid,
                     series_count=0,
                     image_count=0,
                     study_date=study.get("StudyDate", ""),
-                    modality=study.get("Modality", "") or study.get("ModalitiesInStudy", ""),
+                    modality=(
+                        study.get("Modality", "") or study.get("ModalitiesInStudy", "")
+                    ),
                     description=study.get("StudyDescription", ""),
                     status="error",
-                    error=f"C-MOVE failed: {e}",
-                    duration_s=elapsed,
+                    error=f"series C-FIND failed: {e}",
                 )
+            series = select_series(found, run.series_filter)
+            series_count = len(series)
+            image_count = sum(
+                int(s.get("NumberOfSeriesRelatedInstances") or 0) for s in series
             )
-            continue
-        finally:
-            scp.stop()
+        return LoadResult(
+            case_id="(dry-run)",
+            accession=ac,
+            study_uid=study_uid,
+            series_count=series_count,
+            image_count=image_count,
+            study_date=study.get("StudyDate", ""),
+            modality=study.get("Modality", "") or study.get("ModalitiesInStudy", ""),
+            description=study.get("StudyDescription", ""),
+            status="dry-run",
+        )
 
-        elapsed = round(time.monotonic() - t0, 1)
+    # Resume an interrupted retrieval of the same study, if any
+    resume = run.journal.pending(ac)
+    if resume is not None and resume.study_uid != study_uid:
+        log.warning(
+            "%s: interrupted load of %s was for another study; starting over",
+            ac, resume.case_id,
+        )
+        shutil.rmtree(run.project_dir / resume.case_id, ignore_errors=True)
+        resume.stored.clear()
 
-        series_count = len(scp.received_files)
-        image_count = sum(len(files) for files in scp.received_files.values())
+    # Assign case ID
+    case_id = run.reserve_case_id(ac, resume.case_id if resume else None)
 
-        entry = KeyEntry(
+    # C-MOVE into the shared SCP
+    t0 = time.monotonic()
+    timings = StageTimings(find_s=run.find_seconds(ac))
+    receipt = None
+    resumed = 0
+    try:
+        scp = run.scp()
+        run.journal.start(case_id, ac, study_uid)
+        receipt = scp.expect(
+            study_uid, run.project_dir, case_id,
+            on_stored=partial(run.journal.stored, case_id),
+        )
+        try:
+            if resume is not None and resume.case_id == case_id:
+                resumed = _restore(run.project_dir / case_id, resume, receipt)
+            if resumed:
+                log.info(
+                    "Resuming %s → %s (%d images already stored)",
+                    ac, case_id, resumed,
+                )
+            # Used for C-GET; C-MOVE sends to the SCP's listening port
+            store = scp.store_handler
+            sop_classes = _sop_classes(study)
+            if resumed or run.series_moves or run.series_filter.active:
+                move = partial(
+                    _move_by_series,
+                    config, study_uid, receipt, max(1, run.series_moves), store,
+                    run.series_filter, sop_classes,
+                )
+            else:
+                move = partial(
+                    move_study, config, study_uid, store, sop_classes=sop_classes,
+                )
+            move_result = _throttled(run.throttle, _stopwatch(move, run.metrics))
+            timings.move_s = move_result["move_s"]
+            timings.associate_s = move_result.get("associate_s")
+            # Wait until every instance the PACS reports as sent is stored
+            expected = (
+                resumed + move_result["completed"] + move_result["warning"]
+            )
+            t_drain = time.monotonic()
+            if not receipt.wait_for(expected, config.load.store_timeout):
+                log.warning(
+                    "Timed out waiting for %s: %d of %d images stored",
+                    ac, receipt.image_count, expected,
+                )
+            timings.drain_s = time.monotonic() - t_drain
+            if receipt.first_received is not None:
+                timings.first_byte_s = max(
+                    0.0, receipt.first_received - move_result["started"],
+                )
+        finally:
+            scp.release(study_uid)
+            if receipt is not None:
+                timings.bytes_received = receipt.bytes_received
+                timings.anonymize_s = receipt.anonymize_s
+                timings.write_s = receipt.write_s
+    except Exception as e:
+        if receipt is None or receipt.image_count == 0:
+            run.journal.abandon(case_id)
+        else:
+            run.journal.sync()
+            log.info("%s: %d images kept for resume", ac, receipt.image_count)
+        run.release_case_id(case_id)
+        elapsed = round(time.monotonic() - t0, 1)
+        filtered_out = isinstance(e, NoMatchingSeries)
+        if filtered_out:
+            log.info("Skipping %s: %s", ac, e)
+        else:
+            log.error("C-MOVE failed for %s: %s", ac, e)
+        return LoadResult(
             case_id=case_id,
             accession=ac,
+            study_uid=study_uid,
+            series_count=0,
+            image_count=0,
             study_date=study.get("StudyDate", ""),
             modality=study.get("Modality", "") or study.get("ModalitiesInStudy", ""),
             description=study.get("StudyDescription", ""),
-            series_count=series_count,
-            image_count=image_count,
+            status="skipped" if filtered_out else "error",
+            error=str(e) if filtered_out else f"C-MOVE failed: {e}",
+            duration_s=elapsed,
+            timings=timings,
         )
-        existing.append(entry)
-        write_key_file(key_path, existing)
 
-        result = LoadResult(
+    elapsed = round(time.monotonic() - t0, 1)
+
+    series_count = receipt.series_count
+    image_count = receipt.image_count
+    missing = max(0, expected - image_count - receipt.duplicates)
+
+    if receipt.failed:
+        # Acknowledged to the PACS but never written: not a complete case
+        log.error(
+            "%s: %d images could not be written; %d kept for resume",
+            ac, receipt.failed, image_count,
+        )
+        if image_count == 0:
+            run.journal.abandon(case_id)
+        else:
+            run.journal.sync()
+        run.release_case_id(case_id)
+        return LoadResult(
             case_id=case_id,
             accession=ac,
             study_uid=study_uid,
@@ -203,25 +954,244 @@ def load_studies(
             study_date=study.get("StudyDate", ""),
             modality=study.get("Modality", "") or study.get("ModalitiesInStudy", ""),
             description=study.get("StudyDescription", ""),
-            status="ok",
+            status="error",
+            error=f"{receipt.failed} images could not be written",
             duration_s=elapsed,
+            expected_images=expected,
+            missing_images=missing,
+            resumed_images=resumed,
+            timings=timings,
         )
-        results.append(result)
-        log.info(
-            "Loaded %s → %s (%d series, %d images)",
-            ac, case_id, series_count, image_count,
+
+    entry = KeyEntry(
+        case_id=case_id,
+        accession=ac,
+        study_date=study.get("StudyDate", ""),
+        modality=study.get("Modality", "") or study.get("ModalitiesInStudy", ""),
+        description=study.get("StudyDescription", ""),
+        series_count=series_count,
+        image_count=image_count,
+    )
+    try:
+        run.commit(entry)
+    except (ValueError, OSError, sqlite3.Error) as e:
+        # ValueError: same accession finished concurrently (SQLite key store)
+        log.error("Cannot record %s: %s", ac, e)
+        run.release_case_id(case_id)
+        return LoadResult(
+            case_id=case_id,
+            accession=ac,
+            study_uid=study_uid,
+            series_count=series_count,
+            image_count=image_count,
+            study_date=entry.study_date,
+            modality=entry.modality,
+            description=entry.description,
+            status="error",
+            error=f"key store: {e}",
+            duration_s=elapsed,
+            timings=timings,
         )
 
-    # Verify results
-    verification = verify_load(results)
+    log.info(
+        "Loaded %s → %s (%d series, %d images)",
+        ac, case_id, series_count, image_count,
+    )
+    return LoadResult(
+        case_id=case_id,
+        accession=ac,
+        study_uid=study_uid,
+        series_count=series_count,
+        image_count=image_count,
+        study_date=study.get("StudyDate", ""),
+        modality=study.get("Modality", "") or study.get("ModalitiesInStudy", ""),
+        description=study.get("StudyDescription", ""),
+        status="ok",
+        duration_s=elapsed,
+        expected_images=expected,
+        missing_images=missing,
+        resumed_images=resumed,
+        bytes_written=directory_bytes(run.project_dir / case_id),
+        timings=timings,
+    )
 
-    # Write load summary (includes verification)
-    _write_load_json(project_dir / "load.json", results, verification)
 
-    # Audit log
-    log_results(config.output.base_dir, project, results, dry_run=dry_run)
+def _stopwatch(
+    move: Callable[[], dict[str, float]],
+    metrics: LoadMetrics | None = None,
+) -> Callable[[], dict[str, float]]:
+    """Wrap a move so its result also holds when it started and move_s.
 
-    return results, verification
+    The move is counted in flight in metrics while it runs.
+    """
+    def timed() -> dict[str, float]:
+        with metrics.moving() if metrics is not None else nullcontext():
+            started = time.monotonic()
+            result = dict(move())
+        result["started"] = started
+        result["move_s"] = time.monotonic() - started
+        return result
+    return timed
+
+
+def _throttled(
+    throttle: Throttle | None, move: Callable[[], dict[str, float]],
+) -> dict[str, float]:
+    """Run a study move in a throttle slot and report how it went."""
+    if throttle is None:
+        return move()
+    with throttle.slot():
+        t0 = time.monotonic()
+        try:
+            result = move()
+        except NoMatchingSeries:
+            raise
+        except Exception as e:
+            throttle.failed(busy=isinstance(e, PacsBusy))
+            raise
+    throttle.moved(
+        time.monotonic() - t0,
+        result["completed"] + result["warning"],
+        result["failed"],
+    )
+    return result
+
+
+def _sop_classes(study: dict[str, str]) -> list[str] | None:
+    """SOP Class UIDs the resolving C-FIND reported for a study, if any."""
+    classes = [c for c in study.get("SOPClassesInStudy", "").split("\\") if c]
+    return classes or None
+
+
+def _restore(
+    case_dir: Path, resume: JournalCase, receipt: StudyReceipt,
+) -> int:
+    """Seed receipt with the journaled instances still on disk.
+
+    Files in the case directory the journal does not know (written, or
+    half-written, when the run died) are removed; they are retrieved
+    again.
+
+    Returns:
+        Number of instances restored.
+    """
+    project_dir = case_dir.parent
+    stored = {
+        sop_uid: (series_uid, project_dir / rel)
+        for sop_uid, (series_uid, rel) in resume.stored.items()
+        if (project_dir / rel).is_file()
+    }
+    keep = {path for _, path in stored.values()}
+    if case_dir.is_dir():
+        for path in case_dir.rglob("*.dcm"):
+            if path not in keep:
+                path.unlink()
+    receipt.restore(stored)
+    return len(stored)
+
+
+def _move_by_series(
+    config: Config,
+    study_uid: str,
+    receipt: StudyReceipt,
+    parallel: int,
+    store: StoreHandler,
+    series_filter: SeriesFilter | None = None,
+    sop_classes: list[str] | None = None,
+) -> dict[str, float]:
+    """C-MOVE a study series by series, skipping what the receipt holds.
+
+    Only series matching an active series_filter are moved, numbered
+    in C-FIND order. Series with no stored instance
+    are moved whole; partly stored ones (resume) are queried at image
+    level and only their missing instances moved. Up to ``parallel``
+    C-MOVEs run at once. If the PACS answers no series-level C-FIND,
+    the whole study is moved and the SCP acknowledges already-held
+    instances without rewriting them.
+
+    Returns:
+        Summed completed/failed/warning sub-operation counts and
+        associate_s.
+
+    Raises:
+        NoMatchingSeries: If no series passes the filter.
+        RuntimeError: If a filter is set but the PACS lists no series.
+    """
+    series = find_series(config, study_uid)
+    if series_filter is not None and series_filter.active:
+        if not series:
+            raise RuntimeError(
+                "PACS returned no series-level C-FIND results;"
+                " cannot apply the series filter"
+            )
+        series = select_series(series, series_filter)
+        if not series:
+            raise NoMatchingSeries("no series match the series filter")
+    if not series:
+        return move_study(config, study_uid, store, sop_classes=sop_classes)
+    receipt.assign_series([s.get("SeriesInstanceUID", "") for s in series])
+
+    moves = []
+    for s in series:
+        series_uid = s.get("SeriesInstanceUID", "")
+        held = receipt.series_image_count(series_uid)
+        if held == 0:
+            moves.append(partial(
+                move_series, config, study_uid, series_uid, store,
+                sop_classes=sop_classes,
+            ))
+            continue
+        try:
+            count = int(s.get("NumberOfSeriesRelatedInstances") or 0)
+        except ValueError:
+            count = 0
+        if count and held >= count:
+            continue
+        missing = [
+            uid for uid in find_instances(config, study_uid, series_uid)
+            if not receipt.has_instance(uid)
+        ]
+        if missing:
+            moves.append(
+                partial(
+                    move_instances, config, study_uid, series_uid, missing, store,
+                    sop_classes=sop_classes,
+                )
+            )
+
+    if parallel > 1 and len(moves) > 1:
+        # Leaving the block waits for every move, even after a failure
+        with ThreadPoolExecutor(
+            max_workers=parallel, thread_name_prefix="move",
+        ) as pool:
+            futures = [pool.submit(move) for move in moves]
+        results = [f.result() for f in futures]
+    else:
+        results = [move() for move in moves]
+
+    total = {"completed": 0, "failed": 0, "warning": 0, "associate_s": 0.0}
+    for result in results:
+        for key in total:
+            total[key] += result.get(key, 0)
+    return total
+
+
+def load_summary(
+    project: str,
+    results: list[LoadResult],
+    verification: dict,
+    find_cache: FindCache | None = None,
+) -> dict:
+    """The JSON document a load reports (CLI and ``serve`` alike)."""
+    summary = {
+        "status": "ok",
+        "project": project,
+        "results": [result_to_dict(r) for r in results],
+        "verification": verification,
+    }
+    if find_cache is not None:
+        summary["find_cache"] = find_cache.stats()
+    return summary
 
 
 def result_to_dict(r: LoadResult) -> dict:
@@ -241,17 +1211,32 @@ def result_to_dict(r: LoadResult) -> dict:
         d["error"] = r.error
     if r.duration_s is not None:
         d["duration_s"] = r.duration_s
+    if r.expected_images is not None:
+        d["expected_images"] = r.expected_images
+    if r.missing_images:
+        d["missing_images"] = r.missing_images
+    if r.resumed_images:
+        d["resumed_images"] = r.resumed_images
+    if r.bytes_written:
+        d["bytes_written"] = r.bytes_written
+    if r.timings is not None:
+        d["timings"] = r.timings.to_dict(r.image_count)
     return d
 
 
 def _write_load_json(
-    path: Path, results: list[LoadResult], verification: dict,
+    path: Path,
+    results: list[LoadResult],
+    verification: dict,
+    series_filter: SeriesFilter | None = None,
 ) -> None:
     """Write machine-readable load summary."""
     data = {
         "results": [result_to_dict(r) for r in results],
         "verification": verification,
     }
+    if series_filter is not None:
+        data["series_filter"] = series_filter.to_dict()
     path.parent.mkdir(parents=True, exist_ok=True)
     with open(path, "w") as f:
         json.dump(data, f, indent=2)
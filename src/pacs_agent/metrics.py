@@ -0,0 +1,278 @@
+"""Loader metrics for the node-exporter textfile collector.
+
+With ``metrics.textfile_dir`` set, every load (CLI or ``serve``)
+keeps ``rad_loader.prom`` in that directory up to date, in the
+Prometheus text format:
+
+- ``rad_loader_studies_total{status}``: studies by result (ok, error,
+  skipped);
+- ``rad_loader_instances_received_total``,
+  ``rad_loader_bytes_received_total``;
+- histograms of C-FIND and C-MOVE latency per study, and of
+  anonymize CPU time per instance;
+- ``rad_loader_moves_in_flight`` and
+  ``rad_loader_last_load_timestamp_seconds``.
+
+Totals are derived from audit.db, so they keep growing across cron
+runs and match ``rad-loader metrics``. During a load, finished
+retrievals and moves in flight are added live; when it ends, the
+totals are derived again from audit.db, which then holds the run.
+
+The file is replaced atomically (written aside, then renamed), so
+the collector never reads a partial file.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator
+
+from .audit import get_db
+from .config import Config
+
+log = logging.getLogger(__name__)
+
+TEXTFILE_NAME = "rad_loader.prom"
+
+FIND_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MOVE_BUCKETS = (1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+ANONYMIZE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+
+
+class Histogram:
+    """Cumulative histogram with fixed upper bounds (plus +Inf)."""
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+
+    def lines(self, name: str) -> list[str]:
+        lines = [
+            f'{name}_bucket{{le="{_number(bound)}"}} {n}'
+            for bound, n in zip(self.buckets, self.counts)
+        ]
+        lines.append(f'{name}_bucket{{le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum {_number(self.sum)}")
+        lines.append(f"{name}_count {self.count}")
+        return lines
+
+
+@dataclass
+class LoadTotals:
+    """Counters and histograms over loaded studies (dry runs excluded)."""
+
+    studies: dict[str, int] = field(default_factory=dict)  # by status
+    instances: int = 0
+    bytes_received: int = 0
+    find: Histogram = field(default_factory=lambda: Histogram(FIND_BUCKETS))
+    move: Histogram = field(default_factory=lambda: Histogram(MOVE_BUCKETS))
+    anonymize: Histogram = field(
+        default_factory=lambda: Histogram(ANONYMIZE_BUCKETS)
+    )
+    last_load: float | None = None  # Unix time of the newest study
+
+    def add(
+        self,
+        status: str,
+        images: int = 0,
+        bytes_received: int | None = None,
+        find_s: float | None = None,
+        move_s: float | None = None,
+        anonymize_s: float | None = None,
+        timestamp: float | None = None,
+    ) -> None:
+        """Count one study result."""
+        if status == "dry-run":
+            return
+        self.studies[status] = self.studies.get(status, 0) + 1
+        self.instances += images or 0
+        self.bytes_received += bytes_received or 0
+        if find_s is not None:
+            self.find.observe(find_s)
+        if move_s is not None:
+            self.move.observe(move_s)
+        if anonymize_s is not None and images:
+            self.anonymize.observe(anonymize_s / images)
+        if timestamp is not None:
+            self.last_load = max(self.last_load or 0.0, timestamp)
+
+    def add_result(self, result, timestamp: float) -> None:
+        """Count a LoadResult."""
+        timings = result.timings
+        self.add(
+            result.status,
+            result.image_count,
+            timings.bytes_received if timings else None,
+            timings.find_s if timings else None,
+            timings.move_s if timings else None,
+            timings.anonymize_s if timings else None,
+            timestamp,
+        )
+
+    @classmethod
+    def from_audit(cls, base_dir: Path) -> LoadTotals:
+        """Totals over every study recorded in base_dir/audit.db."""
+        totals = cls()
+        conn = get_db(base_dir)
+        conn.row_factory = sqlite3.Row
+        try:
+            for row in conn.execute(
+                "SELECT timestamp, status, image_count, bytes_received,"
+                " find_s, move_s, anonymize_s FROM audit"
+            ):
+                totals.add(
+                    row["status"],
+                    row["image_count"],
+                    row["bytes_received"],
+                    row["find_s"],
+                    row["move_s"],
+                    row["anonymize_s"],
+                    datetime.fromisoformat(row["timestamp"]).timestamp(),
+                )
+        finally:
+            conn.close()
+        return totals
+
+    def render(self, in_flight: int = 0) -> str:
+        """The totals in the Prometheus text format."""
+        lines = [
+            "# HELP rad_loader_studies_total Studies by load result.",
+            "# TYPE rad_loader_studies_total counter",
+        ]
+        lines += [
+            f'rad_loader_studies_total{{status="{status}"}} {n}'
+            for status, n in sorted(self.studies.items())
+        ]
+        lines += [
+            "# HELP rad_loader_instances_received_total Instances stored.",
+            "# TYPE rad_loader_instances_received_total counter",
+            f"rad_loader_instances_received_total {self.instances}",
+            "# HELP rad_loader_bytes_received_total Bytes received over C-STORE.",
+            "# TYPE rad_loader_bytes_received_total counter",
+            f"rad_loader_bytes_received_total {self.bytes_received}",
+            "# HELP rad_loader_find_seconds C-FIND latency per study.",
+            "# TYPE rad_loader_find_seconds histogram",
+            *self.find.lines("rad_loader_find_seconds"),
+            "# HELP rad_loader_move_seconds C-MOVE/C-GET time per study.",
+            "# TYPE rad_loader_move_seconds histogram",
+            *self.move.lines("rad_loader_move_seconds"),
+            "# HELP rad_loader_anonymize_seconds_per_instance"
+            " Anonymize CPU time per instance (study average).",
+            "# TYPE rad_loader_anonymize_seconds_per_instance histogram",
+            *self.anonymize.lines("rad_loader_anonymize_seconds_per_instance"),
+            "# HELP rad_loader_moves_in_flight Study moves running now.",
+            "# TYPE rad_loader_moves_in_flight gauge",
+            f"rad_loader_moves_in_flight {in_flight}",
+        ]
+        if self.last_load is not None:
+            lines += [
+                "# HELP rad_loader_last_load_timestamp_seconds"
+                " Time of the newest recorded study.",
+                "# TYPE rad_loader_last_load_timestamp_seconds gauge",
+                f"rad_loader_last_load_timestamp_seconds {_number(self.last_load)}",
+            ]
+        return "\n".join(lines) + "\n"
+
+
+def open_metrics(config: Config) -> LoadMetrics | None:
+    """Metrics writer of metrics.textfile_dir, or None if not configured."""
+    if config.metrics.textfile_dir is None:
+        return None
+    return LoadMetrics(
+        config.output.base_dir, config.metrics.textfile_dir / TEXTFILE_NAME,
+    )
+
+
+class LoadMetrics:
+    """Live loader metrics, kept written to a textfile.
+
+    Safe to share between threads (and between the jobs of ``serve``).
+
+    Usage:
+        metrics = LoadMetrics(base_dir, textfile)
+        with metrics.moving():
+            ...  # C-MOVE
+        metrics.observe(result)
+        metrics.reload()  # after the results are in audit.db
+    """
+
+    def __init__(self, base_dir: Path, textfile: Path) -> None:
+        self.base_dir = base_dir
+        self.textfile = textfile
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()  # Newest render written last
+        self._in_flight = 0
+        self._totals = LoadTotals.from_audit(base_dir)
+        self.write()
+
+    @contextmanager
+    def moving(self) -> Iterator[None]:
+        """Count a study move as in flight while the block runs."""
+        with self._lock:
+            self._in_flight += 1
+        self.write()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            self.write()
+
+    def observe(self, result) -> None:
+        """Add a finished study (a LoadResult) to the totals."""
+        with self._lock:
+            self._totals.add_result(result, datetime.now().timestamp())
+        self.write()
+
+    def reload(self) -> None:
+        """Derive the totals from audit.db again, and write them."""
+        totals = LoadTotals.from_audit(self.base_dir)
+        with self._lock:
+            self._totals = totals
+        self.write()
+
+    def render(self) -> str:
+        with self._lock:
+            return self._totals.render(self._in_flight)
+
+    def write(self) -> None:
+        """Replace the textfile; failures are logged, never raised."""
+        try:
+            with self._write_lock:
+                write_textfile(self.textfile, self.render())
+        except OSError as e:
+            log.warning("Cannot write metrics to %s: %s", self.textfile, e)
+
+
+def write_textfile(path: Path, text: str) -> None:
+    """Write text to path atomically (temporary file, then rename)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Not *.prom: the collector ignores it until the rename
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}")
+    try:
+        with open(tmp, "w") as f:
+            f.write(text)
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def _number(value: float) -> str:
+    """A sample value as Prometheus writes it (no trailing .0)."""
+    return repr(float(value)).removesuffix(".0")
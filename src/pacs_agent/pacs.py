@@ -1,4 +1,16 @@
-"""PACS operations: C-ECHO, C-FIND, C-MOVE.
+"""PACS operations: C-ECHO, C-FIND, C-MOVE / C-GET.
+
+C-FIND and retrieval work at study level, and at series/instance level
+for resuming partially received studies. A cohort can be resolved with
+a few StudyDate-range C-FINDs (find_by_date_range) instead of one
+query per accession.
+
+Retrieval is a C-MOVE to our SCP by default. With ``pacs.retrieval:
+c-get`` it is a C-GET instead: the PACS sends the instances back as
+C-STOREs on the same association (storage contexts and SCP role are
+negotiated up front), so no inbound port is needed. The C-STOREs go to
+the handler passed in — normally ``TemporarySCP.store_handler``, the
+same anonymize-and-save path C-MOVE uses.
 
 All operations are synchronous (pynetdicom is sync).
 PHI may be returned by PACS but is never exposed in return values —
@@ -7,20 +19,36 @@ only safe metadata fields are included in results.
 
 from __future__ import annotations
 
+import calendar
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Callable
 
 from pydicom.dataset import Dataset
-from pynetdicom import AE
+from pydicom.multival import MultiValue
+from pynetdicom import AE, build_role, evt
+from pynetdicom.presentation import StoragePresentationContexts
 from pynetdicom.sop_class import (
     StudyRootQueryRetrieveInformationModelFind,
+    StudyRootQueryRetrieveInformationModelGet,
     StudyRootQueryRetrieveInformationModelMove,
     Verification,
 )
 
 from .config import Config
+from .findcache import FindCache
 
 log = logging.getLogger(__name__)
 
+# EVT_C_STORE handler receiving C-GET sub-operations
+StoreHandler = Callable[[evt.Event], int]
+
+
+class PacsBusy(RuntimeError):
+    """The PACS refused a retrieval for lack of resources (0xA7xx)."""
+
 
 def echo(config: Config) -> bool:
     """Test PACS connectivity with C-ECHO.
@@ -48,15 +76,142 @@ def echo(config: Config) -> bool:
 def find_by_accession(
     config: Config,
     accession: str,
+    cache: FindCache | None = None,
 ) -> list[dict[str, str]]:
     """C-FIND studies by AccessionNumber.
 
     Returns list of dicts with safe metadata only.
     PHI fields are never included in the return value.
+    Results in ``cache`` are used instead of querying the PACS.
     """
-    ae = AE(ae_title=config.scp.ae_title)
-    ae.add_requested_context(StudyRootQueryRetrieveInformationModelFind)
+    def _query(ac: str) -> list[dict[str, str]]:
+        with FindSession(config) as session:
+            return session.find(ac)
+
+    if cache is not None:
+        return cache.find(accession, _query)
+    return _query(accession)
 
+
+def find_many(
+    config: Config,
+    accessions: list[str],
+    associations: int = 1,
+    cache: FindCache | None = None,
+) -> dict[str, list[dict[str, str]]]:
+    """C-FIND many accessions over a few reused associations.
+
+    Accessions are spread round-robin over ``associations`` sessions,
+    each running its queries back to back on one association. Those
+    found in ``cache`` are not queried.
+
+    Returns:
+        {accession: safe-field dicts}, in input order (duplicates once).
+    """
+    unique = list(dict.fromkeys(accessions))
+    found: dict[str, list[dict[str, str]]] = {}
+    if cache is not None:
+        for ac in unique:
+            studies = cache.get(ac)
+            if studies is not None:
+                found[ac] = studies
+    pending = [ac for ac in unique if ac not in found]
+    # Sessions associate lazily: none is opened if everything was cached
+    associations = max(1, min(associations, len(pending)))
+    chunks = [pending[i::associations] for i in range(associations)]
+
+    def _run(chunk: list[str]) -> dict[str, list[dict[str, str]]]:
+        with FindSession(config) as session:
+            part = {}
+            for ac in chunk:
+                part[ac] = session.find(ac)
+                if cache is not None:
+                    cache.put(ac, part[ac])
+            return part
+
+    if associations == 1:
+        found.update(_run(pending))
+    else:
+        with ThreadPoolExecutor(max_workers=associations) as pool:
+            for part in pool.map(_run, chunks):
+                found.update(part)
+    return {ac: found[ac] for ac in unique}
+
+
+class FindSession:
+    """Study-level C-FIND over one association, reused across queries.
+
+    The association is opened on first use and re-opened once if the
+    PACS drops it mid-session.
+
+    Usage:
+        with FindSession(config) as session:
+            for ac in accessions:
+                studies = session.find(ac)
+    """
+
+    def __init__(self, config: Config) -> None:
+        self.config = config
+        self._ae = AE(ae_title=config.scp.ae_title)
+        self._ae.add_requested_context(StudyRootQueryRetrieveInformationModelFind)
+        self._assoc = None
+
+    def __enter__(self) -> FindSession:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Release the association if one is open."""
+        if self._assoc is not None:
+            if self._assoc.is_established:
+                self._assoc.release()
+            self._assoc = None
+
+    def find(self, accession: str) -> list[dict[str, str]]:
+        """C-FIND studies by AccessionNumber (safe fields only)."""
+        return self._query(_study_query(accession), accession)
+
+    def find_dates(
+        self, start: date, end: date, modality: str | None = None,
+    ) -> list[dict[str, str]]:
+        """C-FIND the studies of a StudyDate range (safe fields only).
+
+        Args:
+            start: First study date (inclusive).
+            end: Last study date (inclusive).
+            modality: Only studies with this modality (ModalitiesInStudy).
+        """
+        ds = _study_query("")
+        ds.StudyDate = f"{start:%Y%m%d}-{end:%Y%m%d}"
+        if modality:
+            ds.ModalitiesInStudy = modality
+        return self._query(ds, ds.StudyDate)
+
+    def _query(self, ds: Dataset, what: str) -> list[dict[str, str]]:
+        for attempt in (1, 2):
+            assoc = self._association()
+            results, complete = _send_find(assoc, ds)
+            if complete:
+                return results
+            # Association lost mid-query: reconnect and retry once
+            self.close()
+            if attempt == 2:
+                raise ConnectionError(
+                    f"C-FIND for {what} was interrupted by "
+                    f"{self.config.pacs.ae_title}"
+                )
+        return []  # unreachable
+
+    def _association(self):
+        if self._assoc is None or not self._assoc.is_established:
+            self._assoc = _associate(self._ae, self.config)
+        return self._assoc
+
+
+def _study_query(accession: str) -> Dataset:
+    """Study-level C-FIND identifier requesting safe metadata fields."""
     ds = Dataset()
     ds.QueryRetrieveLevel = "STUDY"
     ds.AccessionNumber = accession
@@ -72,90 +227,352 @@ def find_by_accession(
     ds.NumberOfStudyRelatedInstances = ""
     ds.PatientSex = ""
     ds.PatientAge = ""
+    # Lets C-GET negotiate storage contexts for exactly these classes
+    ds.SOPClassesInStudy = ""
+    return ds
+
+
+def find_by_date_range(
+    config: Config,
+    start: date,
+    end: date,
+    modality: str | None = None,
+    session: FindSession | None = None,
+) -> dict[str, list[dict[str, str]]]:
+    """Resolve a cohort with STUDY-level C-FINDs by StudyDate range.
+
+    The range is queried one calendar month at a time on one
+    association, which keeps each response under the result limits
+    many PACS impose on a single query.
+
+    Args:
+        config: PACS configuration.
+        start: First study date (inclusive).
+        end: Last study date (inclusive).
+        modality: Only studies with this modality (ModalitiesInStudy).
+        session: Open C-FIND session to query on (left open); by
+            default one is opened for the call.
+
+    Returns:
+        {AccessionNumber: safe-field dicts}; studies without an
+        accession number are left out.
+    """
+    if session is None:
+        with FindSession(config) as own:
+            return find_by_date_range(config, start, end, modality, own)
+
+    found: dict[str, list[dict[str, str]]] = {}
+    for first, last in _month_windows(start, end):
+        studies = session.find_dates(first, last, modality)
+        log.debug("C-FIND %s..%s: %d studies", first, last, len(studies))
+        for study in studies:
+            accession = study.get("AccessionNumber")
+            if accession:
+                found.setdefault(accession, []).append(study)
+    return found
+
+
+def _month_windows(start: date, end: date) -> list[tuple[date, date]]:
+    """Split [start, end] at calendar month boundaries."""
+    windows = []
+    first = start
+    while first <= end:
+        month_end = first.replace(
+            day=calendar.monthrange(first.year, first.month)[1],
+        )
+        last = min(month_end, end)
+        windows.append((first, last))
+        first = last + timedelta(days=1)
+    return windows
+
+
+def find_series(config: Config, study_uid: str) -> list[dict[str, str]]:
+    """C-FIND the series of a study.
+
+    Returns:
+        Safe series fields (SeriesInstanceUID, SeriesNumber, Modality,
+        SeriesDescription, ImageType, NumberOfSeriesRelatedInstances)
+        per series. Multi-valued ImageType is backslash-separated.
+    """
+    ds = Dataset()
+    ds.QueryRetrieveLevel = "SERIES"
+    ds.StudyInstanceUID = study_uid
+    ds.SeriesInstanceUID = ""
+    ds.SeriesNumber = ""
+    ds.Modality = ""
+    ds.SeriesDescription = ""
+    ds.ImageType = ""
+    ds.NumberOfSeriesRelatedInstances = ""
+    return _find_once(config, ds, _SERIES_KEYWORDS)
+
 
+def find_instances(
+    config: Config, study_uid: str, series_uid: str,
+) -> list[str]:
+    """C-FIND the SOPInstanceUIDs of one series."""
+    ds = Dataset()
+    ds.QueryRetrieveLevel = "IMAGE"
+    ds.StudyInstanceUID = study_uid
+    ds.SeriesInstanceUID = series_uid
+    ds.SOPInstanceUID = ""
+    results = _find_once(config, ds, ["SOPInstanceUID"])
+    return [r["SOPInstanceUID"] for r in results if r.get("SOPInstanceUID")]
+
+
+def _find_once(
+    config: Config, ds: Dataset, keywords: list[str],
+) -> list[dict[str, str]]:
+    """One C-FIND on a fresh association.
+
+    Raises:
+        ConnectionError: If the association fails or is cut off.
+    """
+    ae = AE(ae_title=config.scp.ae_title)
+    ae.add_requested_context(StudyRootQueryRetrieveInformationModelFind)
+    assoc = _associate(ae, config)
+    try:
+        results, complete = _send_find(assoc, ds, keywords)
+    finally:
+        if assoc.is_established:
+            assoc.release()
+    if not complete:
+        raise ConnectionError(
+            f"{ds.QueryRetrieveLevel} C-FIND was interrupted by "
+            f"{config.pacs.ae_title}"
+        )
+    return results
+
+
+def _send_find(
+    assoc, ds: Dataset, keywords: list[str] | None = None,
+) -> tuple[list[dict[str, str]], bool]:
+    """Send one C-FIND; return (safe results, False if it was cut off).
+
+    Raises:
+        PacsBusy: On an out-of-resources status (0xA7xx).
+        RuntimeError: On any other failure status (0xA8xx-0xCxxx).
+    """
+    results: list[dict[str, str]] = []
+    responses = assoc.send_c_find(
+        ds, StudyRootQueryRetrieveInformationModelFind
+    )
+    for status, identifier in responses:
+        if not status:
+            # Empty status: timeout, abort or invalid response
+            return results, False
+        s = status.Status
+        if s in (0xFF00, 0xFF01) and identifier:
+            results.append(_extract_safe_fields(identifier, keywords))
+        elif s & 0xFF00 == 0xA700:
+            raise PacsBusy(f"C-FIND refused, out of resources (0x{s:04X})")
+        elif 0xA000 <= s <= 0xCFFF:
+            raise RuntimeError(f"C-FIND failed with status 0x{s:04X}")
+    return results, True
+
+
+def _associate(ae: AE, config: Config, **kwargs):
+    """Associate with the PACS or raise ConnectionError."""
     assoc = ae.associate(
         config.pacs.host,
         config.pacs.port,
         ae_title=config.pacs.ae_title,
+        **kwargs,
     )
     if not assoc.is_established:
         raise ConnectionError(
             f"Cannot associate with {config.pacs.ae_title} "
             f"at {config.pacs.host}:{config.pacs.port}"
         )
-
-    results: list[dict[str, str]] = []
-    try:
-        responses = assoc.send_c_find(
-            ds, StudyRootQueryRetrieveInformationModelFind
-        )
-        for status, identifier in responses:
-            if status and status.Status in (0xFF00, 0xFF01) and identifier:
-                results.append(_extract_safe_fields(identifier))
-    finally:
-        assoc.release()
-
-    return results
+    return assoc
 
 
 def move_study(
     config: Config,
     study_uid: str,
-) -> dict[str, int]:
-    """C-MOVE a study to our SCP.
+    store_handler: StoreHandler | None = None,
+    sop_classes: list[str] | None = None,
+) -> dict[str, float]:
+    """Retrieve a study: C-MOVE to our SCP, or C-GET (pacs.retrieval).
 
     Args:
         config: PACS and SCP configuration.
         study_uid: StudyInstanceUID to retrieve.
+        store_handler: EVT_C_STORE handler for C-GET (required then,
+            ignored for C-MOVE).
+        sop_classes: SOP classes of the study (SOPClassesInStudy), for
+            the C-GET storage contexts; by default pynetdicom's common
+            storage classes.
 
     Returns:
-        Dict with completed/failed/warning counts.
+        Dict with completed/failed/warning sub-operation counts from
+        the final response, and associate_s: seconds taken to open
+        the association.
     """
-    ae = AE(ae_title=config.scp.ae_title)
-    ae.add_requested_context(StudyRootQueryRetrieveInformationModelMove)
-
     ds = Dataset()
     ds.QueryRetrieveLevel = "STUDY"
     ds.StudyInstanceUID = study_uid
+    return _retrieve(config, ds, store_handler, sop_classes)
 
-    assoc = ae.associate(
-        config.pacs.host,
-        config.pacs.port,
-        ae_title=config.pacs.ae_title,
-    )
-    if not assoc.is_established:
-        raise ConnectionError(
-            f"Cannot associate with {config.pacs.ae_title} "
-            f"at {config.pacs.host}:{config.pacs.port}"
-        )
 
-    result = {"completed": 0, "failed": 0, "warning": 0}
+def move_series(
+    config: Config,
+    study_uid: str,
+    series_uid: str,
+    store_handler: StoreHandler | None = None,
+    sop_classes: list[str] | None = None,
+) -> dict[str, float]:
+    """Retrieve one series (as for move_study)."""
+    ds = Dataset()
+    ds.QueryRetrieveLevel = "SERIES"
+    ds.StudyInstanceUID = study_uid
+    ds.SeriesInstanceUID = series_uid
+    return _retrieve(config, ds, store_handler, sop_classes)
+
+
+def move_instances(
+    config: Config,
+    study_uid: str,
+    series_uid: str,
+    sop_uids: list[str],
+    store_handler: StoreHandler | None = None,
+    sop_classes: list[str] | None = None,
+) -> dict[str, float]:
+    """Retrieve selected instances of one series (as for move_study)."""
+    ds = Dataset()
+    ds.QueryRetrieveLevel = "IMAGE"
+    ds.StudyInstanceUID = study_uid
+    ds.SeriesInstanceUID = series_uid
+    ds.SOPInstanceUID = sop_uids
+    return _retrieve(config, ds, store_handler, sop_classes)
+
+
+def _retrieve(
+    config: Config,
+    ds: Dataset,
+    store_handler: StoreHandler | None,
+    sop_classes: list[str] | None = None,
+) -> dict[str, float]:
+    if config.pacs.retrieval == "c-get":
+        if store_handler is None:
+            raise ValueError("C-GET retrieval needs a C-STORE handler")
+        return _get(config, ds, store_handler, sop_classes)
+    return _move(config, ds)
+
+
+def _move(config: Config, ds: Dataset) -> dict[str, float]:
+    """Send one C-MOVE and return its sub-operation counts."""
+    ae = AE(ae_title=config.scp.ae_title)
+    ae.add_requested_context(StudyRootQueryRetrieveInformationModelMove)
+
+    t0 = time.monotonic()
+    assoc = _associate(ae, config)
+    associate_s = time.monotonic() - t0
     try:
         responses = assoc.send_c_move(
             ds,
             config.scp.ae_title,
             StudyRootQueryRetrieveInformationModelMove,
         )
-        for status, identifier in responses:
-            if status:
-                s = status.Status
-                if s == 0x0000:  # success
-                    result["completed"] = getattr(
-                        status, "NumberOfCompletedSubOperations", 0
-                    )
-                    result["failed"] = getattr(
-                        status, "NumberOfFailedSubOperations", 0
-                    )
-                    result["warning"] = getattr(
-                        status, "NumberOfWarningSubOperations", 0
-                    )
-                elif s == 0xC000:
-                    raise RuntimeError(
-                        f"C-MOVE failed with status 0x{s:04X}"
-                    )
+        result = _suboperation_counts(responses, "C-MOVE")
+        result["associate_s"] = associate_s
+        return result
+    finally:
+        assoc.release()
+
+
+# Presentation contexts an association may propose, less the C-GET model
+_MAX_STORAGE_CONTEXTS = 127
+
+
+def _get(
+    config: Config,
+    ds: Dataset,
+    store_handler: StoreHandler,
+    sop_classes: list[str] | None = None,
+) -> dict[str, float]:
+    """Send one C-GET; instances arrive on this association.
+
+    We must propose a storage context (with the SCP role) for every SOP
+    class the PACS will send, and an association holds at most 128
+    contexts. sop_classes (the study's SOPClassesInStudy from the
+    resolving C-FIND) are proposed if known; otherwise pynetdicom's
+    common storage classes (StoragePresentationContexts, not every
+    storage class), and the PACS fails the sub-operations of instances
+    of any other class.
+    """
+    if not sop_classes:
+        sop_classes = [
+            cx.abstract_syntax
+            for cx in StoragePresentationContexts[:_MAX_STORAGE_CONTEXTS]
+        ]
+    elif len(sop_classes) > _MAX_STORAGE_CONTEXTS:
+        log.warning(
+            "C-GET: %d SOP classes to retrieve, only %d can be negotiated",
+            len(sop_classes), _MAX_STORAGE_CONTEXTS,
+        )
+        sop_classes = sop_classes[:_MAX_STORAGE_CONTEXTS]
+
+    ae = AE(ae_title=config.scp.ae_title)
+    ae.add_requested_context(StudyRootQueryRetrieveInformationModelGet)
+    roles = []
+    for sop_class in sop_classes:
+        ae.add_requested_context(sop_class)
+        roles.append(build_role(sop_class, scp_role=True))
+
+    t0 = time.monotonic()
+    assoc = _associate(
+        ae, config,
+        ext_neg=roles,
+        evt_handlers=[(evt.EVT_C_STORE, store_handler)],
+    )
+    associate_s = time.monotonic() - t0
+    try:
+        responses = assoc.send_c_get(
+            ds, StudyRootQueryRetrieveInformationModelGet,
+        )
+        result = _suboperation_counts(responses, "C-GET")
+        result["associate_s"] = associate_s
+        return result
     finally:
         assoc.release()
 
+
+def _suboperation_counts(responses, operation: str) -> dict[str, int]:
+    """Counts from the final C-MOVE/C-GET response.
+
+    Raises:
+        PacsBusy: On an out-of-resources status (0xA7xx).
+        RuntimeError: On any other failure status (0xA8xx-0xCxxx).
+        ConnectionError: If the association was aborted or timed out
+            before the final response.
+    """
+    result = {"completed": 0, "failed": 0, "warning": 0}
+    for status, identifier in responses:
+        if not status:
+            # Empty status: timeout, abort or invalid response
+            raise ConnectionError(
+                f"{operation} association lost before the final response"
+            )
+        s = status.Status
+        # Final response: success, or warning (some sub-ops failed)
+        if s in (0x0000, 0xB000):
+            result["completed"] = getattr(
+                status, "NumberOfCompletedSuboperations", 0
+            )
+            result["failed"] = getattr(
+                status, "NumberOfFailedSuboperations", 0
+            )
+            result["warning"] = getattr(
+                status, "NumberOfWarningSuboperations", 0
+            )
+        elif s & 0xFF00 == 0xA700:
+            raise PacsBusy(
+                f"{operation} refused, out of resources (0x{s:04X})"
+            )
+        elif 0xA000 <= s <= 0xCFFF:
+            raise RuntimeError(
+                f"{operation} failed with status 0x{s:04X}"
+            )
     return result
 
 
@@ -173,14 +590,29 @@ _SAFE_KEYWORDS = [
     "NumberOfStudyRelatedInstances",
     "PatientSex",
     "PatientAge",
+    "SOPClassesInStudy",
+]
+
+
+_SERIES_KEYWORDS = [
+    "SeriesInstanceUID",
+    "SeriesNumber",
+    "Modality",
+    "SeriesDescription",
+    "ImageType",
+    "NumberOfSeriesRelatedInstances",
 ]
 
 
-def _extract_safe_fields(ds: Dataset) -> dict[str, str]:
+def _extract_safe_fields(
+    ds: Dataset, keywords: list[str] | None = None,
+) -> dict[str, str]:
     """Extract only safe metadata fields from a C-FIND response."""
     result: dict[str, str] = {}
-    for kw in _SAFE_KEYWORDS:
+    for kw in keywords or _SAFE_KEYWORDS:
         val = getattr(ds, kw, None)
-        if val is not None:
+        if isinstance(val, MultiValue):
+            result[kw] = "\\".join(str(v) for v in val)
+        elif val is not None:
             result[kw] = str(val)
     return result
@@ -0,0 +1,125 @@
+"""Disk-space preflight: projected footprint of a load.
+
+Before anything is moved, the size of a load is estimated from the
+C-FIND instance counts (NumberOfStudyRelatedInstances) times the
+average instance size of each modality. Averages are learned from
+earlier loads (bytes written per image, recorded in audit.db); for
+modalities not loaded before, typical sizes below are used. The
+estimate is compared with the free space of output.base_dir, less
+``load.disk_reserve_gb``.
+"""
+
+from __future__ import annotations
+
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+
+# Typical uncompressed instance sizes, used until a modality has been loaded
+DEFAULT_INSTANCE_BYTES = {
+    "CT": 530_000,
+    "MR": 250_000,
+    "PT": 130_000,
+    "NM": 2_000_000,
+    "US": 1_000_000,
+    "XA": 8_000_000,
+    "RF": 4_000_000,
+    "CR": 10_000_000,
+    "DX": 12_000_000,
+    "MG": 40_000_000,
+    "SR": 20_000,
+}
+FALLBACK_INSTANCE_BYTES = 1_000_000
+
+
+@dataclass
+class Footprint:
+    """Projected disk use of a load."""
+
+    studies: int  # Studies to be moved
+    images: int  # Instances reported by C-FIND
+    estimated_bytes: int
+    free_bytes: int  # Free space less the reserve
+    unknown_studies: int = 0  # No instance count reported: not estimated
+
+    @property
+    def fits(self) -> bool:
+        return self.estimated_bytes <= self.free_bytes
+
+    def to_dict(self) -> dict:
+        return {
+            "studies": self.studies,
+            "images": self.images,
+            "estimated_bytes": self.estimated_bytes,
+            "free_bytes": self.free_bytes,
+            "unknown_studies": self.unknown_studies,
+            "fits": self.fits,
+        }
+
+    def describe(self) -> str:
+        return (
+            f"~{_gb(self.estimated_bytes)} GB needed for {self.images} images"
+            f" in {self.studies} studies, {_gb(self.free_bytes)} GB free"
+        )
+
+
+def instance_bytes(modality: str, averages: dict[str, float]) -> float:
+    """Expected size of one instance of a study with this modality.
+
+    Args:
+        modality: Modality or ModalitiesInStudy ("CT", "PT\\CT", ...).
+        averages: Bytes per instance learned per modality string.
+    """
+    if averages.get(modality):
+        return averages[modality]
+    sizes = [
+        averages.get(m) or DEFAULT_INSTANCE_BYTES.get(m)
+        for m in modality.upper().split("\\")
+    ]
+    sizes = [s for s in sizes if s]
+    return max(sizes) if sizes else FALLBACK_INSTANCE_BYTES
+
+
+def estimate(
+    studies: list[dict[str, str]],
+    averages: dict[str, float],
+    free_bytes: int,
+) -> Footprint:
+    """Footprint of moving the given C-FIND results."""
+    images = 0
+    total = 0.0
+    unknown = 0
+    for study in studies:
+        try:
+            count = int(study.get("NumberOfStudyRelatedInstances") or "")
+        except ValueError:
+            unknown += 1
+            continue
+        modality = study.get("Modality", "") or study.get("ModalitiesInStudy", "")
+        images += count
+        total += count * instance_bytes(modality, averages)
+    return Footprint(
+        studies=len(studies),
+        images=images,
+        estimated_bytes=int(total),
+        free_bytes=free_bytes,
+        unknown_studies=unknown,
+    )
+
+
+def free_space(path: Path, reserve_gb: float = 0.0) -> int:
+    """Free bytes on the file system of path, less reserve_gb."""
+    # base_dir may not exist yet: measure its nearest existing parent
+    while not path.exists() and path != path.parent:
+        path = path.parent
+    free = shutil.disk_usage(path).free
+    return max(0, free - int(reserve_gb * 1e9))
+
+
+def directory_bytes(path: Path) -> int:
+    """Total size of the .dcm files under path."""
+    return sum(p.stat().st_size for p in path.rglob("*.dcm") if p.is_file())
+
+
+def _gb(n: int) -> str:
+    return f"{n / 1e9:.1f}"
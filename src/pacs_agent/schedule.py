@@ -0,0 +1,64 @@
+"""Retrieval order of resolved studies, by size.
+
+Sizes come from NumberOfStudyRelatedInstances in the C-FIND results.
+Orders:
+
+- ``file``: as listed (the default);
+- ``smallest``: shortest job first, so most results arrive early;
+- ``largest``: longest job first, so no big study is left to finish
+  alone at the end;
+- ``balanced``: the ``workers`` largest studies start first, one per
+  worker, and the rest follow smallest first. Parallel workers then
+  finish at about the same time, and results keep coming meanwhile.
+
+Studies of unknown size keep their list order after the sized ones.
+"""
+
+from __future__ import annotations
+
+ORDERS = ("file", "smallest", "largest", "balanced")
+
+
+def study_size(study: dict[str, str]) -> int | None:
+    """Instance count from a C-FIND result, None if not reported."""
+    try:
+        return int(study.get("NumberOfStudyRelatedInstances") or "")
+    except ValueError:
+        return None
+
+
+def schedule(
+    sizes: list[int | None], order: str, workers: int = 1,
+) -> list[int]:
+    """Order in which to retrieve studies.
+
+    Args:
+        sizes: Instance count of each study (None if unknown).
+        order: One of ORDERS.
+        workers: Studies retrieved in parallel (for ``balanced``).
+
+    Returns:
+        Indices into sizes, in retrieval order.
+
+    Raises:
+        ValueError: If order is unknown.
+    """
+    if order not in ORDERS:
+        raise ValueError(f"Unknown order {order!r} (expected one of {ORDERS})")
+    indices = list(range(len(sizes)))
+    if order == "file":
+        return indices
+
+    known = [i for i in indices if sizes[i] is not None]
+    unknown = [i for i in indices if sizes[i] is None]
+    # sorted() is stable: equal sizes keep list order
+    ascending = sorted(known, key=lambda i: sizes[i])
+    if order == "smallest":
+        return ascending + unknown
+    descending = sorted(known, key=lambda i: -sizes[i])
+    if order == "largest":
+        return descending + unknown
+
+    first = descending[:max(1, workers)]
+    started = set(first)
+    return first + [i for i in ascending if i not in started] + unknown
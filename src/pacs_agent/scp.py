@@ -3,58 +3,493 @@
 Starts a DICOM SCP that accepts incoming C-STORE requests,
 immediately anonymizes received files, and saves them to
 the project output directory.
+
+One SCP can receive several studies at once: each expected study
+is registered with ``expect()`` and incoming instances are routed
+to its case directory by StudyInstanceUID.
+
+With ``scp.writer_threads`` set, the C-STORE handler only queues the
+dataset and acknowledges; anonymize-and-write runs on a bounded pool
+of writer threads. With ``scp.anonymize_processes`` set, the handler
+does not decode the dataset at all: the encoded bytes go to a process
+pool that decodes, anonymizes and writes, so CPU-bound receives scale
+past the GIL. ``scp.max_pending_mb`` caps the encoded size of queued
+datasets — when it is reached the handler blocks, which in turn
+throttles the PACS.
+
+With ``scp.stream_to_disk`` set, pynetdicom spools each incoming
+dataset to a temporary file as PDUs arrive and the SCP anonymizes
+from that file with ``anonymize_stream`` (memory-mapped, pixel data
+never decoded), so peak memory does not grow with object size. Files
+queued for the writers wait in a spool directory of this SCP,
+``base_dir/.spool/<pid>-<id>``. As they still hold patient data, it is
+deleted when the SCP stops, and on start the directories of SCPs whose
+process is gone (a crash) are deleted too.
+
+Each receipt also times its study: arrival of the first instance,
+bytes received, and the CPU time (anonymize and encode) and remaining
+wall time (mostly disk) of its write jobs.
+
+Each receipt tracks the SOPInstanceUIDs it has stored. A receipt can
+be seeded with the instances of an interrupted earlier run
+(``StudyReceipt.restore``); instances it already holds are
+acknowledged without being written again.
 """
 
 from __future__ import annotations
 
 import logging
+import multiprocessing
+import os
+import shutil
 import threading
+import time
+import uuid
 import warnings
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from contextlib import contextmanager
+from io import BytesIO
 from pathlib import Path
+from typing import Callable
 
-from pydicom import Dataset
+from pydicom import Dataset, dcmread
 from pydicom.config import IGNORE
-from pynetdicom import AE, evt
+from pynetdicom import AE, _config, evt
 from pynetdicom.presentation import AllStoragePresentationContexts
 
-from .anonymize import anonymize_dataset
+from .anonymize import anonymize_bytes, anonymize_dataset, anonymize_stream
 from .config import Config
 
 log = logging.getLogger(__name__)
 
+# C-STORE failure status for instances of a study nobody asked for
+_STATUS_UNEXPECTED_STUDY = 0xC000
+
+_quiet_lock = threading.Lock()
+_quiet_users = 0
+_quiet_prev = None
+
+
+@contextmanager
+def _quiet_pydicom():
+    """Suppress pydicom validation warnings for non-standard VR values
+    from PACS (e.g. Philips sorting metadata in UI VR fields).
+
+    The data is preserved as-is; we just skip the validation noise.
+    The setting is global, so it is reference-counted across threads.
+    """
+    import pydicom.config as pydicom_config
+    global _quiet_users, _quiet_prev
+    with _quiet_lock:
+        if _quiet_users == 0:
+            _quiet_prev = pydicom_config.settings.reading_validation_mode
+            pydicom_config.settings.reading_validation_mode = IGNORE
+        _quiet_users += 1
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)
+            yield
+    finally:
+        with _quiet_lock:
+            _quiet_users -= 1
+            if _quiet_users == 0:
+                pydicom_config.settings.reading_validation_mode = _quiet_prev
+
+
+def _save_instance(ds: Dataset, file_path: Path, case_id: str) -> None:
+    """Anonymize a received dataset and write it to file_path."""
+    anonymize_dataset(ds, case_id)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    ds.save_as(file_path, enforce_file_format=True)
+
+
+def _timed(fn: Callable, *args) -> tuple[float, float]:
+    """Run fn(*args); return its CPU and wall seconds on this thread.
+
+    Top-level so it can run in the anonymize process pool.
+    """
+    cpu0, wall0 = time.thread_time(), time.perf_counter()
+    fn(*args)
+    return time.thread_time() - cpu0, time.perf_counter() - wall0
+
+
+def _save_instance_quiet(ds: Dataset, file_path: Path, case_id: str) -> None:
+    with _quiet_pydicom():
+        _save_instance(ds, file_path, case_id)
+
+
+def _init_anonymize_process() -> None:
+    """Process-pool initializer: same pydicom leniency as the handler."""
+    import pydicom.config as pydicom_config
+    pydicom_config.settings.reading_validation_mode = IGNORE
+    warnings.simplefilter("ignore", UserWarning)
+
+
+def _anonymize_spooled(spool_path: Path, file_path: Path, case_id: str) -> None:
+    """Anonymize a spooled C-STORE file to file_path, then remove it."""
+    try:
+        with _quiet_pydicom():
+            anonymize_stream(spool_path, file_path, case_id)
+    finally:
+        spool_path.unlink(missing_ok=True)
+
+
+def _remove_spool(spool_dir: Path) -> None:
+    """Delete a spool directory and the unwritten (un-anonymized) files in it."""
+    leftover = sum(1 for _ in spool_dir.glob("*.dcm"))
+    if leftover:
+        log.warning("Removed %d leftover spooled instances", leftover)
+    shutil.rmtree(spool_dir, ignore_errors=True)
+
+
+def _purge_stale_spools(root: Path) -> None:
+    """Remove the spool directories of SCP processes that no longer run."""
+    if not root.is_dir():
+        return
+    for spool_dir in root.iterdir():
+        pid, _, _ = spool_dir.name.partition("-")
+        if spool_dir.is_dir() and pid.isdigit() and not _process_alive(int(pid)):
+            _remove_spool(spool_dir)
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # someone else's process
+    return True
+
+
+def _peek_uids(data: bytes | Path) -> tuple[str, str]:
+    """Read StudyInstanceUID and SeriesInstanceUID from encoded bytes
+    or a file, without reading pixel data."""
+    ds = dcmread(
+        BytesIO(data) if isinstance(data, bytes) else data,
+        stop_before_pixels=True,
+        specific_tags=["StudyInstanceUID", "SeriesInstanceUID"],
+    )
+    return (
+        str(getattr(ds, "StudyInstanceUID", "")),
+        str(getattr(ds, "SeriesInstanceUID", "unknown")),
+    )
+
+
+def _affected_sop_uid(event: evt.Event) -> str:
+    """SOPInstanceUID from the C-STORE request (no dataset decoding)."""
+    return str(getattr(event.request, "AffectedSOPInstanceUID", "") or "")
+
+
+def _encoded_size(event: evt.Event) -> int:
+    """Size in bytes of the dataset as received over the network."""
+    try:
+        return len(event.request.DataSet.getbuffer())
+    except AttributeError:
+        return 0
+
+
+class _ByteBudget:
+    """Blocks callers while more than limit bytes are in flight."""
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.in_use = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, size: int) -> None:
+        with self._cond:
+            # A single object larger than the limit is let through alone
+            self._cond.wait_for(
+                lambda: self.in_use == 0 or self.in_use + size <= self.limit
+            )
+            self.in_use += size
+
+    def release(self, size: int) -> None:
+        with self._cond:
+            self.in_use -= size
+            self._cond.notify_all()
+
+
+class StudyReceipt:
+    """Receive state of one study: target case directory and stored files.
+
+    ``on_stored(series_uid, sop_uid, path)``, if given, is called after
+    each instance is written (e.g. to journal it).
+    """
+
+    def __init__(
+        self,
+        project_dir: Path,
+        case_id: str,
+        on_stored: Callable[[str, str, Path], None] | None = None,
+    ) -> None:
+        self.project_dir = project_dir
+        self.case_id = case_id
+        self.on_stored = on_stored
+
+        # Track received files: {SeriesInstanceUID: [file_paths]}
+        self.received_files: dict[str, list[Path]] = {}
+        self._series_counter: dict[str, int] = {}
+        self._instance_counter: dict[str, int] = {}
+        self.failed = 0  # instances acknowledged but not written
+        self.duplicates = 0  # instances already held, not written again
+        self._pending = 0  # instances queued for a writer thread
+        self.first_received: float | None = None  # time.monotonic()
+        self.bytes_received = 0  # encoded size of the instances received
+        self.anonymize_s = 0.0  # CPU time of write jobs (anonymize, encode)
+        self.write_s = 0.0  # rest of their wall time (mostly disk)
+        self._sop_uids: set[str] = set()  # stored or being written
+        self._lock = threading.Lock()
+        self._stored = threading.Condition(self._lock)
+
+    @property
+    def series_count(self) -> int:
+        return len(self.received_files)
+
+    @property
+    def image_count(self) -> int:
+        with self._lock:
+            return sum(len(files) for files in self.received_files.values())
+
+    def series_image_count(self, series_uid: str) -> int:
+        with self._lock:
+            return len(self.received_files.get(series_uid, ()))
+
+    def has_instance(self, sop_uid: str) -> bool:
+        with self._lock:
+            return sop_uid in self._sop_uids
+
+    def restore(self, stored: dict[str, tuple[str, Path]]) -> None:
+        """Seed with instances written by an earlier, interrupted run.
+
+        Series and instance numbering continue after the restored files.
+
+        Args:
+            stored: {SOPInstanceUID: (SeriesInstanceUID, file path)}, paths
+                as allocated by next_path().
+        """
+        with self._lock:
+            for sop_uid, (series_uid, path) in stored.items():
+                self.received_files.setdefault(series_uid, []).append(path)
+                self._sop_uids.add(sop_uid)
+                series_num = int(path.parent.name.removeprefix("series"))
+                self._series_counter[series_uid] = series_num
+                self._instance_counter[series_uid] = max(
+                    self._instance_counter.get(series_uid, 0), int(path.stem),
+                )
+
+    def assign_series(self, series_uids: list[str]) -> None:
+        """Number series up front (in the given order), not by arrival.
+
+        Series already numbered keep their number.
+        """
+        with self._lock:
+            for series_uid in series_uids:
+                if series_uid not in self._series_counter:
+                    self._series_counter[series_uid] = (
+                        max(self._series_counter.values(), default=0) + 1
+                    )
+
+    def received(self, size: int) -> None:
+        """Count an incoming instance of size bytes (as encoded)."""
+        with self._lock:
+            if self.first_received is None:
+                self.first_received = time.monotonic()
+            self.bytes_received += size
+
+    def timed(self, cpu_s: float, wall_s: float) -> None:
+        """Add the CPU and wall seconds of one write job."""
+        with self._lock:
+            self.anonymize_s += cpu_s
+            self.write_s += max(0.0, wall_s - cpu_s)
+
+    def claim(self, sop_uid: str) -> bool:
+        """Claim an incoming instance; False if it is already held.
+
+        Instances without a SOPInstanceUID are always accepted.
+        """
+        if not sop_uid:
+            return True
+        with self._lock:
+            if sop_uid in self._sop_uids:
+                self.duplicates += 1
+                self._stored.notify_all()
+                return False
+            self._sop_uids.add(sop_uid)
+            return True
+
+    def unclaim(self, sop_uid: str) -> None:
+        """Release a claimed instance that was not stored; a resend may store it."""
+        with self._lock:
+            self._sop_uids.discard(sop_uid)
+
+    def next_path(self, series_uid: str) -> Path:
+        """Allocate the output path for the next instance of a series."""
+        with self._lock:
+            if series_uid not in self._series_counter:
+                self._series_counter[series_uid] = (
+                    max(self._series_counter.values(), default=0) + 1
+                )
+            series_num = self._series_counter[series_uid]
+
+            if series_uid not in self._instance_counter:
+                self._instance_counter[series_uid] = 0
+            self._instance_counter[series_uid] += 1
+            inst_num = self._instance_counter[series_uid]
+
+        series_dir = self.project_dir / self.case_id / f"series{series_num:02d}"
+        return series_dir / f"{inst_num:05d}.dcm"
+
+    def add_file(
+        self, series_uid: str, file_path: Path, sop_uid: str = "",
+    ) -> None:
+        with self._stored:
+            if series_uid not in self.received_files:
+                self.received_files[series_uid] = []
+            self.received_files[series_uid].append(file_path)
+            self._stored.notify_all()
+        if self.on_stored is not None:
+            self.on_stored(series_uid, sop_uid, file_path)
+
+    def add_pending(self) -> None:
+        with self._lock:
+            self._pending += 1
+
+    def done_pending(
+        self, series_uid: str, file_path: Path | None, sop_uid: str = "",
+    ) -> None:
+        """Finish a queued instance: file_path on success, None on failure."""
+        with self._stored:
+            self._pending -= 1
+            if file_path is None:
+                self.failed += 1
+                # Not held after all: a resend may store it
+                self._sop_uids.discard(sop_uid)
+            else:
+                self.received_files.setdefault(series_uid, []).append(file_path)
+            self._stored.notify_all()
+        if file_path is not None and self.on_stored is not None:
+            self.on_stored(series_uid, sop_uid, file_path)
+
+    def wait_for(self, count: int, timeout: float) -> bool:
+        """Block until count instances are handled and none are queued.
+
+        An instance is handled once it is stored, its write failed, or
+        it was a duplicate of one already held.
+
+        Returns:
+            True if the count was reached, False on timeout.
+        """
+        def _done() -> bool:
+            stored = sum(len(f) for f in self.received_files.values())
+            handled = stored + self.failed + self.duplicates
+            return self._pending == 0 and handled >= count
+
+        with self._stored:
+            return self._stored.wait_for(_done, timeout=timeout)
+
 
 class TemporarySCP:
     """A C-STORE SCP that receives, anonymizes, and saves DICOM files.
 
-    Usage:
+    Usage (single study):
         scp = TemporarySCP(config, project_dir, case_id)
         scp.start()
         # ... trigger C-MOVE from PACS ...
         scp.stop()
         print(scp.received_files)
+
+    Usage (several studies, routed by StudyInstanceUID):
+        scp = TemporarySCP(config)
+        scp.start()
+        receipt = scp.expect(study_uid, project_dir, case_id)
+        # ... trigger C-MOVE from PACS ...
+        scp.release(study_uid)
+        scp.stop()
+        print(receipt.received_files)
     """
 
     def __init__(
         self,
         config: Config,
-        project_dir: Path,
-        case_id: str,
+        project_dir: Path | None = None,
+        case_id: str | None = None,
     ) -> None:
         self.config = config
-        self.project_dir = project_dir
-        self.case_id = case_id
-        self._server: AE | None = None
-        self._thread: threading.Thread | None = None
         self._server_instance = None
 
-        # Track received files: {SeriesInstanceUID: [file_paths]}
-        self.received_files: dict[str, list[Path]] = {}
-        self._series_counter: dict[str, int] = {}
-        self._instance_counter: dict[str, int] = {}
+        # Catch-all receipt: takes every instance when a case_id is given
+        self._default: StudyReceipt | None = None
+        if project_dir is not None and case_id is not None:
+            self._default = StudyReceipt(project_dir, case_id)
+
+        # Routed receipts: {StudyInstanceUID: StudyReceipt}
+        self._receipts: dict[str, StudyReceipt] = {}
         self._lock = threading.Lock()
 
+        self._writers: Executor | None = None
+        self._raw = False  # writers take encoded bytes, not datasets
+        self._spool_dir = (
+            config.output.base_dir / ".spool" / f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        )
+        self._prev_chunked: bool | None = None
+        self._budget = _ByteBudget(config.scp.max_pending_mb * 1024 * 1024)
+
+    @property
+    def received_files(self) -> dict[str, list[Path]]:
+        """Files received by the catch-all receipt (single-study usage)."""
+        if self._default is None:
+            return {}
+        return self._default.received_files
+
+    @property
+    def port(self) -> int:
+        """Port the running server is bound to (useful with scp.port 0)."""
+        if self._server_instance is None:
+            return self.config.scp.port
+        return self._server_instance.server_address[1]
+
+    @property
+    def store_handler(self) -> Callable[[evt.Event], int]:
+        """EVT_C_STORE handler, for C-GET associations opened elsewhere."""
+        return self._handle_store
+
     def start(self) -> None:
-        """Start the SCP in a background thread."""
+        """Start the SCP in a background thread.
+
+        With pacs.retrieval c-get no port is bound: instances arrive on
+        our own C-GET associations and reach store_handler directly.
+        """
+        if self.config.scp.stream_to_disk:
+            # Process-wide pynetdicom switch; restored in stop()
+            self._prev_chunked = _config.STORE_RECV_CHUNKED_DATASET
+            _config.STORE_RECV_CHUNKED_DATASET = True
+            _purge_stale_spools(self._spool_dir.parent)
+            self._spool_dir.mkdir(parents=True, exist_ok=True)
+
+        if self.config.scp.anonymize_processes > 0:
+            self._writers = ProcessPoolExecutor(
+                max_workers=self.config.scp.anonymize_processes,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_anonymize_process,
+            )
+            self._raw = True
+        elif self.config.scp.writer_threads > 0:
+            self._writers = ThreadPoolExecutor(
+                max_workers=self.config.scp.writer_threads,
+                thread_name_prefix="scp-writer",
+            )
+
+        if self.config.pacs.retrieval == "c-get":
+            log.info("SCP ready for C-GET (no listening port)")
+            return
+
         ae = AE(ae_title=self.config.scp.ae_title)
         ae.supported_contexts = AllStoragePresentationContexts
 
@@ -72,54 +507,182 @@ class TemporarySCP:
         )
 
     def stop(self) -> None:
-        """Stop the SCP."""
+        """Stop the SCP. Queued writes are finished first."""
         if self._server_instance:
             self._server_instance.shutdown()
             self._server_instance = None
             log.info("SCP stopped")
+        if self._writers:
+            self._writers.shutdown(wait=True)
+            self._writers = None
+        if self._prev_chunked is not None:
+            _config.STORE_RECV_CHUNKED_DATASET = self._prev_chunked
+            self._prev_chunked = None
+            _remove_spool(self._spool_dir)
+
+    def expect(
+        self,
+        study_uid: str,
+        project_dir: Path,
+        case_id: str,
+        on_stored: Callable[[str, str, Path], None] | None = None,
+    ) -> StudyReceipt:
+        """Route incoming instances of study_uid to project_dir/case_id.
+
+        Raises:
+            ValueError: If the study is already being received.
+        """
+        with self._lock:
+            if study_uid in self._receipts:
+                raise ValueError(f"study already being received: {study_uid}")
+            receipt = StudyReceipt(project_dir, case_id, on_stored)
+            self._receipts[study_uid] = receipt
+        return receipt
+
+    def release(self, study_uid: str) -> StudyReceipt | None:
+        """Stop routing study_uid. Later instances of it are rejected."""
+        with self._lock:
+            return self._receipts.pop(study_uid, None)
+
+    def _route(self, study_uid: str) -> StudyReceipt | None:
+        with self._lock:
+            receipt = self._receipts.get(study_uid)
+        return receipt if receipt is not None else self._default
 
     def _handle_store(self, event: evt.Event) -> int:
         """Handle incoming C-STORE request."""
-        # Suppress pydicom validation warnings for non-standard VR values
-        # from PACS (e.g. Philips sorting metadata in UI VR fields).
-        # The data is preserved as-is; we just skip the validation noise.
-        import pydicom.config as pydicom_config
-        prev = pydicom_config.settings.reading_validation_mode
-        pydicom_config.settings.reading_validation_mode = IGNORE
-        try:
-            with warnings.catch_warnings():
-                warnings.simplefilter("ignore", UserWarning)
-                return self._process_store(event)
-        finally:
-            pydicom_config.settings.reading_validation_mode = prev
+        with _quiet_pydicom():
+            return self._process_store(event)
 
     def _process_store(self, event: evt.Event) -> int:
+        if self.config.scp.stream_to_disk:
+            return self._process_store_spooled(event)
+        if self._raw:
+            return self._process_store_raw(event)
+
         ds: Dataset = event.dataset
         ds.file_meta = event.file_meta
 
+        receipt = self._route(getattr(ds, "StudyInstanceUID", ""))
+        if receipt is None:
+            log.warning("Rejected instance of a study that was not requested")
+            return _STATUS_UNEXPECTED_STUDY
+
+        size = _encoded_size(event)
+        receipt.received(size)
+        sop_uid = _affected_sop_uid(event) or str(ds.get("SOPInstanceUID", ""))
+        if not receipt.claim(sop_uid):
+            log.debug("Already stored: %s", sop_uid)
+            return 0x0000  # success — held from an earlier run
+
         series_uid = getattr(ds, "SeriesInstanceUID", "unknown")
+        file_path = receipt.next_path(series_uid)
 
-        with self._lock:
-            if series_uid not in self._series_counter:
-                self._series_counter[series_uid] = len(self._series_counter) + 1
-            series_num = self._series_counter[series_uid]
+        if self._writers is None:
+            try:
+                receipt.timed(*_timed(_save_instance, ds, file_path, receipt.case_id))
+            except Exception:
+                receipt.unclaim(sop_uid)
+                raise
+            receipt.add_file(series_uid, file_path, sop_uid)
+            log.debug("Stored: %s", file_path)
+            return 0x0000  # success
 
-            if series_uid not in self._instance_counter:
-                self._instance_counter[series_uid] = 0
-            self._instance_counter[series_uid] += 1
-            inst_num = self._instance_counter[series_uid]
+        self._queue(
+            _save_instance_quiet, (ds, file_path, receipt.case_id),
+            receipt, series_uid, sop_uid, file_path, size,
+        )
+        return 0x0000  # success — written asynchronously
 
-        anonymize_dataset(ds, self.case_id)
+    def _process_store_raw(self, event: evt.Event) -> int:
+        """Forward the encoded dataset to the process pool undecoded."""
+        data = event.encoded_dataset(include_meta=True)
+        study_uid, series_uid = _peek_uids(data)
 
-        series_dir = self.project_dir / self.case_id / f"series{series_num:02d}"
-        series_dir.mkdir(parents=True, exist_ok=True)
-        file_path = series_dir / f"{inst_num:05d}.dcm"
-        ds.save_as(file_path, enforce_file_format=True)
+        receipt = self._route(study_uid)
+        if receipt is None:
+            log.warning("Rejected instance of a study that was not requested")
+            return _STATUS_UNEXPECTED_STUDY
 
-        with self._lock:
-            if series_uid not in self.received_files:
-                self.received_files[series_uid] = []
-            self.received_files[series_uid].append(file_path)
+        receipt.received(len(data))
+        sop_uid = _affected_sop_uid(event)
+        if not receipt.claim(sop_uid):
+            log.debug("Already stored: %s", sop_uid)
+            return 0x0000  # success — held from an earlier run
+
+        file_path = receipt.next_path(series_uid)
+        self._queue(
+            anonymize_bytes, (data, file_path, receipt.case_id),
+            receipt, series_uid, sop_uid, file_path, len(data),
+        )
+        return 0x0000  # success — written asynchronously
+
+    def _process_store_spooled(self, event: evt.Event) -> int:
+        """Anonymize from the file pynetdicom spooled the dataset to."""
+        path = event.dataset_path
+        study_uid, series_uid = _peek_uids(path)
+
+        receipt = self._route(study_uid)
+        if receipt is None:
+            log.warning("Rejected instance of a study that was not requested")
+            return _STATUS_UNEXPECTED_STUDY
+
+        size = os.path.getsize(path)
+        receipt.received(size)
+        sop_uid = _affected_sop_uid(event)
+        if not receipt.claim(sop_uid):
+            log.debug("Already stored: %s", sop_uid)
+            return 0x0000  # success — held from an earlier run
+
+        file_path = receipt.next_path(series_uid)
+
+        if self._writers is None:
+            try:
+                receipt.timed(
+                    *_timed(anonymize_stream, path, file_path, receipt.case_id)
+                )
+            except Exception:
+                receipt.unclaim(sop_uid)
+                raise
+            receipt.add_file(series_uid, file_path, sop_uid)
+            log.debug("Stored: %s", file_path)
+            return 0x0000  # success
+
+        # pynetdicom deletes its temporary file when the handler returns
+        spool_path = self._spool_dir / f"{uuid.uuid4().hex}.dcm"
+        shutil.move(path, spool_path)
+        self._queue(
+            _anonymize_spooled, (spool_path, file_path, receipt.case_id),
+            receipt, series_uid, sop_uid, file_path, size,
+        )
+        return 0x0000  # success — written asynchronously
+
+    def _queue(
+        self,
+        fn,
+        args: tuple,
+        receipt: StudyReceipt,
+        series_uid: str,
+        sop_uid: str,
+        file_path: Path,
+        size: int,
+    ) -> None:
+        """Submit a write job, blocking while the byte budget is exhausted."""
+        self._budget.acquire(size)
+        receipt.add_pending()
+        future = self._writers.submit(_timed, fn, *args)
+
+        def _done(f: Future) -> None:
+            try:
+                cpu_s, wall_s = f.result()
+            except Exception:
+                log.exception("Failed to write %s", file_path)
+                receipt.done_pending(series_uid, None, sop_uid)
+            else:
+                receipt.timed(cpu_s, wall_s)
+                receipt.done_pending(series_uid, file_path, sop_uid)
+                log.debug("Stored: %s", file_path)
+            finally:
+                self._budget.release(size)
 
-        log.debug("Stored: %s", file_path)
-        return 0x0000  # success
+        future.add_done_callback(_done)
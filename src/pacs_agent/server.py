@@ -0,0 +1,451 @@
+"""Loader daemon (``rad-loader serve``) and its client.
+
+The daemon keeps one SCP bound, one C-FIND association open and (with
+metrics.textfile_dir) one metrics textfile up to date, and runs load
+jobs submitted over a Unix socket one after another. Jobs
+are kept in a SQLite queue (base_dir/serve.db), so queued jobs — and
+the job that was running, which then resumes from the load journal —
+survive a restart.
+
+Protocol: one JSON request per connection, one JSON line back.
+
+    {"op": "load", "project": ..., "accessions": [...], "dry_run": false,
+     "concurrency": null, "prefetch": null, "series_moves": null,
+     "series_filter": null, "prefetch_range": null,
+     "prefetch_modality": null, "refresh": false, "order": null,
+     "wait": true}
+        -> the load summary of ``rad-loader load`` plus "job"
+           (with "wait": false: {"status": "ok", "job": id, "state": "queued"})
+    {"op": "job", "job": id}        -> {"status": "ok", "job": {...}}
+    {"op": "jobs", "last": 20}      -> {"status": "ok", "jobs": [...]}
+    {"op": "ping"}                  -> {"status": "ok", "queued": n}
+    {"op": "shutdown"}              -> {"status": "ok"}
+
+The socket is created with mode 0600: only the owning user can submit.
+The client side imports nothing from pydicom/pynetdicom.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import socket
+import socketserver
+import sqlite3
+import threading
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+from .config import Config, SeriesFilter
+
+log = logging.getLogger(__name__)
+
+
+# ── Client ───────────────────────────────────────────────────────
+
+
+def request(socket_path: Path, payload: dict) -> dict:
+    """Send one request to a running daemon and return its reply.
+
+    Raises:
+        ConnectionError: If no daemon is listening on socket_path.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        try:
+            sock.connect(str(socket_path))
+        except OSError as e:
+            raise ConnectionError(
+                f"No rad-loader daemon at {socket_path}: {e}"
+            ) from e
+        sock.sendall(json.dumps(payload).encode() + b"\n")
+        with sock.makefile("rb") as f:
+            line = f.readline()
+    finally:
+        sock.close()
+    if not line:
+        raise ConnectionError(f"Daemon at {socket_path} closed the connection")
+    return json.loads(line)
+
+
+# ── Persistent job queue ─────────────────────────────────────────
+
+
+class JobQueue:
+    """FIFO of load jobs in SQLite (queued → running → done/failed)."""
+
+    def __init__(self, db_path: Path) -> None:
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            submitted TEXT NOT NULL,
+            state TEXT NOT NULL,
+            request TEXT NOT NULL,
+            result TEXT,
+            finished TEXT
+        )""")
+        self._conn.commit()
+        self._cond = threading.Condition()
+
+    def recover(self) -> int:
+        """Requeue jobs left running by a previous daemon."""
+        with self._cond:
+            n = self._conn.execute(
+                "UPDATE jobs SET state='queued' WHERE state='running'"
+            ).rowcount
+            self._conn.commit()
+            return n
+
+    def submit(self, req: dict) -> int:
+        with self._cond:
+            cur = self._conn.execute(
+                "INSERT INTO jobs (submitted,state,request) VALUES (?,?,?)",
+                (_now(), "queued", json.dumps(req)),
+            )
+            self._conn.commit()
+            self._cond.notify_all()
+            return cur.lastrowid
+
+    def next(self, timeout: float) -> tuple[int, dict] | None:
+        """Claim the oldest queued job, waiting up to timeout seconds."""
+        with self._cond:
+            row = self._oldest_queued()
+            if row is None:
+                self._cond.wait(timeout)
+                row = self._oldest_queued()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE jobs SET state='running' WHERE id=?", (row["id"],),
+            )
+            self._conn.commit()
+            return row["id"], json.loads(row["request"])
+
+    def finish(self, job_id: int, state: str, result: dict) -> None:
+        with self._cond:
+            self._conn.execute(
+                "UPDATE jobs SET state=?, result=?, finished=? WHERE id=?",
+                (state, json.dumps(result), _now(), job_id),
+            )
+            self._conn.commit()
+            self._cond.notify_all()
+
+    def wait(self, job_id: int) -> dict:
+        """Block until a job is done or failed; return it."""
+        with self._cond:
+            while True:
+                job = self._get(job_id)
+                if job is None or job["state"] in ("done", "failed"):
+                    return job
+                self._cond.wait()
+
+    def get(self, job_id: int) -> dict | None:
+        with self._cond:
+            return self._get(job_id)
+
+    def list(self, last: int = 20) -> list[dict]:
+        with self._cond:
+            rows = self._conn.execute(
+                "SELECT id,submitted,state,request,finished FROM jobs"
+                " ORDER BY id DESC LIMIT ?", (last,),
+            ).fetchall()
+        jobs = []
+        for row in reversed(rows):
+            req = json.loads(row["request"])
+            jobs.append({
+                "id": row["id"],
+                "submitted": row["submitted"],
+                "state": row["state"],
+                "project": req.get("project"),
+                "accessions": len(req.get("accessions", [])),
+                "finished": row["finished"],
+            })
+        return jobs
+
+    def queued(self) -> int:
+        with self._cond:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE state='queued'"
+            ).fetchone()[0]
+
+    def close(self) -> None:
+        with self._cond:
+            self._conn.close()
+
+    def _oldest_queued(self):
+        return self._conn.execute(
+            "SELECT id,request FROM jobs WHERE state='queued'"
+            " ORDER BY id LIMIT 1"
+        ).fetchone()
+
+    def _get(self, job_id: int) -> dict | None:
+        row = self._conn.execute(
+            "SELECT * FROM jobs WHERE id=?", (job_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["request"] = json.loads(job["request"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+# ── Daemon ───────────────────────────────────────────────────────
+
+
+class LoaderServer:
+    """Runs queued load jobs on a warm SCP and C-FIND association.
+
+    Usage:
+        server = LoaderServer(config)
+        server.start()
+        server.wait()     # until a shutdown request (or stop())
+        server.stop()
+    """
+
+    def __init__(self, config: Config, socket_path: Path | None = None) -> None:
+        self.config = config
+        self.socket_path = socket_path or config.socket_path
+        self.jobs = JobQueue(config.output.base_dir / "serve.db")
+        self._stopping = threading.Event()
+        self._server: socketserver.ThreadingUnixStreamServer | None = None
+        self._threads: list[threading.Thread] = []
+        self._scp = None
+        self._session = None
+        self._metrics = None
+        self._owns_socket = False
+
+    def start(self) -> None:
+        """Bind the socket, start the SCP and the job runner.
+
+        Raises:
+            RuntimeError: If another daemon is serving socket_path.
+            OSError: If the SCP port or the socket cannot be bound; whatever
+                was started is stopped again.
+        """
+        from .metrics import open_metrics
+        from .pacs import FindSession
+        from .scp import TemporarySCP
+
+        if self.socket_path.exists():
+            try:
+                request(self.socket_path, {"op": "ping"})
+            except ConnectionError:
+                self.socket_path.unlink()  # stale socket of a dead daemon
+            else:
+                raise RuntimeError(f"A daemon is already serving {self.socket_path}")
+
+        requeued = self.jobs.recover()
+        if requeued:
+            log.info("Requeued %d interrupted job(s)", requeued)
+
+        try:
+            self._scp = TemporarySCP(self.config)
+            self._scp.start()
+            self._session = FindSession(self.config)
+            # One writer for all jobs: moves in flight span the daemon
+            self._metrics = open_metrics(self.config)
+
+            self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+            old_umask = os.umask(0o177)
+            try:
+                self._server = socketserver.ThreadingUnixStreamServer(
+                    str(self.socket_path), self._handler_class(),
+                )
+            finally:
+                os.umask(old_umask)
+        except OSError:
+            self._release()
+            raise
+        # Only from here on is the socket file ours to remove
+        self._owns_socket = True
+        self._server.daemon_threads = True
+
+        for target, name in (
+            (self._server.serve_forever, "serve-socket"),
+            (self._run_jobs, "serve-jobs"),
+        ):
+            t = threading.Thread(target=target, name=name, daemon=True)
+            t.start()
+            self._threads.append(t)
+        log.info("Serving on %s", self.socket_path)
+
+    def wait(self) -> None:
+        """Block until shutdown is requested."""
+        while not self._stopping.wait(1.0):
+            pass
+
+    def stop(self) -> None:
+        """Stop accepting requests; the running job finishes first."""
+        self._stopping.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        for t in self._threads:
+            t.join()
+        self._threads = []
+        self._release()
+        log.info("Daemon stopped")
+
+    def _release(self) -> None:
+        """Close the session, SCP and job queue; unlink our own socket."""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+        if self._scp is not None:
+            self._scp.stop()
+            self._scp = None
+        if self._owns_socket:
+            self.socket_path.unlink(missing_ok=True)
+            self._owns_socket = False
+        self.jobs.close()
+
+    def _run_jobs(self) -> None:
+        while not self._stopping.is_set():
+            claimed = self.jobs.next(timeout=0.5)
+            if claimed is None:
+                continue
+            job_id, req = claimed
+            log.info("Job %d: %s, %d accession(s)",
+                     job_id, req["project"], len(req["accessions"]))
+            try:
+                result = self._load(req)
+            except Exception as e:
+                log.exception("Job %d failed", job_id)
+                self.jobs.finish(
+                    job_id, "failed", {"status": "error", "error": str(e)},
+                )
+            else:
+                self.jobs.finish(job_id, "done", result)
+
+    def _load(self, req: dict) -> dict:
+        from .findcache import open_find_cache
+        from .loader import load_studies, load_summary
+
+        raw_filter = req.get("series_filter")
+        raw_range = req.get("prefetch_range")
+        cache = open_find_cache(self.config, refresh=req.get("refresh", False))
+        try:
+            results, verification = load_studies(
+                self.config,
+                req["project"],
+                req["accessions"],
+                dry_run=req.get("dry_run", False),
+                concurrency=req.get("concurrency"),
+                prefetch=req.get("prefetch"),
+                series_moves=req.get("series_moves"),
+                series_filter=(
+                    SeriesFilter.from_dict(raw_filter) if raw_filter else None
+                ),
+                prefetch_range=(
+                    tuple(date.fromisoformat(d) for d in raw_range)
+                    if raw_range else None
+                ),
+                prefetch_modality=req.get("prefetch_modality"),
+                scp=self._scp,
+                find_session=self._session,
+                find_cache=cache,
+                order=req.get("order"),
+                metrics=self._metrics,
+            )
+            return load_summary(req["project"], results, verification, cache)
+        finally:
+            if cache is not None:
+                cache.close()
+
+    def _handle(self, req: dict) -> dict:
+        op = req.get("op")
+        if op == "load":
+            error = _check_load(req)
+            if error:
+                return {"status": "error", "error": error}
+            job_id = self.jobs.submit({
+                "project": req["project"],
+                "accessions": list(req["accessions"]),
+                "dry_run": bool(req.get("dry_run", False)),
+                "concurrency": req.get("concurrency"),
+                "prefetch": req.get("prefetch"),
+                "series_moves": req.get("series_moves"),
+                "series_filter": req.get("series_filter"),
+                "prefetch_range": req.get("prefetch_range"),
+                "prefetch_modality": req.get("prefetch_modality"),
+                "refresh": bool(req.get("refresh", False)),
+                "order": req.get("order"),
+            })
+            if not req.get("wait", True):
+                return {"status": "ok", "job": job_id, "state": "queued"}
+            job = self.jobs.wait(job_id)
+            return {**job["result"], "job": job_id}
+        if op == "job":
+            job = self.jobs.get(req.get("job"))
+            if job is None:
+                return {"status": "error", "error": f"No such job: {req.get('job')}"}
+            return {"status": "ok", "job": job}
+        if op == "jobs":
+            return {"status": "ok", "jobs": self.jobs.list(req.get("last", 20))}
+        if op == "ping":
+            return {"status": "ok", "queued": self.jobs.queued()}
+        if op == "shutdown":
+            self._stopping.set()
+            return {"status": "ok"}
+        return {"status": "error", "error": f"Unknown op: {op!r}"}
+
+    def _handler_class(self):
+        server = self
+
+        class _Handler(socketserver.StreamRequestHandler):
+            def handle(self) -> None:
+                line = self.rfile.readline()
+                try:
+                    reply = server._handle(json.loads(line))
+                except json.JSONDecodeError:
+                    reply = {"status": "error", "error": "Invalid JSON request"}
+                self.wfile.write(json.dumps(reply).encode() + b"\n")
+
+        return _Handler
+
+
+def _check_load(req: dict) -> str | None:
+    """Validation error of a load request, or None."""
+    if not req.get("project"):
+        return "No project given"
+    accessions = req.get("accessions")
+    if not isinstance(accessions, list) or not accessions:
+        return "No accession numbers provided"
+    concurrency = req.get("concurrency")
+    if concurrency is not None and (not isinstance(concurrency, int) or concurrency < 1):
+        return "concurrency must be at least 1"
+    for key in ("prefetch", "series_moves"):
+        value = req.get(key)
+        if value is not None and (not isinstance(value, int) or value < 0):
+            return f"{key} cannot be negative"
+    order = req.get("order")
+    if order is not None and order not in ("file", "smallest", "largest", "balanced"):
+        return f"Unknown order: {order!r}"
+    raw_range = req.get("prefetch_range")
+    if raw_range is not None:
+        try:
+            start, end = (date.fromisoformat(d) for d in raw_range)
+        except (TypeError, ValueError):
+            return "prefetch_range must be [first, last] ISO dates"
+        if end < start:
+            return "prefetch_range ends before it starts"
+    raw_filter = req.get("series_filter")
+    if raw_filter is not None:
+        from .filters import check_filter
+
+        if not isinstance(raw_filter, dict):
+            return "series_filter must be an object"
+        try:
+            return check_filter(SeriesFilter.from_dict(raw_filter))
+        except (TypeError, ValueError, AttributeError) as e:
+            return f"Invalid series_filter: {e}"
+    return None
@@ -0,0 +1,159 @@
+"""Adaptive limit on parallel study moves (AIMD).
+
+Bulk loads compete with clinical reads on the PACS. With
+``load.throttle.enabled`` the loader measures each study's C-MOVE time
+per image and each C-FIND's latency, and adjusts how many studies it
+moves at once:
+
+- additive increase: every healthy move adds ``increase / limit``, so
+  the limit grows by about ``increase`` per round of moves, up to
+  ``ceiling``;
+- multiplicative decrease: a latency spike (``spike_factor`` times the
+  running baseline), a failed move, failed sub-operations or an
+  out-of-resources status (0xA7xx) multiply the limit by ``decrease``,
+  down to ``floor``, at most once per ``cooldown`` seconds.
+
+Time-of-day caps (``caps``) bound the limit further, e.g. one move at
+a time during clinical hours; a cap of 0 pauses retrieval.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Iterator
+
+from .config import ThrottleConfig
+
+log = logging.getLogger(__name__)
+
+# Weight of the newest sample in the latency baselines
+_ALPHA = 0.2
+
+
+class Throttle:
+    """AIMD controller gating concurrent study moves.
+
+    Usage:
+        throttle = Throttle(config.load.throttle, start=2)
+        with throttle.slot():
+            t0 = time.monotonic()
+            result = move()
+        throttle.moved(time.monotonic() - t0, images, failed)
+    """
+
+    def __init__(
+        self,
+        config: ThrottleConfig,
+        start: int,
+        clock: Callable[[], float] = time.monotonic,
+        now: Callable[[], datetime] = datetime.now,
+    ) -> None:
+        self.config = config
+        self.limit = float(min(max(start, config.floor), config.ceiling))
+        self._clock = clock
+        self._now = now
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._move_baseline: float | None = None  # seconds per image
+        self._find_baseline: float | None = None  # seconds per C-FIND
+        self._last_decrease = float("-inf")
+
+    def allowed(self) -> int:
+        """Moves allowed at once right now (limit and time-of-day caps)."""
+        allowed = int(self.limit)
+        t = self._now().time()
+        for cap in self.config.caps:
+            if cap.covers(t):
+                allowed = min(allowed, cap.limit)
+        return allowed
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Hold one of the allowed move slots (waits for a free one)."""
+        with self._cond:
+            while self._in_flight >= self.allowed():
+                # Re-check periodically: a time-of-day cap may lift
+                self._cond.wait(timeout=30.0)
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+                self._cond.notify_all()
+
+    def moved(self, seconds: float, images: int, failed: int = 0) -> None:
+        """Record a finished move of ``images`` instances."""
+        with self._cond:
+            if failed:
+                self._decrease(f"{failed} failed sub-operations")
+                return
+            if images <= 0:
+                return
+            per_image = seconds / images
+            baseline = self._move_baseline
+            self._move_baseline = _ewma(baseline, per_image)
+            if baseline is not None and per_image > self.config.spike_factor * baseline:
+                self._decrease(
+                    f"move latency {per_image * 1000:.0f} ms/image"
+                    f" (baseline {baseline * 1000:.0f})"
+                )
+            else:
+                self._increase()
+
+    def found(self, seconds: float) -> None:
+        """Record the latency of a C-FIND."""
+        with self._cond:
+            baseline = self._find_baseline
+            self._find_baseline = _ewma(baseline, seconds)
+            if baseline is not None and seconds > self.config.spike_factor * baseline:
+                self._decrease(
+                    f"C-FIND latency {seconds * 1000:.0f} ms"
+                    f" (baseline {baseline * 1000:.0f})"
+                )
+
+    def failed(self, busy: bool = False) -> None:
+        """Record a failed C-FIND or move (busy: 0xA7xx status)."""
+        with self._cond:
+            self._decrease("PACS out of resources" if busy else "failure")
+
+    def stats(self) -> dict[str, float | None]:
+        """Current limit and measured throughput."""
+        with self._cond:
+            rate = self._move_baseline
+            return {
+                "limit": round(self.limit, 2),
+                "images_per_s": round(1 / rate, 1) if rate else None,
+            }
+
+    def _increase(self) -> None:
+        before = int(self.limit)
+        self.limit = min(
+            float(self.config.ceiling),
+            self.limit + self.config.increase / max(1.0, self.limit),
+        )
+        if int(self.limit) > before:
+            log.info("Throttle: up to %d parallel moves", int(self.limit))
+            self._cond.notify_all()
+
+    def _decrease(self, reason: str) -> None:
+        now = self._clock()
+        if now - self._last_decrease < self.config.cooldown:
+            return
+        self._last_decrease = now
+        before = int(self.limit)
+        self.limit = max(float(self.config.floor), self.limit * self.config.decrease)
+        if int(self.limit) < before:
+            log.info(
+                "Throttle: down to %d parallel moves (%s)", int(self.limit), reason,
+            )
+
+
+def _ewma(baseline: float | None, sample: float) -> float:
+    if baseline is None:
+        return sample
+    return (1 - _ALPHA) * baseline + _ALPHA * sample
@@ -34,6 +34,12 @@ def verify_load(results: list) -> dict:
                     f"{r.accession} ({r.case_id}): {r.image_count} images"
                     " (unusually high)"
                 )
+            missing = getattr(r, "missing_images", 0)
+            if missing:
+                warnings.append(
+                    f"{r.accession} ({r.case_id}): {missing} of"
+                    f" {r.expected_images} images not received"
+                )
         elif r.status == "skipped":
             skipped += 1
         elif r.status == "dry-run":
@@ -2,11 +2,17 @@
 
 from __future__ import annotations
 
+import socket
 import subprocess
 from pathlib import Path
 
 import pytest
 
+from pacs_agent.config import Config, OutputConfig, PacsConfig, ScpConfig
+from pacs_agent.fakepacs import FakePacs
+
+from .synthetic import write_study
+
 DICOM_TEST_DIR = Path.home() / "projects" / "dicom-test-files" / "data" / "WG04"
 REF_DIR = DICOM_TEST_DIR / "REF"
 
@@ -48,3 +54,41 @@ def ct1_path(tmp_dcm_dir: Path) -> Path:
 @pytest.fixture(scope="session")
 def mr1_path(tmp_dcm_dir: Path) -> Path:
     return tmp_dcm_dir / "MR1_UNC.dcm"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def fake_pacs(tmp_path: Path):
+    """Stand-in PACS with AC001 (2 series x 3 images) and AC002 (1 x 2).
+
+    C-MOVEs to TEST_SCP go to the port of ``fake_pacs_config``.
+    """
+    root = tmp_path / "pacs"
+    write_study(root, "AC001", "1.2.826.0.1.1", series=2, images=3)
+    write_study(root, "AC002", "1.2.826.0.1.2", series=1, images=2,
+                study_date="20240315")
+    pacs = FakePacs(root, destinations={"TEST_SCP": ("127.0.0.1", _free_port())})
+    pacs.start()
+    yield pacs
+    pacs.stop()
+
+
+@pytest.fixture
+def fake_pacs_config(fake_pacs: FakePacs, tmp_path: Path) -> Config:
+    """Configuration loading from ``fake_pacs`` into tmp_path/out."""
+    config = Config(
+        pacs=PacsConfig(
+            host="127.0.0.1", port=fake_pacs.port, ae_title=fake_pacs.ae_title,
+        ),
+        scp=ScpConfig(
+            ae_title="TEST_SCP", port=fake_pacs.destinations["TEST_SCP"][1],
+        ),
+        output=OutputConfig(base_dir=tmp_path / "out"),
+    )
+    config.load.store_timeout = 5.0
+    return config
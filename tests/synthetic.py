@@ -0,0 +1,100 @@
+"""Synthetic DICOM instances for tests that cannot rely on sample files."""
+
+from __future__ import annotations
+
+from io import BytesIO
+from pathlib import Path
+from types import SimpleNamespace
+
+from pydicom.dataset import Dataset, FileMetaDataset
+from pydicom.uid import CTImageStorage, ExplicitVRLittleEndian, generate_uid
+from pynetdicom.dsutils import encode, encode_file_meta
+
+
+def make_instance(
+    study_uid: str,
+    series_uid: str,
+    sop_uid: str | None = None,
+    rows: int = 4,
+    columns: int = 4,
+) -> Dataset:
+    """Build a small CT instance carrying PHI and a private tag."""
+    sop_uid = sop_uid or generate_uid()
+
+    meta = FileMetaDataset()
+    meta.MediaStorageSOPClassUID = CTImageStorage
+    meta.MediaStorageSOPInstanceUID = sop_uid
+    meta.TransferSyntaxUID = ExplicitVRLittleEndian
+
+    ds = Dataset()
+    ds.file_meta = meta
+    ds.SOPClassUID = CTImageStorage
+    ds.SOPInstanceUID = sop_uid
+    ds.StudyInstanceUID = study_uid
+    ds.SeriesInstanceUID = series_uid
+    ds.Modality = "CT"
+    ds.PatientName = "Smith^John"
+    ds.PatientID = "123456-7890"
+    ds.PatientBirthDate = "19700101"
+    ds.InstitutionName = "JFK IMAGING CENTER"
+    ds.add_new(0x00091001, "LO", "vendor private")
+    ds.Rows = rows
+    ds.Columns = columns
+    ds.BitsAllocated = 16
+    ds.BitsStored = 12
+    ds.HighBit = 11
+    ds.PixelRepresentation = 0
+    ds.SamplesPerPixel = 1
+    ds.PhotometricInterpretation = "MONOCHROME2"
+    ds.PixelData = bytes(i % 251 for i in range(rows * columns * 2))
+    return ds
+
+
+class FakeStoreEvent:
+    """Stand-in for a pynetdicom EVT_C_STORE event."""
+
+    def __init__(self, ds: Dataset) -> None:
+        self.dataset = ds
+        self.file_meta = ds.file_meta
+        # Encoded dataset as carried in the C-STORE request
+        self.request = SimpleNamespace(
+            AffectedSOPInstanceUID=ds.SOPInstanceUID,
+            DataSet=BytesIO(encode_dataset(ds)),
+        )
+
+    def encoded_dataset(self, include_meta: bool = True) -> bytes:
+        stream = self.request.DataSet.getvalue()
+        if not include_meta:
+            return stream
+        return b"\x00" * 128 + b"DICM" + encode_file_meta(self.file_meta) + stream
+
+
+def encode_dataset(ds: Dataset) -> bytes:
+    """Encode ds without file meta, as sent in a C-STORE request."""
+    return encode(ds, is_implicit_vr=False, is_little_endian=True)
+
+
+def write_study(
+    root: Path,
+    accession: str,
+    study_uid: str,
+    series: int = 1,
+    images: int = 1,
+    study_date: str = "20240101",
+) -> list[Path]:
+    """Write a synthetic study as files under root/accession."""
+    paths = []
+    for s in range(series):
+        series_uid = f"{study_uid}.{s + 1}"
+        for i in range(images):
+            ds = make_instance(study_uid, series_uid, f"{series_uid}.{i + 1}")
+            ds.AccessionNumber = accession
+            ds.StudyDate = study_date
+            ds.StudyDescription = "Head CT"
+            ds.SeriesNumber = s + 1
+            ds.InstanceNumber = i + 1
+            path = root / accession / f"{s + 1:02d}_{i + 1:04d}.dcm"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            ds.save_as(path, enforce_file_format=True)
+            paths.append(path)
+    return paths
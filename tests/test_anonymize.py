@@ -5,9 +5,15 @@ from __future__ import annotations
 from pathlib import Path
 
 import pydicom
+import pytest
+from pydicom.data import get_testdata_file
 from pydicom.tag import Tag
 
-from pacs_agent.anonymize import anonymize_dataset, anonymize_file
+from pacs_agent.anonymize import (
+    anonymize_dataset,
+    anonymize_file,
+    anonymize_stream,
+)
 from pacs_agent.tags import PHI_TAGS, is_private_tag
 
 # Tags we explicitly re-set with case_id — they'll be present but safe
@@ -135,3 +141,49 @@ class TestAnonymizeFile:
             if tag in _RESET_TAGS:
                 continue
             assert tag not in ds, f"PHI tag {tag} in anonymized MR"
+
+
+class TestAnonymizeStream:
+    """The byte-level anonymizer must match the pydicom-based path."""
+
+    def _assert_identical(self, src: Path, tmp_path: Path) -> None:
+        expected = tmp_path / "expected.dcm"
+        streamed = tmp_path / "streamed.dcm"
+        anonymize_file(src, expected, "case0001")
+        anonymize_stream(src, streamed, "case0001")
+        assert streamed.read_bytes() == expected.read_bytes()
+
+    def test_identical_ct(self, ct1_path: Path, tmp_path: Path):
+        self._assert_identical(ct1_path, tmp_path)
+
+    def test_identical_mr(self, mr1_path: Path, tmp_path: Path):
+        self._assert_identical(mr1_path, tmp_path)
+
+    @pytest.mark.parametrize("name", [
+        "CT_small.dcm",            # explicit VR LE, private tags
+        "MR_small_implicit.dcm",   # implicit VR LE
+        "MR_small_bigendian.dcm",  # explicit VR BE
+        "JPEG2000.dcm",            # encapsulated pixel data
+        "nested_priv_SQ.dcm",      # undefined-length private sequences
+        "rtdose_rle.dcm",          # explicit VR UN for a known tag
+    ])
+    def test_identical_pydicom_samples(self, name: str, tmp_path: Path):
+        self._assert_identical(Path(get_testdata_file(name)), tmp_path)
+
+    def test_synthetic_phi_removed(self, tmp_path: Path):
+        from .synthetic import make_instance
+
+        src = tmp_path / "src.dcm"
+        make_instance("1.2.3", "1.2.3.4").save_as(src, enforce_file_format=True)
+        dst = tmp_path / "anon.dcm"
+        anonymize_stream(src, dst, "case0007")
+
+        ds = pydicom.dcmread(dst)
+        assert str(ds.PatientName) == "case0007"
+        assert ds.PatientID == "case0007"
+        assert ds.PatientIdentityRemoved == "YES"
+        assert "PatientBirthDate" not in ds
+        assert "InstitutionName" not in ds
+        assert not any(is_private_tag(e.tag) for e in ds)
+        assert ds.PixelData == pydicom.dcmread(src).PixelData
+        assert b"Smith" not in dst.read_bytes()
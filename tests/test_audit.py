@@ -1,9 +1,16 @@
 """Test audit logging."""
 
+import sqlite3
 from dataclasses import dataclass
 from pathlib import Path
 
-from pacs_agent.audit import get_db, log_results, query_audit
+from pacs_agent.audit import (
+    average_instance_bytes,
+    get_db,
+    log_results,
+    query_audit,
+)
+from pacs_agent.loader import StageTimings
 
 
 @dataclass
@@ -16,6 +23,8 @@ class FakeResult:
     series_count: int = 5
     duration_s: float | None = None
     error: str | None = None
+    bytes_written: int = 0
+    timings: StageTimings | None = None
 
 
 class TestAuditDB:
@@ -126,3 +135,69 @@ class TestQueryAudit:
         assert "timestamp" in rows[0]
         assert "operator" in rows[0]
         assert "accession" in rows[0]
+
+
+class TestInstanceSizes:
+    def test_adds_bytes_column_to_old_db(self, tmp_path: Path):
+        conn = sqlite3.connect(str(tmp_path / "audit.db"))
+        conn.execute("""CREATE TABLE audit (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT NOT NULL,
+            operator TEXT NOT NULL, project TEXT NOT NULL,
+            accession TEXT NOT NULL, case_id TEXT, status TEXT NOT NULL,
+            modality TEXT, image_count INTEGER, series_count INTEGER,
+            duration_s REAL, error TEXT
+        )""")
+        conn.close()
+
+        log_results(tmp_path, "proj", [
+            FakeResult("AC001", "case0001", "ok", "CT", 100, bytes_written=50_000_000),
+        ])
+        assert query_audit(tmp_path)[0]["bytes"] == 50_000_000
+
+    def test_average_per_modality(self, tmp_path: Path):
+        log_results(tmp_path, "proj", [
+            FakeResult("AC001", "case0001", "ok", "CT", 100, bytes_written=50_000_000),
+            FakeResult("AC002", "case0002", "ok", "CT", 300, bytes_written=170_000_000),
+            FakeResult("AC003", "case0003", "ok", "MR", 10, bytes_written=3_000_000),
+            FakeResult("AC004", "", "error", "MR", 0, error="C-MOVE failed"),
+            FakeResult("AC005", "case0005", "ok", "US", 5),  # size unknown
+        ])
+
+        assert average_instance_bytes(tmp_path) == {
+            "CT": 550_000.0,
+            "MR": 300_000.0,
+        }
+
+
+class TestStageTimings:
+    def test_stores_timings(self, tmp_path: Path):
+        timings = StageTimings(
+            find_s=0.05, associate_s=0.01, first_byte_s=0.4, move_s=12.0,
+            drain_s=0.2, anonymize_s=3.5, write_s=1.5, bytes_received=60_000_000,
+        )
+        log_results(tmp_path, "proj", [
+            FakeResult("AC001", "case0001", "ok", timings=timings),
+            FakeResult("AC002", "", "error", error="not found on PACS"),
+        ])
+
+        ok, failed = query_audit(tmp_path)
+        assert ok["move_s"] == 12.0
+        assert ok["first_byte_s"] == 0.4
+        assert ok["bytes_received"] == 60_000_000
+        assert failed["move_s"] is None
+
+    def test_adds_timing_columns_to_old_db(self, tmp_path: Path):
+        conn = sqlite3.connect(str(tmp_path / "audit.db"))
+        conn.execute("""CREATE TABLE audit (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT NOT NULL,
+            operator TEXT NOT NULL, project TEXT NOT NULL,
+            accession TEXT NOT NULL, case_id TEXT, status TEXT NOT NULL,
+            modality TEXT, image_count INTEGER, series_count INTEGER,
+            duration_s REAL, error TEXT, bytes INTEGER
+        )""")
+        conn.close()
+
+        log_results(tmp_path, "proj", [
+            FakeResult("AC001", "case0001", "ok", timings=StageTimings(find_s=0.1)),
+        ])
+        assert query_audit(tmp_path)[0]["find_s"] == 0.1
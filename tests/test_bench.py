@@ -0,0 +1,153 @@
+"""Test the benchmarks: cohorts, load runs, micro-benchmarks, comparisons."""
+
+from __future__ import annotations
+
+from io import BytesIO
+from pathlib import Path
+
+import pydicom
+
+from pacs_agent.bench import (
+    MICRO_FUNCTIONS,
+    Cohort,
+    StudySpec,
+    bench_config,
+    cohorts,
+    compare,
+    generate,
+    micro_dataset,
+    mismatches,
+    run_cohort,
+    time_function,
+)
+
+
+def _results(**metrics) -> dict:
+    return {"kind": "load", "size": "quick", "results": {"ct": metrics}}
+
+
+class TestCohorts:
+    def test_sizes(self):
+        assert set(cohorts("quick")) == {
+            "ct", "mr-multiframe", "many-series", "private-tags",
+        }
+        full_ct = cohorts("full")["ct"].studies
+        assert [s.images for s in full_ct] == [500, 1000, 2000, 5000]
+
+    def test_generates_once(self, tmp_path: Path):
+        cohort = Cohort("ct", [StudySpec("ct", 2, 3, rows=8, columns=8)])
+        directory = generate(cohort, tmp_path)
+        files = sorted(directory.rglob("*.dcm"))
+        assert len(files) == 6
+        mtime = files[0].stat().st_mtime_ns
+
+        generate(cohort, tmp_path)
+        assert files[0].stat().st_mtime_ns == mtime
+
+        bigger = Cohort("ct", [StudySpec("ct", 2, 4, rows=8, columns=8)])
+        assert len(list(generate(bigger, tmp_path).rglob("*.dcm"))) == 8
+
+    def test_multiframe(self, tmp_path: Path):
+        cohort = Cohort("mr", [StudySpec("mr-multiframe", 1, 1, frames=5,
+                                         rows=8, columns=8)])
+        ds = pydicom.dcmread(next(generate(cohort, tmp_path).rglob("*.dcm")))
+        assert ds.NumberOfFrames == 5
+        assert len(ds.PerFrameFunctionalGroupsSequence) == 5
+        assert len(ds.PixelData) == 5 * 8 * 8 * 2
+
+    def test_private_tags(self, tmp_path: Path):
+        cohort = Cohort("private", [StudySpec("private-tags", 1, 1, rows=8,
+                                              columns=8, private_tags=50)])
+        ds = pydicom.dcmread(next(generate(cohort, tmp_path).rglob("*.dcm")))
+        private = [e for e in ds.iterall() if e.tag.is_private]
+        assert len(private) > 50
+
+
+class TestRunCohort:
+    def test_loads_and_measures(self, tmp_path: Path):
+        cohort = Cohort("ct", [StudySpec("ct", 2, 3, rows=8, columns=8)])
+        directory = generate(cohort, tmp_path / "cohorts")
+        config = bench_config(None, tmp_path, pacs_port=0)
+
+        result = run_cohort(cohort, directory, config)
+
+        assert result.errors == 0
+        assert result.studies == 1
+        assert result.images == 6
+        assert result.bytes_received > 0
+        assert result.images_per_s > 0
+        assert result.peak_rss_mb > 0
+        assert "move_s" in result.stages
+        assert not config.output.base_dir.exists()
+
+
+class TestMicro:
+    def test_datasets(self):
+        vendor = pydicom.dcmread(BytesIO(micro_dataset("vendor-private")))
+        assert sum(1 for e in vendor if e.tag.is_private) > 2000
+
+        deep = pydicom.dcmread(BytesIO(micro_dataset("sequence-deep")))
+        depth, items = 0, deep.ContentSequence
+        while items:
+            depth += 1
+            items = items[0].get("ContentSequence")
+        assert depth == 5
+
+    def test_times_each_function(self, tmp_path: Path):
+        data = micro_dataset("sequence-deep")
+        for function in MICRO_FUNCTIONS:
+            result = time_function(function, data, tmp_path, iterations=3)
+            assert result.iterations == 3
+            assert 0 < result.min_us <= result.median_us
+            assert result.alloc_peak_kb > 0
+            assert result.elements > 1000
+        assert not (tmp_path / "dst.dcm").exists()
+
+
+class TestCompare:
+    def test_regressions_by_direction(self):
+        baseline = _results(images_per_s=100.0, cpu_ms_per_instance=10.0)
+        current = _results(images_per_s=85.0, cpu_ms_per_instance=11.0)
+
+        changes = {c.metric: c for c in compare(baseline, current)}
+        assert changes["images_per_s"].regression  # -15% > 10%
+        assert round(changes["images_per_s"].change, 2) == -0.15
+        assert not changes["cpu_ms_per_instance"].regression  # +10% < 15%
+
+    def test_improvements_pass(self):
+        changes = compare(
+            _results(images_per_s=100.0, peak_rss_mb=100.0),
+            _results(images_per_s=200.0, peak_rss_mb=50.0),
+        )
+        assert not any(c.regression for c in changes)
+
+    def test_threshold_override(self):
+        changes = compare(
+            _results(images_per_s=100.0),
+            _results(images_per_s=97.0),
+            {"images_per_s": 0.02},
+        )
+        assert changes[0].regression
+
+    def test_thresholds_by_kind(self):
+        baseline = {"kind": "anonymize", "results": {
+            "ct/save_as": {"median_us": 100.0, "alloc_peak_kb": 100.0},
+        }}
+        current = {"kind": "anonymize", "results": {
+            "ct/save_as": {"median_us": 110.0, "alloc_peak_kb": 120.0},
+        }}
+        changes = {c.metric: c for c in compare(baseline, current)}
+        assert not changes["median_us"].regression  # +10% < 15%
+        assert changes["alloc_peak_kb"].regression  # +20% > 10%
+
+    def test_only_common_cohorts(self):
+        baseline = {"results": {"ct": {"images_per_s": 1.0}}}
+        current = {"results": {"mr": {"images_per_s": 1.0}}}
+        assert compare(baseline, current) == []
+
+    def test_mismatches(self):
+        baseline = {"size": "quick", "environment": {"cpus": 4}}
+        current = {"size": "full", "environment": {"cpus": 8}}
+        assert mismatches(baseline, current) == [
+            "size differs", "environment cpus differs",
+        ]
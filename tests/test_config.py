@@ -0,0 +1,34 @@
+"""Test configuration loading."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from pacs_agent.config import Config
+
+EXAMPLE = Path(__file__).parent.parent / "config" / "example.yaml"
+
+
+def _write(tmp_path: Path, load: str) -> Path:
+    path = tmp_path / "config.yaml"
+    path.write_text(
+        "pacs:\n  host: 127.0.0.1\n  port: 104\n  ae_title: PACS\n"
+        f"load:\n{load}"
+    )
+    return path
+
+
+class TestFromFile:
+    def test_example_config_loads(self):
+        config = Config.from_file(EXAMPLE)
+        assert config.load.disk_check == "off"
+
+    def test_unquoted_off(self, tmp_path: Path):
+        config = Config.from_file(_write(tmp_path, "  disk_check: off\n"))
+        assert config.load.disk_check == "off"
+
+    def test_invalid_disk_check(self, tmp_path: Path):
+        with pytest.raises(ValueError, match="disk_check"):
+            Config.from_file(_write(tmp_path, "  disk_check: maybe\n"))
@@ -0,0 +1,240 @@
+"""End-to-end tests against the stand-in PACS (pacs.py, scp.py, loader)."""
+
+from __future__ import annotations
+
+import time
+from datetime import date
+from pathlib import Path
+
+import pydicom
+import pytest
+from pydicom.dataset import Dataset
+
+from pacs_agent.config import Config
+from pacs_agent.fakepacs import FakePacs, Faults, find, index_directory
+from pacs_agent.loader import load_studies
+from pacs_agent.pacs import (
+    PacsBusy,
+    echo,
+    find_by_accession,
+    find_by_date_range,
+    find_instances,
+    find_series,
+    move_study,
+)
+from pacs_agent.scp import TemporarySCP
+
+from .synthetic import write_study
+
+
+@pytest.fixture
+def receiver(fake_pacs_config: Config):
+    """The C-MOVE destination, saving into out/proj/case0001."""
+    scp = TemporarySCP(
+        fake_pacs_config, fake_pacs_config.output.base_dir / "proj", "case0001",
+    )
+    scp.start()
+    yield scp
+    scp.stop()
+
+
+class TestIndex:
+    def test_derived_counts(self, tmp_path: Path):
+        write_study(tmp_path, "AC001", "1.2.3", series=2, images=3)
+        instances = index_directory(tmp_path)
+
+        assert len(instances) == 6
+        attrs = instances[0].attrs
+        assert attrs["NumberOfStudyRelatedSeries"] == "2"
+        assert attrs["NumberOfStudyRelatedInstances"] == "6"
+        assert attrs["NumberOfSeriesRelatedInstances"] == "3"
+        assert attrs["ModalitiesInStudy"] == "CT"
+
+    def test_skips_non_dicom(self, tmp_path: Path):
+        write_study(tmp_path, "AC001", "1.2.3")
+        (tmp_path / "README.txt").write_text("not DICOM")
+        assert len(index_directory(tmp_path)) == 1
+
+    def test_matching(self, tmp_path: Path):
+        write_study(tmp_path, "AC001", "1.2.3", study_date="20240101")
+        write_study(tmp_path, "AC002", "1.2.4", study_date="20240601")
+        instances = index_directory(tmp_path)
+
+        def accessions(**keys) -> list[str]:
+            query = Dataset()
+            query.QueryRetrieveLevel = "STUDY"
+            query.AccessionNumber = ""
+            for keyword, value in keys.items():
+                setattr(query, keyword, value)
+            return [ds.AccessionNumber for ds in find(instances, query)]
+
+        assert accessions() == ["AC001", "AC002"]
+        assert accessions(AccessionNumber="AC002") == ["AC002"]
+        assert accessions(AccessionNumber="AC00*") == ["AC001", "AC002"]
+        assert accessions(StudyDate="20240501-20241231") == ["AC002"]
+        assert accessions(ModalitiesInStudy="MR") == []
+        assert accessions(StudyInstanceUID=["1.2.3", "1.2.9"]) == ["AC001"]
+
+
+class TestQueries:
+    def test_echo(self, fake_pacs_config: Config):
+        assert echo(fake_pacs_config) is True
+
+    def test_find_levels(self, fake_pacs_config: Config):
+        studies = find_by_accession(fake_pacs_config, "AC001")
+        assert len(studies) == 1
+        assert studies[0]["NumberOfStudyRelatedInstances"] == "6"
+        assert "PatientID" not in studies[0]  # only safe fields come back
+
+        study_uid = studies[0]["StudyInstanceUID"]
+        series = find_series(fake_pacs_config, study_uid)
+        assert [s["NumberOfSeriesRelatedInstances"] for s in series] == ["3", "3"]
+        sops = find_instances(
+            fake_pacs_config, study_uid, series[0]["SeriesInstanceUID"],
+        )
+        assert len(sops) == 3
+
+    def test_find_by_date_range(self, fake_pacs_config: Config):
+        found = find_by_date_range(
+            fake_pacs_config, date(2024, 3, 1), date(2024, 3, 31),
+        )
+        assert list(found) == ["AC002"]
+
+    def test_find_failure_status_raises(
+        self, fake_pacs: FakePacs, fake_pacs_config: Config,
+    ):
+        fake_pacs.faults = Faults(find_status=0xC000)
+        with pytest.raises(RuntimeError, match="0xC000"):
+            find_by_accession(fake_pacs_config, "AC001")
+        fake_pacs.faults = Faults(find_status=0xA700)
+        with pytest.raises(PacsBusy):
+            find_by_accession(fake_pacs_config, "AC001")
+
+    def test_find_failure_is_not_not_found(
+        self, fake_pacs: FakePacs, fake_pacs_config: Config,
+    ):
+        fake_pacs.faults = Faults(find_status=0xC000)
+        results, _ = load_studies(fake_pacs_config, "proj", ["AC001"])
+
+        assert results[0].status == "error"
+        assert results[0].error.startswith("C-FIND failed")
+
+
+class TestLoad:
+    def test_c_move(self, fake_pacs_config: Config):
+        results, verification = load_studies(
+            fake_pacs_config, "proj", ["AC001", "AC002", "AC404"],
+        )
+
+        assert [r.status for r in results] == ["ok", "ok", "error"]
+        assert [r.image_count for r in results[:2]] == [6, 2]
+        assert verification["loaded"] == 2
+        case_dir = fake_pacs_config.output.base_dir / "proj" / "case0001"
+        ds = pydicom.dcmread(next(case_dir.rglob("*.dcm")))
+        assert ds.PatientID == "case0001"
+        assert results[0].timings.first_byte_s is not None
+
+    def test_c_get(self, fake_pacs_config: Config):
+        fake_pacs_config.pacs.retrieval = "c-get"
+        results, _ = load_studies(fake_pacs_config, "proj", ["AC001"])
+        assert results[0].status == "ok"
+        assert results[0].image_count == 6
+
+    def test_c_get_sop_class_outside_defaults(self, tmp_path: Path):
+        from pynetdicom.presentation import StoragePresentationContexts
+
+        from pacs_agent.config import OutputConfig, PacsConfig, ScpConfig
+
+        # Not among pynetdicom's default storage contexts
+        sop_class = "1.2.840.10008.5.1.4.1.1.11.12"
+        assert sop_class not in {
+            cx.abstract_syntax for cx in StoragePresentationContexts
+        }
+        paths = write_study(tmp_path / "pacs", "AC001", "1.2.826.0.1.1", images=2)
+        ds = pydicom.dcmread(paths[0])
+        ds.SOPClassUID = sop_class
+        ds.file_meta.MediaStorageSOPClassUID = sop_class
+        ds.save_as(paths[0], enforce_file_format=True)
+
+        with FakePacs(tmp_path / "pacs") as pacs:
+            config = Config(
+                pacs=PacsConfig(
+                    host="127.0.0.1", port=pacs.port, ae_title=pacs.ae_title,
+                    retrieval="c-get",
+                ),
+                scp=ScpConfig(ae_title="TEST_SCP", port=0),
+                output=OutputConfig(base_dir=tmp_path / "out"),
+            )
+            config.load.store_timeout = 5.0
+            results, _ = load_studies(config, "proj", ["AC001"])
+
+        assert results[0].status == "ok"
+        assert results[0].image_count == 2
+        assert pacs.finds == 1  # classes came with the accession's C-FIND
+
+    def test_series_moves(self, fake_pacs: FakePacs, fake_pacs_config: Config):
+        results, _ = load_studies(
+            fake_pacs_config, "proj", ["AC001"], series_moves=2,
+        )
+        assert results[0].image_count == 6
+        assert fake_pacs.retrieves == 2
+
+    def test_unknown_destination(self, fake_pacs: FakePacs, fake_pacs_config: Config):
+        fake_pacs.destinations.clear()
+        results, _ = load_studies(fake_pacs_config, "proj", ["AC002"])
+        assert results[0].status == "error"
+        assert "0xA801" in results[0].error
+
+
+class TestFaults:
+    @pytest.mark.usefixtures("receiver")
+    def test_out_of_resources(self, fake_pacs: FakePacs, fake_pacs_config: Config):
+        fake_pacs.faults = Faults(retrieve_status=0xA702)
+        with pytest.raises(PacsBusy):
+            move_study(fake_pacs_config, "1.2.826.0.1.2")
+
+    def test_partial_sub_operations(
+        self, fake_pacs: FakePacs, fake_pacs_config: Config,
+    ):
+        fake_pacs.faults = Faults(retrieve_status=0xB000, fail_after=4)
+        results, verification = load_studies(fake_pacs_config, "proj", ["AC001"])
+
+        assert results[0].status == "ok"
+        assert results[0].image_count == 4
+        assert results[0].expected_images == 4
+
+    def test_dropped_association_resumes(
+        self, fake_pacs: FakePacs, fake_pacs_config: Config,
+    ):
+        fake_pacs.faults = Faults(drop_after=3, times=1)
+        first, _ = load_studies(fake_pacs_config, "proj", ["AC001"])
+        assert first[0].status == "error"
+        assert "association lost" in first[0].error
+
+        second, _ = load_studies(fake_pacs_config, "proj", ["AC001"])
+        assert second[0].status == "ok"
+        assert second[0].image_count == 6
+        assert second[0].resumed_images == 3
+
+    def test_max_retrieves(self, fake_pacs: FakePacs, fake_pacs_config: Config):
+        fake_pacs.max_retrieves = 1
+        fake_pacs.latency = 0.05
+        results, _ = load_studies(
+            fake_pacs_config, "proj", ["AC001"], series_moves=2,
+        )
+
+        assert fake_pacs.max_retrieves_in_flight == 1
+        assert results[0].status == "error"
+        assert "out of resources" in results[0].error
+
+    def test_latency(
+        self, fake_pacs: FakePacs, fake_pacs_config: Config,
+        receiver: TemporarySCP,
+    ):
+        fake_pacs.latency = 0.05
+        t0 = time.monotonic()
+        counts = move_study(fake_pacs_config, "1.2.826.0.1.2")
+
+        assert time.monotonic() - t0 >= 0.1
+        assert counts["completed"] == 2
+        assert sum(len(f) for f in receiver.received_files.values()) == 2
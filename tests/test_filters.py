@@ -0,0 +1,73 @@
+"""Tests for series selection."""
+
+from __future__ import annotations
+
+from pacs_agent.config import SeriesFilter
+from pacs_agent.filters import check_filter, select_series
+
+SERIES = [
+    {
+        "SeriesInstanceUID": "1.2.1",
+        "Modality": "CT",
+        "SeriesDescription": "Topogram 0.6 T20f",
+        "ImageType": "ORIGINAL\\PRIMARY\\LOCALIZER",
+        "NumberOfSeriesRelatedInstances": "2",
+    },
+    {
+        "SeriesInstanceUID": "1.2.2",
+        "Modality": "CT",
+        "SeriesDescription": "Thorax 1.0 Br40",
+        "ImageType": "ORIGINAL\\PRIMARY\\AXIAL",
+        "NumberOfSeriesRelatedInstances": "312",
+    },
+    {
+        "SeriesInstanceUID": "1.2.3",
+        "Modality": "SR",
+        "SeriesDescription": "Dose Report",
+        "NumberOfSeriesRelatedInstances": "1",
+    },
+]
+
+
+def _uids(series: list[dict[str, str]]) -> list[str]:
+    return [s["SeriesInstanceUID"] for s in series]
+
+
+class TestSelectSeries:
+    def test_empty_filter_keeps_all(self):
+        assert select_series(SERIES, SeriesFilter()) == SERIES
+
+    def test_modality(self):
+        flt = SeriesFilter.from_dict({"modalities": ["ct"]})
+        assert _uids(select_series(SERIES, flt)) == ["1.2.1", "1.2.2"]
+
+    def test_description_is_case_insensitive_search(self):
+        flt = SeriesFilter(description=r"thorax|abdomen")
+        assert _uids(select_series(SERIES, flt)) == ["1.2.2"]
+
+    def test_min_instances(self):
+        flt = SeriesFilter(min_instances=10)
+        assert _uids(select_series(SERIES, flt)) == ["1.2.2"]
+
+    def test_image_type_values_all_required(self):
+        flt = SeriesFilter.from_dict({"image_type": ["original", "axial"]})
+        # The SR series has no ImageType: not excluded by this criterion
+        assert _uids(select_series(SERIES, flt)) == ["1.2.2", "1.2.3"]
+
+    def test_all_criteria_must_match(self):
+        flt = SeriesFilter(
+            modalities=["CT"], description="br40", min_instances=100,
+            image_type=["PRIMARY"],
+        )
+        assert _uids(select_series(SERIES, flt)) == ["1.2.2"]
+
+
+class TestCheckFilter:
+    def test_valid(self):
+        assert check_filter(SeriesFilter(description=r"^ax")) is None
+
+    def test_bad_regex(self):
+        assert "pattern" in check_filter(SeriesFilter(description="(ax"))
+
+    def test_negative_min_instances(self):
+        assert check_filter(SeriesFilter(min_instances=-1)) is not None
@@ -0,0 +1,115 @@
+"""Tests for the C-FIND result cache."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from unittest.mock import patch
+
+from pacs_agent.config import (
+    Config,
+    FindCacheConfig,
+    OutputConfig,
+    PacsConfig,
+    ScpConfig,
+)
+from pacs_agent.findcache import FindCache, open_find_cache
+
+STUDY = {"AccessionNumber": "AC001", "StudyInstanceUID": "1.2.826.0.1.1"}
+
+
+def _cache(tmp_path: Path, **kwargs) -> FindCache:
+    return FindCache(tmp_path / "find_cache.db", "PACS@host:104", ttl=3600, **kwargs)
+
+
+class TestFindCache:
+    def test_hit_after_put(self, tmp_path: Path):
+        cache = _cache(tmp_path)
+        assert cache.get("AC001") is None
+        cache.put("AC001", [STUDY])
+        assert cache.get("AC001") == [STUDY]
+        assert cache.stats() == {"hits": 1, "misses": 1}
+        cache.close()
+
+    def test_persists_across_opens(self, tmp_path: Path):
+        cache = _cache(tmp_path)
+        cache.put("AC001", [STUDY])
+        cache.close()
+
+        cache = _cache(tmp_path)
+        assert cache.get("AC001") == [STUDY]
+        cache.close()
+
+    def test_find_queries_only_on_miss(self, tmp_path: Path):
+        cache = _cache(tmp_path)
+        queried = []
+
+        def query(ac):
+            queried.append(ac)
+            return [STUDY]
+
+        cache.find("AC001", query)
+        cache.find("AC001", query)
+        assert queried == ["AC001"]
+        cache.close()
+
+    def test_not_found_is_not_cached(self, tmp_path: Path):
+        cache = _cache(tmp_path)
+        cache.put("AC404", [])
+        assert cache.get("AC404") is None
+        cache.close()
+
+    def test_expired_entries_miss(self, tmp_path: Path):
+        cache = _cache(tmp_path)
+        with patch("pacs_agent.findcache.time.time", return_value=1000.0):
+            cache.put("AC001", [STUDY])
+        with patch("pacs_agent.findcache.time.time", return_value=1000.0 + 3601):
+            assert cache.get("AC001") is None
+        cache.close()
+
+    def test_refresh_ignores_cached_results(self, tmp_path: Path):
+        cache = _cache(tmp_path)
+        cache.put("AC001", [STUDY])
+        cache.close()
+
+        cache = _cache(tmp_path, refresh=True)
+        assert cache.get("AC001") is None
+        cache.close()
+
+    def test_keyed_by_pacs(self, tmp_path: Path):
+        cache = _cache(tmp_path)
+        cache.put("AC001", [STUDY])
+        cache.close()
+
+        other = FindCache(tmp_path / "find_cache.db", "OTHER@host:104", ttl=3600)
+        assert other.get("AC001") is None
+        other.close()
+
+    def test_clear(self, tmp_path: Path):
+        cache = _cache(tmp_path)
+        cache.put("AC001", [STUDY])
+        cache.put("AC002", [STUDY])
+        assert cache.clear(["AC001"]) == 1
+        assert cache.get("AC001") is None
+        assert cache.get("AC002") == [STUDY]
+        assert cache.clear() == 1
+        assert cache.get("AC002") is None
+        cache.close()
+
+
+class TestOpenFindCache:
+    def _config(self, tmp_path: Path, ttl_hours: float) -> Config:
+        return Config(
+            pacs=PacsConfig(host="127.0.0.1", port=104, ae_title="TEST_PACS"),
+            scp=ScpConfig(),
+            output=OutputConfig(base_dir=tmp_path),
+            find_cache=FindCacheConfig(ttl_hours=ttl_hours),
+        )
+
+    def test_opens_under_base_dir(self, tmp_path: Path):
+        cache = open_find_cache(self._config(tmp_path, 24))
+        assert cache is not None
+        cache.close()
+        assert (tmp_path / "find_cache.db").exists()
+
+    def test_zero_ttl_disables(self, tmp_path: Path):
+        assert open_find_cache(self._config(tmp_path, 0)) is None
@@ -0,0 +1,81 @@
+"""Test the load journal."""
+
+from pathlib import Path
+from unittest.mock import patch
+
+from pacs_agent.journal import LoadJournal
+
+
+def _journal_with_case(tmp_path: Path) -> LoadJournal:
+    journal = LoadJournal(tmp_path)
+    journal.start("case0001", "AC001", "1.1")
+    journal.stored("case0001", "1.1.1", "1.1.1.1", tmp_path / "case0001/series01/00001.dcm")
+    journal.stored("case0001", "1.1.1", "1.1.1.2", tmp_path / "case0001/series01/00002.dcm")
+    return journal
+
+
+class TestLoadJournal:
+    def test_replays_interrupted_case(self, tmp_path: Path):
+        _journal_with_case(tmp_path).close()
+
+        journal = LoadJournal(tmp_path)
+        case = journal.pending("AC001")
+        assert case.case_id == "case0001"
+        assert case.study_uid == "1.1"
+        assert case.stored["1.1.1.2"] == ("1.1.1", "case0001/series01/00002.dcm")
+        assert journal.case_ids() == ["case0001"]
+        assert journal.pending("AC002") is None
+
+    def test_done_cases_compacted(self, tmp_path: Path):
+        journal = _journal_with_case(tmp_path)
+        journal.start("case0002", "AC002", "2.2")
+        journal.done("case0001")
+        journal.close()
+
+        journal = LoadJournal(tmp_path)
+        assert journal.pending("AC001") is None
+        assert journal.case_ids() == ["case0002"]
+        assert "case0001" not in (tmp_path / "journal.jsonl").read_text()
+
+    def test_partial_last_line_ignored(self, tmp_path: Path):
+        _journal_with_case(tmp_path).close()
+        with open(tmp_path / "journal.jsonl", "a") as f:
+            f.write('{"event": "stored", "case_id": "case0001", "ser')
+
+        journal = LoadJournal(tmp_path)
+        assert len(journal.pending("AC001").stored) == 2
+        journal.stored("case0001", "1.1.1", "1.1.1.3", Path("case0001/series01/00003.dcm"))
+        journal.close()
+
+        assert len(LoadJournal(tmp_path).pending("AC001").stored) == 3
+
+    def test_restart_with_other_study_resets(self, tmp_path: Path):
+        journal = _journal_with_case(tmp_path)
+        journal.start("case0001", "AC001", "9.9")
+        journal.close()
+
+        case = LoadJournal(tmp_path).pending("AC001")
+        assert case.study_uid == "9.9"
+        assert case.stored == {}
+
+    def test_relative_project_dir(self, tmp_path: Path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        journal = LoadJournal(Path("data/proj"))
+        journal.start("case0001", "AC001", "1.1")
+        journal.stored(
+            "case0001", "1.1.1", "1.1.1.1",
+            Path("data/proj/case0001/series01/00001.dcm"),
+        )
+        journal.close()
+
+        case = LoadJournal(Path("data/proj")).pending("AC001")
+        assert case.stored["1.1.1.1"] == ("1.1.1", "case0001/series01/00001.dcm")
+
+    def test_fsynced_at_study_boundaries(self, tmp_path: Path):
+        with patch("pacs_agent.journal.os.fsync") as fsync:
+            journal = _journal_with_case(tmp_path)
+            assert fsync.call_count == 1  # start only, not each stored
+            journal.sync()
+            journal.done("case0001")
+            journal.close()
+        assert fsync.call_count == 3
@@ -2,7 +2,14 @@
 
 from pathlib import Path
 
-from pacs_agent.keyfile import KeyEntry, next_case_id, read_key_file, write_key_file
+from pacs_agent.keyfile import (
+    KeyEntry,
+    append_key_entry,
+    compact_key_file,
+    next_case_id,
+    read_key_file,
+    write_key_file,
+)
 
 
 class TestKeyFileRoundtrip:
@@ -65,3 +72,60 @@ class TestNextCaseId:
             KeyEntry("case0005", "AC002", "", "", "", 0, 0),
         ]
         assert next_case_id(entries) == "case0006"
+
+
+class TestAppend:
+    def test_append_creates_with_header(self, tmp_path: Path):
+        path = tmp_path / "proj" / "key.csv"
+        append_key_entry(path, KeyEntry("case0001", "AC001", "", "CT", "", 1, 10))
+        append_key_entry(path, KeyEntry("case0002", "AC002", "", "MR", "", 2, 20))
+
+        text = path.read_text()
+        assert text.startswith("case_id,accession,")
+        assert text.count("case_id") == 1
+        assert [e.case_id for e in read_key_file(path)] == ["case0001", "case0002"]
+
+    def test_append_keeps_existing_rows(self, tmp_path: Path):
+        path = tmp_path / "key.csv"
+        write_key_file(path, [KeyEntry("case0001", "AC001", "", "", "", 0, 0)])
+        before = path.read_bytes()
+
+        append_key_entry(path, KeyEntry("case0002", "AC002", "", "", "", 0, 0))
+
+        assert path.read_bytes().startswith(before)
+
+    def test_quoted_description(self, tmp_path: Path):
+        path = tmp_path / "key.csv"
+        entry = KeyEntry("case0001", "AC001", "", "CT", 'Head, "plain"', 1, 1)
+        append_key_entry(path, entry)
+        assert read_key_file(path)[0].description == 'Head, "plain"'
+
+
+class TestPartialLine:
+    def _crashed(self, tmp_path: Path) -> Path:
+        path = tmp_path / "key.csv"
+        write_key_file(path, [KeyEntry("case0001", "AC001", "", "", "", 1, 5)])
+        with open(path, "a") as f:
+            f.write("case0002,AC0")  # interrupted append
+        return path
+
+    def test_read_ignores_partial_line(self, tmp_path: Path):
+        path = self._crashed(tmp_path)
+        assert [e.case_id for e in read_key_file(path)] == ["case0001"]
+
+    def test_append_truncates_partial_line(self, tmp_path: Path):
+        path = self._crashed(tmp_path)
+        append_key_entry(path, KeyEntry("case0002", "AC002", "", "", "", 2, 7))
+
+        entries = read_key_file(path)
+        assert [e.case_id for e in entries] == ["case0001", "case0002"]
+        assert entries[1].image_count == 7
+        assert "AC0," not in path.read_text()
+
+    def test_compact(self, tmp_path: Path):
+        path = self._crashed(tmp_path)
+        entries = compact_key_file(path)
+
+        assert [e.case_id for e in entries] == ["case0001"]
+        assert path.read_text().endswith("\n")
+        assert not (tmp_path / ".key.csv.tmp").exists()
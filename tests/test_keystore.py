@@ -0,0 +1,84 @@
+"""Test the key store backends."""
+
+from pathlib import Path
+
+import pytest
+
+from pacs_agent.keyfile import KeyEntry, read_key_file, write_key_file
+from pacs_agent.keystore import CsvKeyStore, SqliteKeyStore, open_key_store
+
+
+def _entry(n: int, accession: str | None = None) -> KeyEntry:
+    return KeyEntry(
+        f"case{n:04d}", accession or f"AC{n:03d}", "20240101", "CT", "Head CT", 1, n,
+    )
+
+
+@pytest.fixture(params=["csv", "sqlite"])
+def backend(request) -> str:
+    return request.param
+
+
+class TestKeyStore:
+    def test_open(self, tmp_path: Path):
+        assert isinstance(open_key_store(tmp_path, "csv"), CsvKeyStore)
+        assert isinstance(open_key_store(tmp_path, "sqlite"), SqliteKeyStore)
+        with pytest.raises(ValueError):
+            open_key_store(tmp_path, "xml")
+
+    def test_add_and_reopen(self, tmp_path: Path, backend: str):
+        store = open_key_store(tmp_path, backend)
+        assert store.last_case_number() == 0
+        store.add(_entry(1))
+        store.add(_entry(7))
+        store.close()
+
+        store = open_key_store(tmp_path, backend)
+        assert len(store) == 2
+        assert store.has_accession("AC007")
+        assert not store.has_accession("AC002")
+        assert store.last_case_number() == 7
+        assert [e.case_id for e in store.entries()] == ["case0001", "case0007"]
+        assert store.entries()[1].image_count == 7
+        store.close()
+
+    def test_export_csv(self, tmp_path: Path, backend: str):
+        store = open_key_store(tmp_path, backend)
+        for n in (1, 2, 3):
+            store.add(_entry(n))
+        store.export_csv()
+        store.close()
+
+        entries = read_key_file(tmp_path / "key.csv")
+        assert [e.accession for e in entries] == ["AC001", "AC002", "AC003"]
+
+
+class TestSqliteKeyStore:
+    def test_unique_constraints(self, tmp_path: Path):
+        store = open_key_store(tmp_path, "sqlite")
+        store.add(_entry(1))
+        with pytest.raises(ValueError):
+            store.add(_entry(2, accession="AC001"))
+        with pytest.raises(ValueError):
+            store.add(_entry(1, accession="AC999"))
+        assert len(store) == 1
+        store.close()
+
+    def test_imports_existing_csv(self, tmp_path: Path):
+        write_key_file(
+            tmp_path / "key.csv",
+            [_entry(1), _entry(4), KeyEntry("custom", "AC100", "", "", "", 0, 0)],
+        )
+        store = open_key_store(tmp_path, "sqlite")
+        assert len(store) == 3
+        assert store.last_case_number() == 4
+        assert store.has_accession("AC100")
+        store.close()
+
+    def test_uses_index(self, tmp_path: Path):
+        store = open_key_store(tmp_path, "sqlite")
+        plan = store._conn.execute(
+            "EXPLAIN QUERY PLAN SELECT 1 FROM keys WHERE accession=?", ("AC1",),
+        ).fetchall()
+        assert "USING" in " ".join(str(row[-1]) for row in plan)
+        store.close()
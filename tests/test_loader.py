@@ -0,0 +1,1007 @@
+"""Test the load pipeline against an in-process fake PACS (no network)."""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from datetime import date
+from pathlib import Path
+from unittest.mock import patch
+
+import pydicom
+import pytest
+
+from pacs_agent.config import (
+    Config,
+    OutputConfig,
+    PacsConfig,
+    ScpConfig,
+    SeriesFilter,
+    ThrottleConfig,
+    TimeCap,
+)
+from pacs_agent.keyfile import read_key_file
+from pacs_agent.loader import load_studies, result_to_dict
+from pacs_agent.scp import TemporarySCP
+
+from .synthetic import FakeStoreEvent, make_instance
+
+
+def _make_config(tmp_path: Path) -> Config:
+    return Config(
+        pacs=PacsConfig(host="127.0.0.1", port=104, ae_title="TEST_PACS"),
+        scp=ScpConfig(ae_title="TEST_SCP", port=9012),
+        output=OutputConfig(base_dir=tmp_path),
+    )
+
+
+def _study_uid(accession: str) -> str:
+    return f"1.2.826.0.1.{int(accession[2:])}"
+
+
+class FakePacs:
+    """Answers C-FIND/C-MOVE by calling the running SCP's store handler."""
+
+    def __init__(
+        self,
+        studies: dict[str, tuple[int, int]],
+        trailing: int = 0,
+        unsent: int = 0,
+        fail_after: int | None = None,
+        series_level: bool = True,
+        series_fields: dict[int, dict[str, str]] | None = None,
+    ) -> None:
+        # {accession: (series, images per series)}
+        self.studies = studies
+        # Images stored after the final C-MOVE response / never stored
+        self.trailing = trailing
+        self.unsent = unsent
+        # Abort the C-MOVE after this many stores (simulated crash)
+        self.fail_after = fail_after
+        # Whether series/image level C-FIND is answered
+        self.series_level = series_level
+        # Extra series-level C-FIND fields, by series number (1-based)
+        self.series_fields = series_fields or {}
+        self.scp: TemporarySCP | None = None
+        self.moves_in_flight = 0
+        self.max_moves_in_flight = 0
+        self.scp_starts = 0
+        self.finds_during_move = 0
+        self.sessions = 0
+        self.sessions_closed = 0
+        self.sent: list[str] = []  # SOPInstanceUIDs sent over C-STORE
+        self.moves: list[str] = []  # C-MOVE levels requested
+        self.finds: list[str] = []  # accessions queried one by one
+        self.range_finds = 0
+        self._lock = threading.Lock()
+
+    def find(self, config: Config, accession: str) -> list[dict[str, str]]:
+        with self._lock:
+            if self.moves_in_flight:
+                self.finds_during_move += 1
+        time.sleep(0.01)  # C-FIND round trip
+        self.finds.append(accession)
+        return self._study(accession)
+
+    def _study(self, accession: str) -> list[dict[str, str]]:
+        if accession not in self.studies:
+            return []
+        series, images = self.studies[accession]
+        return [{
+            "AccessionNumber": accession,
+            "StudyInstanceUID": _study_uid(accession),
+            "Modality": "CT",
+            "StudyDate": "20240101",
+            "StudyDescription": "Head CT",
+            "NumberOfStudyRelatedSeries": str(series),
+            "NumberOfStudyRelatedInstances": str(series * images),
+        }]
+
+    def find_by_date_range(
+        self, config: Config, start, end, modality=None, session=None,
+    ) -> dict[str, list[dict[str, str]]]:
+        self.range_finds += 1
+        if not start <= date(2024, 1, 1) <= end:
+            return {}
+        return {accession: self._study(accession) for accession in self.studies}
+
+    def _instances(self, study_uid: str) -> list[tuple[str, str]]:
+        """(series UID, SOP UID) of every instance of a study."""
+        accession = f"AC{study_uid.rsplit('.', 1)[1]:0>3}"
+        series, images = self.studies[accession]
+        return [
+            (f"{study_uid}.{s + 1}", f"{study_uid}.{s + 1}.{i + 1}")
+            for s in range(series)
+            for i in range(images)
+        ]
+
+    def find_series(self, config: Config, study_uid: str) -> list[dict[str, str]]:
+        if not self.series_level:
+            return []
+        counts: dict[str, int] = {}
+        for series_uid, _ in self._instances(study_uid):
+            counts[series_uid] = counts.get(series_uid, 0) + 1
+        return [
+            {
+                "SeriesInstanceUID": uid,
+                "NumberOfSeriesRelatedInstances": str(n),
+                **self.series_fields.get(int(uid.rsplit(".", 1)[1]), {}),
+            }
+            for uid, n in counts.items()
+        ]
+
+    def find_instances(
+        self, config: Config, study_uid: str, series_uid: str,
+    ) -> list[str]:
+        return [
+            sop for series, sop in self._instances(study_uid) if series == series_uid
+        ]
+
+    def move(
+        self, config: Config, study_uid: str, store_handler=None, sop_classes=None,
+    ) -> dict[str, int]:
+        self.moves.append("STUDY")
+        return self._send(study_uid, self._instances(study_uid))
+
+    def move_series(
+        self,
+        config: Config,
+        study_uid: str,
+        series_uid: str,
+        store_handler=None,
+        sop_classes=None,
+    ) -> dict[str, int]:
+        self.moves.append("SERIES")
+        return self._send(study_uid, [
+            i for i in self._instances(study_uid) if i[0] == series_uid
+        ])
+
+    def move_instances(
+        self,
+        config: Config,
+        study_uid: str,
+        series_uid: str,
+        sop_uids: list[str],
+        store_handler=None,
+        sop_classes=None,
+    ) -> dict[str, int]:
+        self.moves.append("IMAGE")
+        return self._send(study_uid, [
+            i for i in self._instances(study_uid) if i[1] in sop_uids
+        ])
+
+    def _send(
+        self, study_uid: str, instances: list[tuple[str, str]],
+    ) -> dict[str, int]:
+        with self._lock:
+            self.moves_in_flight += 1
+            self.max_moves_in_flight = max(
+                self.max_moves_in_flight, self.moves_in_flight
+            )
+        try:
+            events = [
+                FakeStoreEvent(make_instance(study_uid, series_uid, sop_uid))
+                for series_uid, sop_uid in instances
+            ]
+            sent = len(events) - self.unsent
+            split = sent - self.trailing
+            for n, event in enumerate(events[:split]):
+                if self.fail_after is not None and n == self.fail_after:
+                    raise RuntimeError("association aborted")
+                assert self.scp._handle_store(event) == 0x0000
+                self.sent.append(event.dataset.SOPInstanceUID)
+                time.sleep(0.001)
+
+            def _late() -> None:
+                time.sleep(0.2)
+                for event in events[split:sent]:
+                    self.scp._handle_store(event)
+
+            threading.Thread(target=_late).start()
+            return {"completed": len(events), "failed": 0, "warning": 0}
+        finally:
+            with self._lock:
+                self.moves_in_flight -= 1
+
+    def patches(self):
+        pacs = self
+
+        class _Session:
+            def __init__(self, config: Config) -> None:
+                self.config = config
+                pacs.sessions += 1
+
+            def find(self, accession: str) -> list[dict[str, str]]:
+                return pacs.find(self.config, accession)
+
+            def close(self) -> None:
+                pacs.sessions_closed += 1
+
+        class _SCP(TemporarySCP):
+            def start(self) -> None:
+                pacs.scp = self
+                pacs.scp_starts += 1
+                if self.config.scp.writer_threads > 0:
+                    self._writers = ThreadPoolExecutor(
+                        max_workers=self.config.scp.writer_threads,
+                    )
+
+            def stop(self) -> None:
+                if self._writers is not None:
+                    self._writers.shutdown(wait=True)
+                    self._writers = None
+
+        return (
+            patch("pacs_agent.loader.FindSession", _Session),
+            patch("pacs_agent.loader.move_study", self.move),
+            patch("pacs_agent.loader.find_by_date_range", self.find_by_date_range),
+            patch("pacs_agent.loader.move_series", self.move_series),
+            patch("pacs_agent.loader.move_instances", self.move_instances),
+            patch("pacs_agent.loader.find_series", self.find_series),
+            patch("pacs_agent.loader.find_instances", self.find_instances),
+            patch("pacs_agent.loader.TemporarySCP", _SCP),
+        )
+
+
+def _run(pacs: FakePacs, config: Config, accessions: list[str], **kwargs):
+    with ExitStack() as stack:
+        for p in pacs.patches():
+            stack.enter_context(p)
+        return load_studies(config, "proj", accessions, **kwargs)
+
+
+class TestSerialLoad:
+    def test_loads_and_writes_key(self, tmp_path: Path):
+        pacs = FakePacs({"AC001": (2, 3), "AC002": (1, 5)})
+        results, verification = _run(pacs, _make_config(tmp_path), ["AC001", "AC002"])
+
+        assert [r.case_id for r in results] == ["case0001", "case0002"]
+        assert results[0].series_count == 2
+        assert results[0].image_count == 6
+        assert results[1].image_count == 5
+        assert verification["loaded"] == 2
+        entries = read_key_file(tmp_path / "proj" / "key.csv")
+        assert [e.accession for e in entries] == ["AC001", "AC002"]
+
+    @pytest.mark.parametrize("concurrency,prefetch", [(1, 0), (3, 0), (3, 2)])
+    def test_repeated_accession_loaded_once(
+        self, tmp_path: Path, concurrency: int, prefetch: int,
+    ):
+        pacs = FakePacs({"AC001": (1, 3), "AC002": (1, 3)})
+        results, verification = _run(
+            pacs, _make_config(tmp_path), ["AC001", "AC002", "AC001"],
+            concurrency=concurrency, prefetch=prefetch,
+        )
+
+        assert [r.accession for r in results] == ["AC001", "AC002", "AC001"]
+        assert [r.status for r in results] == ["ok", "ok", "skipped"]
+        assert results[2].error == "repeated in accession list"
+        assert pacs.finds.count("AC001") == 1
+        assert pacs.moves == ["STUDY", "STUDY"]
+        assert verification["loaded"] == 2
+
+    def test_single_scp_for_run(self, tmp_path: Path):
+        pacs = FakePacs({"AC001": (1, 5), "AC002": (1, 5), "AC003": (1, 5)})
+        _run(pacs, _make_config(tmp_path), ["AC001", "AC002", "AC003"])
+        assert pacs.scp_starts == 1
+
+    def test_one_find_association_per_worker(self, tmp_path: Path):
+        studies = {f"AC{i:03d}": (1, 1) for i in range(1, 9)}
+        pacs = FakePacs(studies)
+        _run(pacs, _make_config(tmp_path), list(studies), dry_run=True)
+        assert pacs.sessions == 1
+        assert pacs.sessions_closed == 1
+
+    def test_no_scp_when_nothing_to_move(self, tmp_path: Path):
+        pacs = FakePacs({"AC001": (1, 5)})
+        results, _ = _run(pacs, _make_config(tmp_path), ["AC001"], dry_run=True)
+        assert results[0].status == "dry-run"
+        assert pacs.scp_starts == 0
+
+
+class TestStageTimings:
+    def test_result_carries_timings(self, tmp_path: Path):
+        pacs = FakePacs({"AC001": (2, 3)})
+        results, _ = _run(pacs, _make_config(tmp_path), ["AC001"])
+
+        timings = results[0].timings
+        assert timings.find_s >= 0
+        assert timings.move_s > 0
+        assert timings.first_byte_s is not None
+        assert timings.first_byte_s <= timings.move_s
+        assert timings.bytes_received > 0
+        assert timings.anonymize_s > 0
+        d = result_to_dict(results[0])["timings"]
+        assert d["bytes_received"] == timings.bytes_received
+        assert d["images_per_s"] > 0
+        assert "associate_s" not in d  # the fake PACS opens no association
+
+    def test_failed_move_keeps_find_time(self, tmp_path: Path):
+        pacs = FakePacs({"AC001": (1, 5)}, fail_after=0)
+        results, _ = _run(pacs, _make_config(tmp_path), ["AC001"])
+
+        assert results[0].status == "error"
+        assert results[0].timings.find_s >= 0
+        assert results[0].timings.move_s is None
+
+    def test_date_range_hit_has_no_find_time(self, tmp_path: Path):
+        pacs = FakePacs({"AC001": (1, 2)})
+        results, _ = _run(
+            pacs, _make_config(tmp_path), ["AC001"],
+            prefetch_range=(date(2024, 1, 1), date(2024, 1, 31)),
+        )
+        assert results[0].timings.find_s is None
+
+
+class TestMetrics:
+    def test_textfile_updated_by_load(self, tmp_path: Path):
+        config = _make_config(tmp_path)
+        config.metrics.textfile_dir = tmp_path / "textfile"
+        pacs = FakePacs({"AC001": (1, 4), "AC002": (1, 2)})
+        _run(pacs, config, ["AC001", "AC002", "AC404"])
+
+        text = (tmp_path / "textfile" / "rad_loader.prom").read_text()
+        assert 'rad_loader_studies_total{status="ok"} 2' in text
+        assert 'rad_loader_studies_total{status="error"} 1' in text
+        assert "rad_loader_instances_received_total 6" in text
+        assert "rad_loader_moves_in_flight 0" in text
+
+    @pytest.mark.parametrize(
+        "prefetch,order", [(0, "file"), (2, "file"), (0, "smallest")],
+    )
+    def test_resolve_failures_counted_live(
+        self, tmp_path: Path, prefetch: int, order: str,
+    ):
+        from pacs_agent.metrics import LoadMetrics
+
+        metrics = LoadMetrics(tmp_path, tmp_path / "rad_loader.prom")
+        pacs = FakePacs({"AC001": (1, 4)})
+        # Live counts only, not those re-read from audit.db at the end
+        with patch.object(metrics, "reload"):
+            _run(
+                pacs, _make_config(tmp_path), ["AC001", "AC404"],
+                metrics=metrics, prefetch=prefetch, order=order,
+            )
+
+        text = metrics.render()
+        assert 'rad_loader_studies_total{status="ok"} 1' in text
+        assert 'rad_loader_studies_total{status="error"} 1' in text
+
+    def test_refused_load_counted_live(self, tmp_path: Path):
+        from pacs_agent.metrics import LoadMetrics
+
+        config = _make_config(tmp_path)
+        config.load.disk_check = "refuse"
+        metrics = LoadMetrics(tmp_path, tmp_path / "rad_loader.prom")
+        pacs = FakePacs({"AC001": (1, 4), "AC002": (1, 4)})
+        with patch.object(metrics, "reload"), patch(
+            "pacs_agent.loader.free_space", return_value=1000,
+        ):
+            _run(pacs, config, ["AC001", "AC002", "AC404"], metrics=metrics)
+
+        assert 'rad_loader_studies_total{status="error"} 3' in metrics.render()
+
+
+class TestSqliteKeyStore:
+    def test_load_records_in_key_db(self, tmp_path: Path):
+        config = _make_config(tmp_path)
+        config.output.key_store = "sqlite"
+        pacs = FakePacs({"AC001": (1, 2), "AC002": (1, 3)})
+
+        results, _ = _run(pacs, config, ["AC001", "AC002", "AC001"], concurrency=2)
+
+        assert (tmp_path / "proj" / "key.db").exists()
+        entries = read_key_file(tmp_path / "proj" / "key.csv")
+        # Commit order depends on which parallel study finishes first
+        assert sorted(e.accession for e in entries) == ["AC001", "AC002"]
+
+        # A second run skips what key.db already holds
+        results, _ = _run(pacs, config, ["AC002", "AC003"])
+        assert results[0].status == "skipped"
+
+
+class TestConcurrentLoad:
+    @pytest.mark.parametrize("concurrency", [2, 4])
+    def test_results_in_input_order(self, tmp_path: Path, concurrency: int):
+        studies = {f"AC{i:03d}": (2, 5 + i) for i in range(1, 9)}
+        pacs = FakePacs(studies)
+        accessions = list(studies) + ["AC999"]
+
+        results, verification = _run(
+            pacs, _make_config(tmp_path), accessions, concurrency=concurrency,
+        )
+
+        assert [r.accession for r in results] == accessions
+        assert results[-1].error == "not found on PACS"
+        for r in results[:-1]:
+            assert r.status == "ok"
+            assert r.image_count == 2 * (5 + int(r.accession[2:]))
+        assert verification["loaded"] == 8
+        assert pacs.max_moves_in_flight > 1
+
+    def test_files_routed_to_own_case(self, tmp_path: Path):
+        studies = {f"AC{i:03d}": (1, 4 * i) for i in range(1, 6)}
+        pacs = FakePacs(studies)
+        results, _ = _run(pacs, _make_config(tmp_path), list(studies), concurrency=3)
+
+        case_ids = [r.case_id for r in results]
+        assert len(set(case_ids)) == 5
+        for r in results:
+            files = list((tmp_path / "proj" / r.case_id).rglob("*.dcm"))
+            assert len(files) == r.image_count
+
+        entries = read_key_file(tmp_path / "proj" / "key.csv")
+        assert {e.case_id for e in entries} == set(case_ids)
+
+
+class TestCompletionTracking:
+    def test_waits_for_trailing_stores(self, tmp_path: Path):
+        pacs = FakePacs({"AC001": (1, 10)}, trailing=3)
+        results, verification = _run(pacs, _make_config(tmp_path), ["AC001"])
+
+        assert results[0].image_count == 10
+        assert results[0].expected_images == 10
+        assert results[0].missing_images == 0
+        assert verification["ok"] is True
+
+    def test_records_shortfall_on_timeout(self, tmp_path: Path):
+        config = _make_config(tmp_path)
+        config.load.store_timeout = 0.05
+        pacs = FakePacs({"AC001": (1, 10)}, unsent=4)
+
+        t0 = time.monotonic()
+        results, verification = _run(pacs, config, ["AC001"])
+
+        assert time.monotonic() - t0 < 1.0
+        assert results[0].status == "ok"
+        assert results[0].image_count == 6
+        assert results[0].missing_images == 4
+        assert verification["ok"] is False
+        assert "4 of 10 images not received" in verification["warnings"][0]
+
+
+class TestPipelinedLoad:
+    @pytest.mark.parametrize("concurrency", [1, 3])
+    def test_find_overlaps_move(self, tmp_path: Path, concurrency: int):
+        studies = {f"AC{i:03d}": (1, 10) for i in range(1, 7)}
+        pacs = FakePacs(studies)
+        accessions = ["AC000"] + list(studies) + ["AC999"]
+
+        results, verification = _run(
+            pacs, _make_config(tmp_path), accessions,
+            concurrency=concurrency, prefetch=2,
+        )
+
+        assert [r.accession for r in results] == accessions
+        assert results[0].error == "not found on PACS"
+        assert results[-1].error == "not found on PACS"
+        assert [r.status for r in results[1:-1]] == ["ok"] * 6
+        assert len({r.case_id for r in results[1:-1]}) == 6
+        assert pacs.finds_during_move > 0
+        assert verification["loaded"] == 6
+
+    @pytest.mark.parametrize("concurrency", [1, 3])
+    def test_retriever_failure_raises(self, tmp_path: Path, concurrency: int):
+        studies = {f"AC{i:03d}": (1, 2) for i in range(1, 9)}
+        pacs = FakePacs(studies)
+        outcome = []
+
+        def run() -> None:
+            try:
+                _run(
+                    pacs, _make_config(tmp_path), list(studies),
+                    concurrency=concurrency, prefetch=1,
+                )
+            except OSError as e:
+                outcome.append(e)
+
+        with patch(
+            "pacs_agent.loader._retrieve", side_effect=OSError("disk gone"),
+        ):
+            thread = threading.Thread(target=run, daemon=True)
+            thread.start()
+            thread.join(timeout=10)
+
+        assert not thread.is_alive(), "pipelined load hung after a failure"
+        assert [str(e) for e in outcome] == ["disk gone"]
+
+    def test_serial_mode_does_not_overlap(self, tmp_path: Path):
+        pacs = FakePacs({"AC001": (1, 10), "AC002": (1, 10)})
+        _run(pacs, _make_config(tmp_path), ["AC001", "AC002"])
+        assert pacs.finds_during_move == 0
+
+    def test_dry_run(self, tmp_path: Path):
+        pacs = FakePacs({"AC001": (2, 10), "AC002": (1, 10)})
+        results, _ = _run(
+            pacs, _make_config(tmp_path), ["AC001", "AC002"],
+            dry_run=True, prefetch=4,
+        )
+        assert [r.status for r in results] == ["dry-run", "dry-run"]
+        assert results[0].image_count == 20
+        assert pacs.scp_starts == 0
+
+
+class TestResume:
+    def _interrupted(self, tmp_path: Path) -> Config:
+        """Run a load that dies after storing 3 of 10 images."""
+        config = _make_config(tmp_path)
+        pacs = FakePacs({"AC001": (2, 5)}, fail_after=3)
+        results, _ = _run(pacs, config, ["AC001"])
+        assert results[0].status == "error"
+        assert results[0].case_id == "case0001"
+        assert read_key_file(tmp_path / "proj" / "key.csv") == []
+        return config
+
+    def test_moves_only_missing(self, tmp_path: Path):
+        config = self._interrupted(tmp_path)
+        # Half-written file the journal never recorded
+        stray = tmp_path / "proj" / "case0001" / "series01" / "00004.dcm"
+        stray.write_bytes(b"partial")
+
+        pacs = FakePacs({"AC001": (2, 5)})
+        results, verification = _run(pacs, config, ["AC001"])
+
+        r = results[0]
+        assert r.status == "ok"
+        assert r.case_id == "case0001"
+        assert r.resumed_images == 3
+        assert r.image_count == 10
+        assert r.missing_images == 0
+        assert pacs.moves == ["IMAGE", "SERIES"]
+        assert len(pacs.sent) == 7
+        files = sorted((tmp_path / "proj" / "case0001").rglob("*.dcm"))
+        assert len(files) == 10
+        sops = {str(pydicom.dcmread(f).SOPInstanceUID) for f in files}
+        assert len(sops) == 10
+        assert verification["ok"] is True
+
+        entries = read_key_file(tmp_path / "proj" / "key.csv")
+        assert [e.case_id for e in entries] == ["case0001"]
+        assert entries[0].image_count == 10
+
+    def test_relative_base_dir(self, tmp_path: Path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        config = _make_config(Path("data"))
+        pacs = FakePacs({"AC001": (2, 5)}, fail_after=3)
+        results, _ = _run(pacs, config, ["AC001"])
+        assert results[0].status == "error"
+
+        pacs = FakePacs({"AC001": (2, 5)})
+        results, _ = _run(pacs, config, ["AC001"])
+
+        assert results[0].status == "ok"
+        assert results[0].resumed_images == 3
+        assert len(pacs.sent) == 7
+
+    def test_key_store_failure_resumed(self, tmp_path: Path):
+        config = _make_config(tmp_path)
+        pacs = FakePacs({"AC001": (1, 4)})
+        with patch(
+            "pacs_agent.keystore.append_key_entry",
+            side_effect=OSError("disk full"),
+        ):
+            results, _ = _run(pacs, config, ["AC001"])
+
+        assert results[0].status == "error"
+        assert results[0].error == "key store: disk full"
+        assert read_key_file(tmp_path / "proj" / "key.csv") == []
+
+        pacs = FakePacs({"AC001": (1, 4)})
+        results, _ = _run(pacs, config, ["AC001"])
+
+        assert results[0].status == "ok"
+        assert results[0].case_id == "case0001"
+        assert results[0].resumed_images == 4
+        assert pacs.sent == []
+        entries = read_key_file(tmp_path / "proj" / "key.csv")
+        assert [e.case_id for e in entries] == ["case0001"]
+
+    def test_recorded_case_closed(self, tmp_path: Path):
+        from pacs_agent.journal import LoadJournal
+
+        config = _make_config(tmp_path)
+        _run(FakePacs({"AC001": (1, 4)}), config, ["AC001"])
+        # Crash between the key row and the journal's "done"
+        journal = LoadJournal(tmp_path / "proj")
+        journal.start("case0001", "AC001", _study_uid("AC001"))
+        journal.close()
+
+        results, _ = _run(FakePacs({"AC002": (1, 2)}), config, ["AC001", "AC002"])
+
+        assert [r.status for r in results] == ["skipped", "ok"]
+        assert results[1].case_id == "case0002"
+        assert LoadJournal(tmp_path / "proj").cases() == []
+
+    def test_study_level_fallback(self, tmp_path: Path):
+        config = self._interrupted(tmp_path)
+
+        pacs = FakePacs({"AC001": (2, 5)}, series_level=False)
+        results, _ = _run(pacs, config, ["AC001"])
+
+        r = results[0]
+        assert r.status == "ok"
+        assert r.image_count == 10
+        assert r.missing_images == 0
+        assert pacs.moves == ["STUDY"]
+        assert len(list((tmp_path / "proj" / "case0001").rglob("*.dcm"))) == 10
+
+    def test_new_case_ids_skip_interrupted(self, tmp_path: Path):
+        config = self._interrupted(tmp_path)
+
+        pacs = FakePacs({"AC002": (1, 2)})
+        results, _ = _run(pacs, config, ["AC002"])
+
+        assert results[0].case_id == "case0002"
+
+    def test_failure_before_any_store_frees_case_id(self, tmp_path: Path):
+        config = _make_config(tmp_path)
+        pacs = FakePacs({"AC001": (1, 5), "AC002": (1, 5)}, fail_after=0)
+        _run(pacs, config, ["AC001"])
+
+        pacs.fail_after = None
+        results, _ = _run(pacs, config, ["AC002"])
+        assert results[0].case_id == "case0001"
+        assert results[0].resumed_images == 0
+
+
+class TestWriteFailure:
+    def test_failed_queued_write_is_error(self, tmp_path: Path):
+        from pacs_agent import scp as scp_module
+
+        config = _make_config(tmp_path)
+        config.scp.writer_threads = 2
+        real_save = scp_module._save_instance
+        calls = []
+
+        def flaky_save(ds, file_path, case_id):
+            calls.append(file_path)
+            if len(calls) == 2:
+                raise OSError("disk full")
+            real_save(ds, file_path, case_id)
+
+        pacs = FakePacs({"AC001": (1, 5)})
+        with patch.object(scp_module, "_save_instance", flaky_save):
+            results, verification = _run(pacs, config, ["AC001"])
+
+        r = results[0]
+        assert r.status == "error"
+        assert r.error == "1 images could not be written"
+        assert r.image_count == 4
+        assert verification["loaded"] == 0
+        assert read_key_file(tmp_path / "proj" / "key.csv") == []
+
+        # The next run resumes and fetches only the missing image
+        pacs = FakePacs({"AC001": (1, 5)})
+        results, _ = _run(pacs, config, ["AC001"])
+        assert results[0].status == "ok"
+        assert results[0].resumed_images == 4
+        assert results[0].image_count == 5
+
+
+class TestSeriesFanOut:
+    def test_parallel_series_moves(self, tmp_path: Path):
+        config = _make_config(tmp_path)
+        pacs = FakePacs({"AC001": (6, 8)})
+
+        results, verification = _run(pacs, config, ["AC001"], series_moves=3)
+
+        assert results[0].image_count == 48
+        assert results[0].series_count == 6
+        assert results[0].missing_images == 0
+        assert pacs.moves == ["SERIES"] * 6
+        assert 1 < pacs.max_moves_in_flight <= 3
+        assert verification["ok"] is True
+
+    def test_series_numbered_in_find_order(self, tmp_path: Path):
+        config = _make_config(tmp_path)
+        config.load.series_moves = 4
+        pacs = FakePacs({"AC001": (4, 6)})
+
+        _run(pacs, config, ["AC001"])
+
+        study_uid = _study_uid("AC001")
+        for n in range(1, 5):
+            files = list((tmp_path / "proj" / "case0001" / f"series{n:02d}").glob("*.dcm"))
+            assert len(files) == 6
+            ds = pydicom.dcmread(files[0])
+            assert ds.SeriesInstanceUID == f"{study_uid}.{n}"
+
+    def test_falls_back_to_study_move(self, tmp_path: Path):
+        pacs = FakePacs({"AC001": (2, 3)}, series_level=False)
+        results, _ = _run(pacs, _make_config(tmp_path), ["AC001"], series_moves=2)
+
+        assert pacs.moves == ["STUDY"]
+        assert results[0].image_count == 6
+
+
+class TestSeriesFilter:
+    SERIES = {
+        1: {
+            "Modality": "CT",
+            "SeriesDescription": "Scout",
+            "ImageType": "ORIGINAL\\PRIMARY\\LOCALIZER",
+        },
+        2: {
+            "Modality": "CT",
+            "SeriesDescription": "Ax 1.0 Br40",
+            "ImageType": "ORIGINAL\\PRIMARY\\AXIAL",
+        },
+        3: {"Modality": "SR", "SeriesDescription": "Dose Report"},
+        4: {
+            "Modality": "CT",
+            "SeriesDescription": "Ax 1.0 Br64",
+            "ImageType": "DERIVED\\SECONDARY\\AXIAL",
+        },
+    }
+
+    def test_moves_only_matching_series(self, tmp_path: Path):
+        config = _make_config(tmp_path)
+        config.load.series_filter = SeriesFilter(
+            modalities=["CT"], description=r"^ax", image_type=["ORIGINAL"],
+        )
+        pacs = FakePacs({"AC001": (4, 5)}, series_fields=self.SERIES)
+
+        results, verification = _run(pacs, config, ["AC001"])
+
+        assert pacs.moves == ["SERIES"]
+        assert results[0].series_count == 1
+        assert results[0].image_count == 5
+        assert results[0].missing_images == 0
+        files = list((tmp_path / "proj" / "case0001" / "series01").glob("*.dcm"))
+        assert pydicom.dcmread(files[0]).SeriesInstanceUID.endswith(".2")
+        load = json.loads((tmp_path / "proj" / "load.json").read_text())
+        assert load["series_filter"]["modalities"] == ["CT"]
+
+    def test_no_matching_series_skips_study(self, tmp_path: Path):
+        pacs = FakePacs({"AC001": (4, 5)}, series_fields=self.SERIES)
+        results, verification = _run(
+            pacs, _make_config(tmp_path), ["AC001"],
+            series_filter=SeriesFilter(modalities=["MR"]),
+        )
+
+        assert pacs.moves == []
+        assert results[0].status == "skipped"
+        assert "series filter" in results[0].error
+        assert verification["skipped"] == 1
+        assert read_key_file(tmp_path / "proj" / "key.csv") == []
+
+    def test_filter_needs_series_level_find(self, tmp_path: Path):
+        pacs = FakePacs({"AC001": (2, 3)}, series_level=False)
+        results, _ = _run(
+            pacs, _make_config(tmp_path), ["AC001"],
+            series_filter=SeriesFilter(min_instances=2),
+        )
+
+        assert pacs.moves == []
+        assert results[0].status == "error"
+
+    def test_dry_run_counts_matching_series(self, tmp_path: Path):
+        pacs = FakePacs({"AC001": (4, 5)}, series_fields=self.SERIES)
+        results, _ = _run(
+            pacs, _make_config(tmp_path), ["AC001"], dry_run=True,
+            series_filter=SeriesFilter(modalities=["CT"]),
+        )
+
+        assert results[0].series_count == 3
+        assert results[0].image_count == 15
+        assert pacs.moves == []
+
+    @pytest.mark.parametrize("prefetch", [0, 2])
+    def test_dry_run_series_find_failure(self, tmp_path: Path, prefetch: int):
+        pacs = FakePacs(
+            {"AC001": (4, 5), "AC002": (4, 5)}, series_fields=self.SERIES,
+        )
+        real_find_series = pacs.find_series
+
+        def flaky_find_series(config, study_uid):
+            if study_uid == _study_uid("AC001"):
+                raise ConnectionError("association lost")
+            return real_find_series(config, study_uid)
+
+        pacs.find_series = flaky_find_series
+        results, _ = _run(
+            pacs, _make_config(tmp_path), ["AC001", "AC002"], dry_run=True,
+            series_filter=SeriesFilter(modalities=["CT"]), prefetch=prefetch,
+        )
+
+        assert [r.status for r in results] == ["error", "dry-run"]
+        assert results[0].error == "series C-FIND failed: association lost"
+        assert (tmp_path / "proj" / "load.json").exists()
+
+
+class TestPrefetchRange:
+    def test_range_hits_skip_per_accession_find(self, tmp_path: Path):
+        pacs = FakePacs({"AC001": (1, 3), "AC002": (1, 3)})
+        results, _ = _run(
+            pacs, _make_config(tmp_path), ["AC001", "AC002", "AC003"],
+            prefetch_range=(date(2024, 1, 1), date(2024, 12, 31)),
+        )
+
+        assert pacs.range_finds == 1
+        # Only the accession the range did not cover is queried
+        assert pacs.finds == ["AC003"]
+        assert [r.status for r in results] == ["ok", "ok", "error"]
+        assert results[1].image_count == 3
+
+    def test_out_of_range_falls_back(self, tmp_path: Path):
+        pacs = FakePacs({"AC001": (1, 3)})
+        results, _ = _run(
+            pacs, _make_config(tmp_path), ["AC001"],
+            prefetch_range=(date(2023, 1, 1), date(2023, 12, 31)),
+        )
+
+        assert pacs.finds == ["AC001"]
+        assert results[0].status == "ok"
+
+
+class TestFindCache:
+    def test_dry_run_then_load_queries_once(self, tmp_path: Path):
+        config = _make_config(tmp_path)
+        config.find_cache.ttl_hours = 24
+        pacs = FakePacs({"AC001": (1, 3), "AC002": (1, 2)})
+
+        _run(pacs, config, ["AC001", "AC002", "AC404"], dry_run=True)
+        assert pacs.finds == ["AC001", "AC002", "AC404"]
+
+        pacs.finds.clear()
+        results, _ = _run(pacs, config, ["AC001", "AC002", "AC404"])
+
+        # Not-found accessions are not cached
+        assert pacs.finds == ["AC404"]
+        assert [r.status for r in results] == ["ok", "ok", "error"]
+
+    def test_disabled_by_default(self, tmp_path: Path):
+        config = _make_config(tmp_path)
+        pacs = FakePacs({"AC001": (1, 3)})
+
+        _run(pacs, config, ["AC001"], dry_run=True)
+        _run(pacs, config, ["AC001"])
+
+        assert pacs.finds == ["AC001", "AC001"]
+        assert not (tmp_path / "find_cache.db").exists()
+
+
+class TestThrottle:
+    def test_moves_stay_within_ceiling(self, tmp_path: Path):
+        config = _make_config(tmp_path)
+        config.load.throttle = ThrottleConfig(enabled=True, ceiling=2)
+        studies = {f"AC{i:03d}": (1, 4) for i in range(1, 9)}
+        pacs = FakePacs(studies)
+
+        results, _ = _run(pacs, config, list(studies), concurrency=1)
+
+        assert all(r.status == "ok" for r in results)
+        assert pacs.max_moves_in_flight <= 2
+
+    def test_time_cap_limits_parallel_moves(self, tmp_path: Path):
+        from datetime import time as clock
+
+        config = _make_config(tmp_path)
+        config.load.throttle = ThrottleConfig(
+            enabled=True, ceiling=4,
+            # Morning and afternoon (wrapping past midnight): all day
+            caps=[
+                TimeCap(clock(0, 0), clock(12, 0), 1),
+                TimeCap(clock(12, 0), clock(0, 0), 1),
+            ],
+        )
+        studies = {f"AC{i:03d}": (1, 4) for i in range(1, 7)}
+        pacs = FakePacs(studies)
+
+        results, _ = _run(pacs, config, list(studies), concurrency=4)
+
+        assert all(r.status == "ok" for r in results)
+        assert pacs.max_moves_in_flight == 1
+
+
+class TestScheduledLoad:
+    STUDIES = {"AC001": (4, 10), "AC002": (1, 2), "AC003": (2, 3), "AC004": (1, 1)}
+
+    def _case_by_accession(self, results):
+        return {r.accession: r.case_id for r in results}
+
+    def test_smallest_first(self, tmp_path: Path):
+        pacs = FakePacs(self.STUDIES)
+        results, _ = _run(
+            pacs, _make_config(tmp_path), list(self.STUDIES), order="smallest",
+        )
+
+        # Reported in input order, retrieved (and numbered) by size
+        assert [r.accession for r in results] == list(self.STUDIES)
+        assert self._case_by_accession(results) == {
+            "AC004": "case0001",
+            "AC002": "case0002",
+            "AC003": "case0003",
+            "AC001": "case0004",
+        }
+
+    def test_largest_first_parallel(self, tmp_path: Path):
+        pacs = FakePacs(self.STUDIES)
+        results, verification = _run(
+            pacs, _make_config(tmp_path), list(self.STUDIES),
+            order="largest", concurrency=2,
+        )
+
+        assert verification["loaded"] == 4
+        assert [r.accession for r in results] == list(self.STUDIES)
+        assert pacs.max_moves_in_flight <= 2
+
+    def test_repeated_accession_retrieved_once(self, tmp_path: Path):
+        pacs = FakePacs({"AC001": (1, 3)})
+        results, _ = _run(
+            pacs, _make_config(tmp_path), ["AC001", "AC001"], order="smallest",
+        )
+
+        assert [r.status for r in results] == ["ok", "skipped"]
+        assert pacs.moves == ["STUDY"]
+
+    def test_invalid_order(self, tmp_path: Path):
+        with pytest.raises(ValueError):
+            _run(FakePacs({}), _make_config(tmp_path), ["AC001"], order="random")
+
+
+class TestDiskPreflight:
+    @pytest.mark.parametrize("concurrency", [1, 3])
+    def test_refuses_before_moving(self, tmp_path: Path, concurrency: int):
+        config = _make_config(tmp_path)
+        config.load.disk_check = "refuse"
+        pacs = FakePacs({"AC001": (1, 3), "AC002": (1, 3)})
+        with patch("pacs_agent.loader.free_space", return_value=1000):
+            results, verification = _run(
+                pacs, config, ["AC001", "AC002", "AC404"],
+                concurrency=concurrency,
+            )
+
+        assert [r.status for r in results] == ["error"] * 3
+        assert "disk space" in results[0].error
+        assert results[2].error == "not found on PACS"
+        assert pacs.moves == []
+        assert pacs.scp_starts == 0
+        assert verification["footprint"]["fits"] is False
+        assert verification["ok"] is False
+
+    def test_warn_mode_loads(self, tmp_path: Path):
+        config = _make_config(tmp_path)
+        config.load.disk_check = "warn"
+        pacs = FakePacs({"AC001": (1, 3)})
+        with patch("pacs_agent.loader.free_space", return_value=1000):
+            results, verification = _run(pacs, config, ["AC001"])
+
+        assert results[0].status == "ok"
+        assert any("disk space" in w for w in verification["warnings"])
+
+    def test_default_keeps_prefetch_overlap(self, tmp_path: Path):
+        studies = {f"AC{i:03d}": (1, 10) for i in range(1, 7)}
+        pacs = FakePacs(studies)
+
+        results, verification = _run(
+            pacs, _make_config(tmp_path), list(studies), prefetch=2,
+        )
+
+        assert [r.status for r in results] == ["ok"] * 6
+        assert pacs.finds_during_move > 0
+        assert "footprint" not in verification
+
+    def test_dry_run_reports_footprint(self, tmp_path: Path):
+        config = _make_config(tmp_path)
+        config.load.disk_check = "off"
+        pacs = FakePacs({"AC001": (2, 10)})
+
+        _, verification = _run(pacs, config, ["AC001"], dry_run=True)
+
+        footprint = verification["footprint"]
+        assert footprint["images"] == 20
+        assert footprint["estimated_bytes"] == 20 * 530_000
+
+    def test_learns_instance_size(self, tmp_path: Path):
+        from pacs_agent.audit import average_instance_bytes
+
+        pacs = FakePacs({"AC001": (1, 4)})
+        results, _ = _run(pacs, _make_config(tmp_path), ["AC001"])
+
+        assert results[0].bytes_written > 0
+        average = average_instance_bytes(tmp_path)["CT"]
+        assert average == results[0].bytes_written / 4
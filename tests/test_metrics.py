@@ -0,0 +1,125 @@
+"""Test the loader metrics and their textfile."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+
+from pacs_agent.audit import log_results
+from pacs_agent.loader import StageTimings
+from pacs_agent.metrics import (
+    Histogram,
+    LoadMetrics,
+    LoadTotals,
+    write_textfile,
+)
+
+
+@dataclass
+class FakeResult:
+    accession: str
+    case_id: str
+    status: str
+    modality: str = "CT"
+    image_count: int = 100
+    series_count: int = 1
+    duration_s: float | None = None
+    error: str | None = None
+    bytes_written: int = 0
+    timings: StageTimings | None = None
+
+
+def _samples(text: str) -> dict[str, float]:
+    return {
+        line.rsplit(" ", 1)[0]: float(line.rsplit(" ", 1)[1])
+        for line in text.splitlines()
+        if line and not line.startswith("#")
+    }
+
+
+class TestHistogram:
+    def test_cumulative_buckets(self):
+        h = Histogram((1.0, 5.0))
+        for value in (0.5, 2.0, 3.0, 10.0):
+            h.observe(value)
+
+        assert h.lines("x") == [
+            'x_bucket{le="1"} 1',
+            'x_bucket{le="5"} 3',
+            'x_bucket{le="+Inf"} 4',
+            "x_sum 15.5",
+            "x_count 4",
+        ]
+
+
+class TestLoadTotals:
+    def test_counts_by_status(self):
+        totals = LoadTotals()
+        totals.add("ok", 100, 50_000_000, find_s=0.2, move_s=30.0, anonymize_s=1.0)
+        totals.add("error", 0)
+        totals.add("dry-run", 100)
+
+        samples = _samples(totals.render(in_flight=2))
+        assert samples['rad_loader_studies_total{status="ok"}'] == 1
+        assert samples['rad_loader_studies_total{status="error"}'] == 1
+        assert 'rad_loader_studies_total{status="dry-run"}' not in samples
+        assert samples["rad_loader_instances_received_total"] == 100
+        assert samples["rad_loader_bytes_received_total"] == 50_000_000
+        assert samples["rad_loader_find_seconds_count"] == 1
+        assert samples['rad_loader_move_seconds_bucket{le="30"}'] == 1
+        assert samples["rad_loader_anonymize_seconds_per_instance_sum"] == 0.01
+        assert samples["rad_loader_moves_in_flight"] == 2
+
+    def test_from_audit(self, tmp_path: Path):
+        log_results(tmp_path, "proj", [
+            FakeResult(
+                "AC001", "case0001", "ok",
+                timings=StageTimings(find_s=0.1, move_s=12.0, bytes_received=1000),
+            ),
+            FakeResult("AC002", "", "error", image_count=0),
+        ])
+        log_results(tmp_path, "proj", [FakeResult("AC003", "", "dry-run")])
+
+        totals = LoadTotals.from_audit(tmp_path)
+        assert totals.studies == {"ok": 1, "error": 1}
+        assert totals.bytes_received == 1000
+        assert totals.move.count == 1
+        assert totals.last_load is not None
+
+
+class TestLoadMetrics:
+    def test_writes_textfile(self, tmp_path: Path):
+        textfile = tmp_path / "textfile" / "rad_loader.prom"
+        metrics = LoadMetrics(tmp_path, textfile)
+        with metrics.moving():
+            assert _samples(textfile.read_text())["rad_loader_moves_in_flight"] == 1
+        metrics.observe(FakeResult("AC001", "case0001", "ok", image_count=7))
+
+        samples = _samples(textfile.read_text())
+        assert samples["rad_loader_moves_in_flight"] == 0
+        assert samples["rad_loader_instances_received_total"] == 7
+
+    def test_reload_replaces_live_counts(self, tmp_path: Path):
+        metrics = LoadMetrics(tmp_path, tmp_path / "rad_loader.prom")
+        result = FakeResult("AC001", "case0001", "ok")
+        metrics.observe(result)
+        log_results(tmp_path, "proj", [result])
+        metrics.reload()
+
+        assert 'rad_loader_studies_total{status="ok"} 1' in metrics.render()
+
+    def test_unwritable_directory_is_not_fatal(self, tmp_path: Path):
+        blocker = tmp_path / "file"
+        blocker.write_text("")
+        metrics = LoadMetrics(tmp_path, blocker / "rad_loader.prom")
+        metrics.observe(FakeResult("AC001", "case0001", "ok"))
+
+
+class TestWriteTextfile:
+    def test_replaces_without_leftovers(self, tmp_path: Path):
+        path = tmp_path / "rad_loader.prom"
+        write_textfile(path, "a 1\n")
+        write_textfile(path, "a 2\n")
+
+        assert path.read_text() == "a 2\n"
+        assert [p.name for p in tmp_path.iterdir()] == ["rad_loader.prom"]
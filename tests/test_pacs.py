@@ -47,6 +47,14 @@ class TestExtractSafeFields:
         assert result["Modality"] == "MR"
         assert "AccessionNumber" not in result
 
+    def test_multi_valued_joined_with_backslash(self):
+        ds = Dataset()
+        ds.ImageType = ["ORIGINAL", "PRIMARY", "AXIAL"]
+
+        result = _extract_safe_fields(ds, ["ImageType"])
+
+        assert result["ImageType"] == "ORIGINAL\\PRIMARY\\AXIAL"
+
 
 class TestEcho:
     @patch("pacs_agent.pacs.AE")
@@ -114,3 +122,302 @@ class TestFindByAccession:
         assert results[0]["AccessionNumber"] == "AC001"
         assert "PatientName" not in results[0]
         mock_assoc.release.assert_called_once()
+
+
+class TestMoveStudy:
+    @patch("pacs_agent.pacs.AE")
+    def test_counts_from_warning_status(self, mock_ae_cls):
+        config = _make_config()
+
+        mock_ae = MagicMock()
+        mock_ae_cls.return_value = mock_ae
+        mock_assoc = MagicMock()
+        mock_assoc.is_established = True
+        mock_ae.associate.return_value = mock_assoc
+
+        pending = Dataset()
+        pending.Status = 0xFF00
+        final = Dataset()
+        final.Status = 0xB000
+        final.NumberOfCompletedSuboperations = 8
+        final.NumberOfFailedSuboperations = 2
+        final.NumberOfWarningSuboperations = 1
+        mock_assoc.send_c_move.return_value = [(pending, None), (final, None)]
+
+        from pacs_agent.pacs import move_study
+        result = move_study(config, "1.2.3")
+
+        assert result.pop("associate_s") >= 0
+        assert result == {"completed": 8, "failed": 2, "warning": 1}
+        mock_assoc.release.assert_called_once()
+
+    @patch("pacs_agent.pacs.AE")
+    def test_out_of_resources_is_busy(self, mock_ae_cls):
+        import pytest
+
+        from pacs_agent.pacs import PacsBusy, move_study
+
+        mock_ae = MagicMock()
+        mock_ae_cls.return_value = mock_ae
+        mock_assoc = MagicMock()
+        mock_assoc.is_established = True
+        mock_ae.associate.return_value = mock_assoc
+        final = Dataset()
+        final.Status = 0xA702
+        mock_assoc.send_c_move.return_value = [(final, None)]
+
+        with pytest.raises(PacsBusy):
+            move_study(_make_config(), "1.2.3")
+
+    @patch("pacs_agent.pacs.AE")
+    def test_lost_association_is_not_success(self, mock_ae_cls):
+        import pytest
+
+        from pacs_agent.pacs import move_study
+
+        mock_ae = MagicMock()
+        mock_ae_cls.return_value = mock_ae
+        mock_assoc = MagicMock()
+        mock_assoc.is_established = True
+        mock_ae.associate.return_value = mock_assoc
+        pending = Dataset()
+        pending.Status = 0xFF00
+        mock_assoc.send_c_move.return_value = [(pending, None), (Dataset(), None)]
+
+        with pytest.raises(ConnectionError):
+            move_study(_make_config(), "1.2.3")
+
+    @patch("pacs_agent.pacs.AE")
+    def test_instance_level_identifier(self, mock_ae_cls):
+        mock_ae = MagicMock()
+        mock_ae_cls.return_value = mock_ae
+        mock_assoc = MagicMock()
+        mock_assoc.is_established = True
+        mock_ae.associate.return_value = mock_assoc
+        mock_assoc.send_c_move.return_value = []
+
+        from pacs_agent.pacs import move_instances
+        move_instances(_make_config(), "1.2", "1.2.1", ["1.2.1.5", "1.2.1.6"])
+
+        ds = mock_assoc.send_c_move.call_args[0][0]
+        assert ds.QueryRetrieveLevel == "IMAGE"
+        assert ds.SeriesInstanceUID == "1.2.1"
+        assert list(ds.SOPInstanceUID) == ["1.2.1.5", "1.2.1.6"]
+
+
+class TestFindSeries:
+    @patch("pacs_agent.pacs.AE")
+    def test_series_safe_fields(self, mock_ae_cls):
+        def responses(ds):
+            assert ds.QueryRetrieveLevel == "SERIES"
+            pending = Dataset()
+            pending.Status = 0xFF00
+            identifier = Dataset()
+            identifier.SeriesInstanceUID = "1.2.1"
+            identifier.NumberOfSeriesRelatedInstances = "40"
+            identifier.PatientName = "REAL_NAME"
+            final = Dataset()
+            final.Status = 0x0000
+            return [(pending, identifier), (final, None)]
+
+        _mock_pacs(mock_ae_cls, responses)
+        from pacs_agent.pacs import find_series
+        series = find_series(_make_config(), "1.2")
+
+        assert series == [
+            {"SeriesInstanceUID": "1.2.1", "NumberOfSeriesRelatedInstances": "40"}
+        ]
+
+
+def _mock_pacs(mock_ae_cls, responses_for):
+    """Wire a mocked AE whose associations answer C-FIND via responses_for."""
+    mock_ae = MagicMock()
+    mock_ae_cls.return_value = mock_ae
+    assocs = []
+
+    def _associate(*args, **kwargs):
+        assoc = MagicMock()
+        assoc.is_established = True
+        assoc.send_c_find.side_effect = lambda ds, model: responses_for(ds)
+        assocs.append(assoc)
+        return assoc
+
+    mock_ae.associate.side_effect = _associate
+    return assocs
+
+
+def _study_response(accession: str):
+    pending = Dataset()
+    pending.Status = 0xFF00
+    identifier = Dataset()
+    identifier.AccessionNumber = accession
+    identifier.StudyInstanceUID = f"1.2.826.0.1.{int(accession[2:])}"
+    identifier.PatientName = "REAL_NAME"
+    final = Dataset()
+    final.Status = 0x0000
+    return [(pending, identifier), (final, None)]
+
+
+class TestFindSession:
+    @patch("pacs_agent.pacs.AE")
+    def test_reuses_association(self, mock_ae_cls):
+        from pacs_agent.pacs import FindSession
+
+        assocs = _mock_pacs(mock_ae_cls, lambda ds: _study_response(ds.AccessionNumber))
+        with FindSession(_make_config()) as session:
+            for ac in ("AC001", "AC002", "AC003"):
+                results = session.find(ac)
+                assert results[0]["AccessionNumber"] == ac
+                assert "PatientName" not in results[0]
+
+        assert len(assocs) == 1
+        assert assocs[0].send_c_find.call_count == 3
+        assocs[0].release.assert_called_once()
+
+    @patch("pacs_agent.pacs.AE")
+    def test_reconnects_after_abort(self, mock_ae_cls):
+        from pacs_agent.pacs import FindSession
+
+        calls = []
+
+        def responses(ds):
+            calls.append(ds.AccessionNumber)
+            if len(calls) == 2:
+                return [(Dataset(), None)]  # association aborted
+            return _study_response(ds.AccessionNumber)
+
+        assocs = _mock_pacs(mock_ae_cls, responses)
+        with FindSession(_make_config()) as session:
+            session.find("AC001")
+            results = session.find("AC002")
+
+        assert results[0]["AccessionNumber"] == "AC002"
+        assert len(assocs) == 2
+
+    @patch("pacs_agent.pacs.AE")
+    def test_gives_up_after_retry(self, mock_ae_cls):
+        import pytest
+
+        from pacs_agent.pacs import FindSession
+
+        _mock_pacs(mock_ae_cls, lambda ds: [(Dataset(), None)])
+        with FindSession(_make_config()) as session:
+            with pytest.raises(ConnectionError):
+                session.find("AC001")
+
+
+class TestFindByDateRange:
+    @patch("pacs_agent.pacs.AE")
+    def test_monthly_windows_on_one_association(self, mock_ae_cls):
+        from datetime import date
+
+        from pacs_agent.pacs import find_by_date_range
+
+        queries = []
+
+        def responses(ds):
+            queries.append((ds.StudyDate, ds.ModalitiesInStudy))
+            month = int(ds.StudyDate[4:6])
+            return _study_response(f"AC{month:03d}")
+
+        assocs = _mock_pacs(mock_ae_cls, responses)
+        found = find_by_date_range(
+            _make_config(), date(2024, 1, 15), date(2024, 3, 10), "CT",
+        )
+
+        assert queries == [
+            ("20240115-20240131", "CT"),
+            ("20240201-20240229", "CT"),
+            ("20240301-20240310", "CT"),
+        ]
+        assert list(found) == ["AC001", "AC002", "AC003"]
+        assert found["AC002"][0]["StudyInstanceUID"] == "1.2.826.0.1.2"
+        assert "PatientName" not in found["AC002"][0]
+        assert len(assocs) == 1
+
+
+class TestFindMany:
+    @patch("pacs_agent.pacs.AE")
+    def test_order_and_dedupe(self, mock_ae_cls):
+        from pacs_agent.pacs import find_many
+
+        assocs = _mock_pacs(mock_ae_cls, lambda ds: _study_response(ds.AccessionNumber))
+        accessions = [f"AC{i:03d}" for i in range(10)] + ["AC003"]
+
+        found = find_many(_make_config(), accessions, associations=3)
+
+        assert list(found) == accessions[:10]
+        assert found["AC007"][0]["StudyInstanceUID"] == "1.2.826.0.1.7"
+        assert len(assocs) == 3
+        assert sum(a.send_c_find.call_count for a in assocs) == 10
+
+
+class TestCGet:
+    def test_retrieves_on_same_association(self, tmp_path):
+        from pynetdicom import AE as RealAE
+        from pynetdicom import evt as pn_evt
+        from pynetdicom.sop_class import (
+            CTImageStorage,
+            StudyRootQueryRetrieveInformationModelGet,
+        )
+
+        from pacs_agent.pacs import move_series
+        from pacs_agent.scp import TemporarySCP
+
+        from .synthetic import make_instance
+
+        study_uid = "1.2.826.0.1.5"
+        datasets = [make_instance(study_uid, f"{study_uid}.1") for _ in range(3)]
+        requests = []
+
+        def handle_get(event):
+            requests.append(event.identifier.QueryRetrieveLevel)
+            yield len(datasets)
+            for ds in datasets:
+                yield 0xFF00, ds
+
+        pacs_ae = RealAE(ae_title="TEST_PACS")
+        pacs_ae.add_supported_context(StudyRootQueryRetrieveInformationModelGet)
+        pacs_ae.add_supported_context(CTImageStorage, scu_role=True, scp_role=True)
+        server = pacs_ae.start_server(
+            ("127.0.0.1", 0), block=False,
+            evt_handlers=[(pn_evt.EVT_C_GET, handle_get)],
+        )
+        try:
+            config = _make_config()
+            config.pacs.host = "127.0.0.1"
+            config.pacs.port = server.server_address[1]
+            config.pacs.retrieval = "c-get"
+            config.scp.port = 1  # must not be bound in C-GET mode
+            config.output = OutputConfig(base_dir=tmp_path)
+
+            scp = TemporarySCP(config)
+            scp.start()
+            try:
+                receipt = scp.expect(study_uid, tmp_path, "case0001")
+                result = move_series(
+                    config, study_uid, f"{study_uid}.1", scp.store_handler,
+                )
+                assert receipt.wait_for(3, timeout=5)
+            finally:
+                scp.stop()
+        finally:
+            server.shutdown()
+
+        assert requests == ["SERIES"]
+        assert result.pop("associate_s") >= 0
+        assert result == {"completed": 3, "failed": 0, "warning": 0}
+        assert receipt.image_count == 3
+        files = receipt.received_files[f"{study_uid}.1"]
+        import pydicom
+        assert pydicom.dcmread(files[0]).PatientID == "case0001"
+
+    def test_c_get_needs_handler(self):
+        import pytest
+
+        from pacs_agent.pacs import move_study
+
+        config = _make_config()
+        config.pacs.retrieval = "c-get"
+        with pytest.raises(ValueError):
+            move_study(config, "1.2.3")
@@ -0,0 +1,66 @@
+"""Tests for the disk-space preflight estimate."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+from pacs_agent.preflight import (
+    DEFAULT_INSTANCE_BYTES,
+    FALLBACK_INSTANCE_BYTES,
+    directory_bytes,
+    estimate,
+    free_space,
+    instance_bytes,
+)
+
+
+class TestInstanceBytes:
+    def test_learned_average_wins(self):
+        assert instance_bytes("CT", {"CT": 600_000.0}) == 600_000.0
+
+    def test_default_for_unseen_modality(self):
+        assert instance_bytes("MG", {}) == DEFAULT_INSTANCE_BYTES["MG"]
+
+    def test_multi_modality_takes_largest(self):
+        assert instance_bytes("PT\\CT", {"PT": 100_000.0}) == DEFAULT_INSTANCE_BYTES["CT"]
+
+    def test_unknown_modality(self):
+        assert instance_bytes("", {}) == FALLBACK_INSTANCE_BYTES
+        assert instance_bytes("OT", {}) == FALLBACK_INSTANCE_BYTES
+
+
+class TestEstimate:
+    def test_counts_and_bytes(self):
+        studies = [
+            {"Modality": "CT", "NumberOfStudyRelatedInstances": "100"},
+            {"ModalitiesInStudy": "MR", "NumberOfStudyRelatedInstances": "20"},
+            {"Modality": "CT"},  # no instance count
+        ]
+        fp = estimate(studies, {"CT": 500_000.0, "MR": 250_000.0}, free_bytes=10**9)
+
+        assert fp.studies == 3
+        assert fp.images == 120
+        assert fp.estimated_bytes == 55_000_000
+        assert fp.unknown_studies == 1
+        assert fp.fits
+
+    def test_does_not_fit(self):
+        studies = [{"Modality": "CT", "NumberOfStudyRelatedInstances": "1000"}]
+        fp = estimate(studies, {"CT": 500_000.0}, free_bytes=100_000_000)
+        assert not fp.fits
+        assert fp.to_dict()["fits"] is False
+
+
+class TestDisk:
+    def test_free_space_of_missing_dir(self, tmp_path: Path):
+        assert free_space(tmp_path / "not" / "yet") > 0
+
+    def test_reserve_subtracted(self, tmp_path: Path):
+        assert free_space(tmp_path, reserve_gb=1e9) == 0
+
+    def test_directory_bytes(self, tmp_path: Path):
+        (tmp_path / "series01").mkdir()
+        (tmp_path / "series01" / "00001.dcm").write_bytes(b"x" * 10)
+        (tmp_path / "series01" / "00002.dcm").write_bytes(b"x" * 5)
+        (tmp_path / "notes.txt").write_bytes(b"ignored")
+        assert directory_bytes(tmp_path) == 15
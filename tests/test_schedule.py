@@ -0,0 +1,39 @@
+"""Tests for size-aware retrieval order."""
+
+from __future__ import annotations
+
+import pytest
+
+from pacs_agent.schedule import schedule, study_size
+
+SIZES = [300, 12, 8000, None, 45, 12]
+
+
+class TestSchedule:
+    def test_file_order(self):
+        assert schedule(SIZES, "file") == [0, 1, 2, 3, 4, 5]
+
+    def test_smallest_first_is_stable(self):
+        assert schedule(SIZES, "smallest") == [1, 5, 4, 0, 2, 3]
+
+    def test_largest_first(self):
+        assert schedule(SIZES, "largest") == [2, 0, 4, 1, 5, 3]
+
+    def test_balanced_starts_largest_per_worker(self):
+        assert schedule(SIZES, "balanced", workers=2) == [2, 0, 1, 5, 4, 3]
+
+    def test_balanced_single_worker(self):
+        assert schedule(SIZES, "balanced") == [2, 1, 5, 4, 0, 3]
+
+    def test_unknown_order(self):
+        with pytest.raises(ValueError):
+            schedule(SIZES, "random")
+
+
+class TestStudySize:
+    def test_reported(self):
+        assert study_size({"NumberOfStudyRelatedInstances": "120"}) == 120
+
+    def test_missing_or_bad(self):
+        assert study_size({}) is None
+        assert study_size({"NumberOfStudyRelatedInstances": "n/a"}) is None
@@ -0,0 +1,450 @@
+"""Test C-STORE routing and saving in TemporarySCP."""
+
+from __future__ import annotations
+
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pydicom
+import pytest
+from pydicom.uid import ExplicitVRLittleEndian
+
+from pacs_agent.config import Config, OutputConfig, PacsConfig, ScpConfig
+from pacs_agent.scp import TemporarySCP, _ByteBudget
+
+from .synthetic import FakeStoreEvent, make_instance
+
+
+def _make_config(tmp_path: Path) -> Config:
+    return Config(
+        pacs=PacsConfig(host="127.0.0.1", port=104, ae_title="TEST_PACS"),
+        scp=ScpConfig(ae_title="TEST_SCP", port=9012),
+        output=OutputConfig(base_dir=tmp_path),
+    )
+
+
+class TestSingleStudy:
+    def test_stores_anonymized_files(self, tmp_path: Path):
+        scp = TemporarySCP(_make_config(tmp_path), tmp_path, "case0001")
+        for _ in range(3):
+            status = scp._handle_store(FakeStoreEvent(make_instance("1.2", "1.2.1")))
+            assert status == 0x0000
+
+        files = scp.received_files["1.2.1"]
+        assert [f.name for f in files] == ["00001.dcm", "00002.dcm", "00003.dcm"]
+        ds = pydicom.dcmread(files[0])
+        assert str(ds.PatientName) == "case0001"
+        assert "PatientBirthDate" not in ds
+
+    def test_times_receipt(self, tmp_path: Path):
+        scp = TemporarySCP(_make_config(tmp_path), tmp_path, "case0001")
+        events = [FakeStoreEvent(make_instance("1.2", "1.2.1")) for _ in range(2)]
+        for event in events:
+            scp._handle_store(event)
+
+        receipt = scp._default
+        assert receipt.first_received is not None
+        assert receipt.bytes_received == sum(
+            len(e.request.DataSet.getvalue()) for e in events
+        )
+        assert receipt.anonymize_s > 0
+        assert receipt.write_s >= 0
+
+    def test_series_numbered_by_arrival(self, tmp_path: Path):
+        scp = TemporarySCP(_make_config(tmp_path), tmp_path, "case0001")
+        scp._handle_store(FakeStoreEvent(make_instance("1.2", "1.2.9")))
+        scp._handle_store(FakeStoreEvent(make_instance("1.2", "1.2.1")))
+
+        assert scp.received_files["1.2.9"][0].parent.name == "series01"
+        assert scp.received_files["1.2.1"][0].parent.name == "series02"
+
+
+class TestRouting:
+    def test_routes_by_study_uid(self, tmp_path: Path):
+        scp = TemporarySCP(_make_config(tmp_path))
+        a = scp.expect("1.1", tmp_path, "case0001")
+        b = scp.expect("2.2", tmp_path, "case0002")
+
+        scp._handle_store(FakeStoreEvent(make_instance("2.2", "2.2.1")))
+        scp._handle_store(FakeStoreEvent(make_instance("1.1", "1.1.1")))
+        scp._handle_store(FakeStoreEvent(make_instance("2.2", "2.2.1")))
+
+        assert a.image_count == 1
+        assert b.image_count == 2
+        assert a.received_files["1.1.1"][0].parent.parent.name == "case0001"
+        assert b.received_files["2.2.1"][0].parent.parent.name == "case0002"
+        ds = pydicom.dcmread(b.received_files["2.2.1"][1])
+        assert ds.PatientID == "case0002"
+
+    def test_rejects_unexpected_study(self, tmp_path: Path):
+        scp = TemporarySCP(_make_config(tmp_path))
+        scp.expect("1.1", tmp_path, "case0001")
+
+        status = scp._handle_store(FakeStoreEvent(make_instance("9.9", "9.9.1")))
+
+        assert status != 0x0000
+        assert not (tmp_path / "case0001").exists()
+
+    def test_released_study_rejected(self, tmp_path: Path):
+        scp = TemporarySCP(_make_config(tmp_path))
+        scp.expect("1.1", tmp_path, "case0001")
+        receipt = scp.release("1.1")
+
+        status = scp._handle_store(FakeStoreEvent(make_instance("1.1", "1.1.1")))
+
+        assert status != 0x0000
+        assert receipt.image_count == 0
+
+    def test_duplicate_expect_raises(self, tmp_path: Path):
+        scp = TemporarySCP(_make_config(tmp_path))
+        scp.expect("1.1", tmp_path, "case0001")
+        with pytest.raises(ValueError):
+            scp.expect("1.1", tmp_path, "case0002")
+
+
+class TestWaitFor:
+    def test_returns_when_count_reached(self, tmp_path: Path):
+        scp = TemporarySCP(_make_config(tmp_path))
+        receipt = scp.expect("1.1", tmp_path, "case0001")
+        scp._handle_store(FakeStoreEvent(make_instance("1.1", "1.1.1")))
+
+        assert receipt.wait_for(1, timeout=0.01) is True
+        assert receipt.wait_for(0, timeout=0.01) is True
+
+    def test_times_out(self, tmp_path: Path):
+        scp = TemporarySCP(_make_config(tmp_path))
+        receipt = scp.expect("1.1", tmp_path, "case0001")
+
+        assert receipt.wait_for(1, timeout=0.01) is False
+
+
+class TestWriterPool:
+    def _scp(self, tmp_path: Path, threads: int = 2) -> TemporarySCP:
+        config = _make_config(tmp_path)
+        config.scp.port = 0  # ephemeral
+        config.scp.writer_threads = threads
+        scp = TemporarySCP(config)
+        scp.start()
+        return scp
+
+    def test_writes_all_instances(self, tmp_path: Path):
+        scp = self._scp(tmp_path)
+        try:
+            receipt = scp.expect("1.1", tmp_path, "case0001")
+            for _ in range(20):
+                status = scp._handle_store(
+                    FakeStoreEvent(make_instance("1.1", "1.1.1"))
+                )
+                assert status == 0x0000
+            assert receipt.wait_for(20, timeout=5) is True
+        finally:
+            scp.stop()
+
+        files = receipt.received_files["1.1.1"]
+        assert len(files) == 20
+        assert sorted(f.name for f in files)[-1] == "00020.dcm"
+        assert pydicom.dcmread(files[0]).PatientID == "case0001"
+
+    def test_writer_times_added_to_receipt(self, tmp_path: Path):
+        scp = self._scp(tmp_path)
+        try:
+            receipt = scp.expect("1.1", tmp_path, "case0001")
+            for _ in range(4):
+                scp._handle_store(FakeStoreEvent(make_instance("1.1", "1.1.1")))
+            assert receipt.wait_for(4, timeout=5) is True
+        finally:
+            scp.stop()
+
+        assert receipt.bytes_received > 0
+        assert receipt.anonymize_s > 0
+
+    def test_failed_write_counted(self, tmp_path: Path):
+        from pacs_agent import scp as scp_module
+
+        real_save = scp_module._save_instance
+        calls = []
+
+        def flaky_save(ds, file_path, case_id):
+            calls.append(file_path)
+            if len(calls) == 2:
+                raise OSError("disk full")
+            real_save(ds, file_path, case_id)
+
+        scp = self._scp(tmp_path, threads=1)
+        try:
+            receipt = scp.expect("1.1", tmp_path, "case0001")
+            with patch.object(scp_module, "_save_instance", flaky_save):
+                for _ in range(3):
+                    scp._handle_store(FakeStoreEvent(make_instance("1.1", "1.1.1")))
+                assert receipt.wait_for(3, timeout=5) is True
+        finally:
+            scp.stop()
+
+        assert receipt.failed == 1
+        assert receipt.image_count == 2
+
+    def test_wait_covers_queued_writes(self, tmp_path: Path):
+        from pacs_agent import scp as scp_module
+
+        real_save = scp_module._save_instance
+
+        def slow_save(ds, file_path, case_id):
+            time.sleep(0.05)
+            real_save(ds, file_path, case_id)
+
+        scp = self._scp(tmp_path, threads=1)
+        try:
+            receipt = scp.expect("1.1", tmp_path, "case0001")
+            with patch.object(scp_module, "_save_instance", slow_save):
+                for _ in range(3):
+                    scp._handle_store(FakeStoreEvent(make_instance("1.1", "1.1.1")))
+                # Count unknown (0): still waits for queued writes
+                assert receipt.wait_for(0, timeout=5) is True
+                assert receipt.image_count == 3
+        finally:
+            scp.stop()
+
+
+class TestProcessPool:
+    def test_writes_from_encoded_bytes(self, tmp_path: Path):
+        config = _make_config(tmp_path)
+        config.scp.port = 0  # ephemeral
+        config.scp.anonymize_processes = 2
+        scp = TemporarySCP(config)
+        scp.start()
+        try:
+            a = scp.expect("1.1", tmp_path, "case0001")
+            b = scp.expect("2.2", tmp_path, "case0002")
+            for study in ("1.1", "2.2", "1.1"):
+                status = scp._handle_store(
+                    FakeStoreEvent(make_instance(study, f"{study}.1"))
+                )
+                assert status == 0x0000
+            status = scp._handle_store(FakeStoreEvent(make_instance("9.9", "9.9.1")))
+            assert status != 0x0000
+            assert a.wait_for(2, timeout=30) is True
+            assert b.wait_for(1, timeout=30) is True
+        finally:
+            scp.stop()
+
+        assert a.image_count == 2
+        ds = pydicom.dcmread(b.received_files["2.2.1"][0])
+        assert ds.PatientID == "case0002"
+        assert "PatientBirthDate" not in ds
+        assert not any(e.tag.is_private for e in ds)
+
+
+class TestByteBudget:
+    def test_blocks_when_over_limit(self):
+        budget = _ByteBudget(100)
+        budget.acquire(80)
+        acquired = threading.Event()
+
+        def _second():
+            budget.acquire(50)
+            acquired.set()
+
+        t = threading.Thread(target=_second)
+        t.start()
+        assert not acquired.wait(0.05)
+        budget.release(80)
+        assert acquired.wait(1)
+        t.join()
+        assert budget.in_use == 50
+
+    def test_oversized_object_passes_alone(self):
+        budget = _ByteBudget(100)
+        budget.acquire(500)
+        assert budget.in_use == 500
+
+
+def _send_over_network(port: int, datasets: list) -> list[int]:
+    """C-STORE datasets to localhost:port, return the response statuses."""
+    from pynetdicom import AE
+    from pynetdicom.sop_class import CTImageStorage
+
+    ae = AE(ae_title="TEST_PACS")
+    ae.add_requested_context(CTImageStorage, ExplicitVRLittleEndian)
+    assoc = ae.associate("127.0.0.1", port, ae_title="TEST_SCP")
+    assert assoc.is_established
+    try:
+        return [assoc.send_c_store(ds).Status for ds in datasets]
+    finally:
+        assoc.release()
+
+
+class TestStreamToDisk:
+    @pytest.mark.parametrize("threads,processes", [(0, 0), (2, 0), (0, 1)])
+    def test_matches_in_memory_path(
+        self, tmp_path: Path, threads: int, processes: int,
+    ):
+        datasets = [make_instance("1.1", f"1.1.{i % 2 + 1}") for i in range(4)]
+
+        results = {}
+        for stream in (False, True):
+            config = _make_config(tmp_path / str(stream))
+            config.scp.port = 0  # ephemeral
+            config.scp.stream_to_disk = stream
+            config.scp.writer_threads = threads
+            config.scp.anonymize_processes = processes
+            scp = TemporarySCP(config)
+            scp.start()
+            try:
+                receipt = scp.expect("1.1", tmp_path / str(stream), "case0001")
+                statuses = _send_over_network(scp.port, datasets)
+                assert statuses == [0x0000] * 4
+                assert receipt.wait_for(4, timeout=30) is True
+            finally:
+                scp.stop()
+            results[stream] = {
+                f.relative_to(tmp_path / str(stream)): f.read_bytes()
+                for files in receipt.received_files.values()
+                for f in files
+            }
+
+        assert len(results[True]) == 4
+        assert results[True] == results[False]
+        assert not any((tmp_path / "True" / ".spool").iterdir())
+
+    def test_restores_pynetdicom_setting(self, tmp_path: Path):
+        from pynetdicom import _config
+
+        config = _make_config(tmp_path)
+        config.scp.port = 0
+        config.scp.stream_to_disk = True
+        scp = TemporarySCP(config)
+        scp.start()
+        assert _config.STORE_RECV_CHUNKED_DATASET is True
+        scp.stop()
+        assert _config.STORE_RECV_CHUNKED_DATASET is False
+
+
+    def test_spool_purged_per_instance(self, tmp_path: Path):
+        import os
+        import subprocess
+        import sys
+
+        config = _make_config(tmp_path)
+        config.scp.port = 0
+        config.scp.stream_to_disk = True
+        spool = tmp_path / ".spool"
+        exited = subprocess.Popen([sys.executable, "-c", "pass"])
+        exited.wait()
+        crashed = spool / f"{exited.pid}-dead"
+        live = spool / f"{os.getpid()}-other"
+        for d in (crashed, live):
+            d.mkdir(parents=True)
+            (d / "unwritten.dcm").write_bytes(b"PHI")
+
+        scp = TemporarySCP(config)
+        scp.start()
+        try:
+            assert not crashed.exists()
+            assert (live / "unwritten.dcm").exists()  # another SCP's queue
+            own = [d for d in spool.iterdir() if d != live]
+            assert len(own) == 1
+            (own[0] / "unwritten.dcm").write_bytes(b"PHI")
+        finally:
+            scp.stop()
+        assert not own[0].exists()
+        assert (live / "unwritten.dcm").exists()
+
+
+class TestInlineWriteFailure:
+    def test_resend_after_failed_write(self, tmp_path: Path):
+        from pacs_agent import scp as scp_module
+
+        scp = TemporarySCP(_make_config(tmp_path))
+        receipt = scp.expect("1.1", tmp_path, "case0001")
+        ds = make_instance("1.1", "1.1.1", "1.1.1.1")
+
+        with patch.object(
+            scp_module, "_save_instance", side_effect=OSError("disk full"),
+        ):
+            with pytest.raises(OSError):
+                scp._handle_store(FakeStoreEvent(ds))
+        status = scp._handle_store(FakeStoreEvent(ds))
+
+        assert status == 0x0000
+        assert receipt.duplicates == 0
+        files = receipt.received_files["1.1.1"]
+        assert len(files) == 1
+        assert files[0].exists()
+
+    def test_resend_after_failed_spooled_write(self, tmp_path: Path):
+        from pacs_agent import scp as scp_module
+
+        config = _make_config(tmp_path)
+        config.scp.port = 0  # ephemeral
+        config.scp.stream_to_disk = True
+        ds = make_instance("1.1", "1.1.1", "1.1.1.1")
+        real_anonymize = scp_module.anonymize_stream
+        calls = []
+
+        def flaky_anonymize(src, dst, case_id):
+            calls.append(dst)
+            if len(calls) == 1:
+                raise OSError("disk full")
+            real_anonymize(src, dst, case_id)
+
+        scp = TemporarySCP(config)
+        scp.start()
+        try:
+            receipt = scp.expect("1.1", tmp_path, "case0001")
+            with patch.object(scp_module, "anonymize_stream", flaky_anonymize):
+                statuses = _send_over_network(scp.port, [ds, ds])
+        finally:
+            scp.stop()
+
+        assert statuses[0] != 0x0000
+        assert statuses[1] == 0x0000
+        assert receipt.duplicates == 0
+        files = receipt.received_files["1.1.1"]
+        assert len(files) == 1
+        assert files[0].exists()
+
+
+class TestResumeReceipt:
+    def test_restore_continues_numbering(self, tmp_path: Path):
+        scp = TemporarySCP(_make_config(tmp_path))
+        receipt = scp.expect("1.1", tmp_path, "case0001")
+        receipt.restore({
+            "1.1.1.1": ("1.1.1", tmp_path / "case0001/series01/00001.dcm"),
+            "1.1.3.1": ("1.1.3", tmp_path / "case0001/series03/00001.dcm"),
+            "1.1.3.2": ("1.1.3", tmp_path / "case0001/series03/00002.dcm"),
+        })
+
+        scp._handle_store(FakeStoreEvent(make_instance("1.1", "1.1.3", "1.1.3.3")))
+        scp._handle_store(FakeStoreEvent(make_instance("1.1", "1.1.4", "1.1.4.1")))
+
+        assert receipt.received_files["1.1.3"][-1].name == "00003.dcm"
+        assert receipt.received_files["1.1.4"][0].parent.name == "series04"
+        assert receipt.image_count == 5
+        assert receipt.series_image_count("1.1.3") == 3
+
+    def test_held_instance_not_rewritten(self, tmp_path: Path):
+        stored = []
+        scp = TemporarySCP(_make_config(tmp_path))
+        receipt = scp.expect(
+            "1.1", tmp_path, "case0001",
+            on_stored=lambda *args: stored.append(args),
+        )
+        receipt.restore({
+            "1.1.1.1": ("1.1.1", tmp_path / "case0001/series01/00001.dcm"),
+        })
+
+        status = scp._handle_store(
+            FakeStoreEvent(make_instance("1.1", "1.1.1", "1.1.1.1"))
+        )
+        scp._handle_store(FakeStoreEvent(make_instance("1.1", "1.1.1", "1.1.1.2")))
+
+        assert status == 0x0000
+        assert receipt.duplicates == 1
+        assert receipt.image_count == 2
+        assert receipt.wait_for(3, timeout=0.01) is True
+        assert not (tmp_path / "case0001/series01/00001.dcm").exists()
+        assert stored == [(
+            "1.1.1", "1.1.1.2", tmp_path / "case0001/series01/00002.dcm",
+        )]
@@ -0,0 +1,161 @@
+"""Test the loader daemon, its job queue and client."""
+
+from __future__ import annotations
+
+import errno
+import tempfile
+import threading
+from contextlib import ExitStack
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from pacs_agent.keyfile import read_key_file
+from pacs_agent.server import JobQueue, LoaderServer, request
+
+from .test_loader import FakePacs, _make_config
+
+
+@pytest.fixture
+def socket_path():
+    # Unix socket paths are limited to ~100 bytes; keep them short
+    with tempfile.TemporaryDirectory(prefix="rl") as d:
+        yield Path(d) / "s.sock"
+
+
+def _enter_patches(stack: ExitStack, pacs: FakePacs) -> None:
+    patches = pacs.patches()
+    fake_session, fake_scp = patches[0].new, patches[-1].new
+    for p in patches:
+        stack.enter_context(p)
+    # The daemon builds its SCP and session from their home modules
+    stack.enter_context(patch("pacs_agent.scp.TemporarySCP", fake_scp))
+    stack.enter_context(patch("pacs_agent.pacs.FindSession", fake_session))
+
+
+@pytest.fixture
+def daemon(tmp_path: Path, socket_path: Path):
+    pacs = FakePacs({f"AC{i:03d}": (1, 3) for i in range(1, 6)})
+    with ExitStack() as stack:
+        _enter_patches(stack, pacs)
+        server = LoaderServer(_make_config(tmp_path), socket_path)
+        server.start()
+        try:
+            yield server, pacs
+        finally:
+            server.stop()
+
+
+class TestJobQueue:
+    def test_fifo_and_persistence(self, tmp_path: Path):
+        jobs = JobQueue(tmp_path / "serve.db")
+        a = jobs.submit({"project": "p", "accessions": ["AC1"]})
+        b = jobs.submit({"project": "p", "accessions": ["AC2"]})
+        assert jobs.next(timeout=0)[0] == a  # left "running"
+        jobs.close()
+
+        jobs = JobQueue(tmp_path / "serve.db")
+        assert jobs.recover() == 1
+        assert [j["state"] for j in jobs.list()] == ["queued", "queued"]
+        assert jobs.next(timeout=0)[0] == a
+        jobs.finish(a, "done", {"status": "ok"})
+        assert jobs.next(timeout=0)[0] == b
+        assert jobs.next(timeout=0) is None
+        assert jobs.get(a)["result"] == {"status": "ok"}
+        jobs.close()
+
+
+class TestLoaderServer:
+    def test_load_returns_cli_summary(self, daemon, tmp_path: Path, socket_path: Path):
+        server, pacs = daemon
+        reply = request(socket_path, {
+            "op": "load", "project": "proj", "accessions": ["AC001", "AC002"],
+        })
+
+        assert reply["status"] == "ok"
+        assert reply["project"] == "proj"
+        assert reply["job"] == 1
+        assert [r["case_id"] for r in reply["results"]] == ["case0001", "case0002"]
+        assert reply["verification"]["loaded"] == 2
+        assert len(read_key_file(tmp_path / "proj" / "key.csv")) == 2
+
+    def test_scp_and_session_stay_warm(self, daemon, socket_path: Path):
+        server, pacs = daemon
+        for ac in ("AC001", "AC002", "AC003"):
+            request(socket_path, {"op": "load", "project": "proj", "accessions": [ac]})
+        assert pacs.scp_starts == 1
+        assert pacs.sessions == 1
+
+    def test_concurrent_clients(self, daemon, socket_path: Path):
+        server, pacs = daemon
+        replies = {}
+
+        def _submit(project: str, ac: str) -> None:
+            replies[project] = request(socket_path, {
+                "op": "load", "project": project, "accessions": [ac],
+            })
+
+        threads = [
+            threading.Thread(target=_submit, args=(f"p{i}", f"AC00{i}"))
+            for i in range(1, 4)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert sorted(replies) == ["p1", "p2", "p3"]
+        assert all(r["results"][0]["status"] == "ok" for r in replies.values())
+        assert len({r["job"] for r in replies.values()}) == 3
+
+    def test_no_wait_and_job_status(self, daemon, socket_path: Path):
+        server, pacs = daemon
+        reply = request(socket_path, {
+            "op": "load", "project": "proj", "accessions": ["AC001"], "wait": False,
+        })
+        assert reply["state"] == "queued"
+
+        job = server.jobs.wait(reply["job"])
+        assert job["state"] == "done"
+        status = request(socket_path, {"op": "job", "job": reply["job"]})
+        assert status["job"]["result"]["results"][0]["accession"] == "AC001"
+        listed = request(socket_path, {"op": "jobs"})
+        assert listed["jobs"][-1]["project"] == "proj"
+
+    def test_rejects_bad_requests(self, daemon, socket_path: Path):
+        assert request(socket_path, {"op": "load", "project": "p"})["status"] == "error"
+        assert request(socket_path, {"op": "nope"})["status"] == "error"
+        assert request(socket_path, {"op": "ping"}) == {"status": "ok", "queued": 0}
+
+    def test_socket_is_private(self, daemon, socket_path: Path):
+        assert socket_path.stat().st_mode & 0o777 == 0o600
+
+    def test_bind_failure_keeps_foreign_socket(self, tmp_path: Path, socket_path: Path):
+        pacs = FakePacs({"AC001": (1, 1)})
+
+        def _raced(path, handler):
+            # Another daemon bound the path between our check and bind
+            Path(path).touch()
+            raise OSError(errno.EADDRINUSE, "Address already in use")
+
+        with ExitStack() as stack:
+            _enter_patches(stack, pacs)
+            stack.enter_context(patch(
+                "pacs_agent.server.socketserver.ThreadingUnixStreamServer",
+                side_effect=_raced,
+            ))
+            server = LoaderServer(_make_config(tmp_path), socket_path)
+            with pytest.raises(OSError):
+                server.start()
+
+        assert socket_path.exists()
+        assert pacs.sessions_closed == 1
+        server.stop()  # harmless after a failed start
+        assert socket_path.exists()
+
+
+class TestClient:
+    def test_no_daemon(self, socket_path: Path):
+        with pytest.raises(ConnectionError):
+            request(socket_path, {"op": "ping"})
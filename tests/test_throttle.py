@@ -0,0 +1,148 @@
+"""Tests for the AIMD move throttle."""
+
+from __future__ import annotations
+
+import threading
+from datetime import datetime, time
+
+from pacs_agent.config import ThrottleConfig, TimeCap
+from pacs_agent.throttle import Throttle
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.t = 0.0
+
+    def __call__(self) -> float:
+        return self.t
+
+
+def _throttle(
+    start: int = 1, now: datetime | None = None, **kwargs,
+) -> tuple[Throttle, FakeClock]:
+    clock = FakeClock()
+    config = ThrottleConfig(enabled=True, **kwargs)
+    stamp = now or datetime(2024, 1, 1, 2, 0)
+    return Throttle(config, start, clock=clock, now=lambda: stamp), clock
+
+
+class TestAimd:
+    def test_start_clamped(self):
+        assert _throttle(start=10, ceiling=4)[0].allowed() == 4
+        assert _throttle(start=0, floor=2, ceiling=4)[0].allowed() == 2
+
+    def test_additive_increase_up_to_ceiling(self):
+        throttle, _ = _throttle(start=1, ceiling=3)
+        for _ in range(20):
+            throttle.moved(10.0, 100)
+        assert throttle.allowed() == 3
+
+    def test_increase_is_about_one_per_round(self):
+        throttle, _ = _throttle(start=2, ceiling=8)
+        throttle.moved(10.0, 100)
+        assert throttle.allowed() == 2
+        throttle.moved(10.0, 100)
+        throttle.moved(10.0, 100)
+        assert throttle.allowed() == 3
+
+    def test_latency_spike_halves(self):
+        throttle, _ = _throttle(start=4, ceiling=4)
+        throttle.moved(10.0, 100)  # baseline 0.1 s/image
+        throttle.moved(50.0, 100)
+        assert throttle.allowed() == 2
+
+    def test_failure_and_busy_decrease(self):
+        throttle, clock = _throttle(start=4, ceiling=4, cooldown=5)
+        throttle.failed(busy=True)
+        assert throttle.allowed() == 2
+        clock.t = 10
+        throttle.moved(10.0, 90, failed=10)
+        assert throttle.allowed() == 1
+
+    def test_cooldown_between_decreases(self):
+        throttle, clock = _throttle(start=4, ceiling=4, cooldown=30)
+        throttle.failed()
+        throttle.failed()
+        assert throttle.allowed() == 2
+        clock.t = 31
+        throttle.failed()
+        assert throttle.allowed() == 1
+
+    def test_never_below_floor(self):
+        throttle, clock = _throttle(start=4, floor=2, ceiling=4, cooldown=0)
+        for i in range(5):
+            clock.t = i
+            throttle.failed()
+        assert throttle.allowed() == 2
+
+    def test_find_latency_spike(self):
+        throttle, _ = _throttle(start=4, ceiling=4)
+        throttle.found(0.05)
+        throttle.found(0.06)
+        assert throttle.allowed() == 4
+        throttle.found(1.0)
+        assert throttle.allowed() == 2
+
+    def test_stats(self):
+        throttle, _ = _throttle(start=2)
+        throttle.moved(2.0, 100)
+        assert throttle.stats()["images_per_s"] == 50.0
+
+
+class TestTimeCaps:
+    CAPS = [
+        TimeCap(time(7, 0), time(17, 0), 1),
+        TimeCap(time(22, 0), time(6, 0), 0),
+    ]
+
+    def test_day_cap(self):
+        throttle, _ = _throttle(
+            start=4, ceiling=4, caps=self.CAPS, now=datetime(2024, 1, 1, 9, 30),
+        )
+        assert throttle.allowed() == 1
+
+    def test_window_past_midnight(self):
+        throttle, _ = _throttle(
+            start=4, ceiling=4, caps=self.CAPS, now=datetime(2024, 1, 1, 23, 0),
+        )
+        assert throttle.allowed() == 0
+
+    def test_outside_caps(self):
+        throttle, _ = _throttle(
+            start=4, ceiling=4, caps=self.CAPS, now=datetime(2024, 1, 1, 18, 0),
+        )
+        assert throttle.allowed() == 4
+
+
+class TestSlot:
+    def test_waits_for_free_slot(self):
+        throttle, _ = _throttle(start=1, ceiling=1)
+        entered = threading.Event()
+
+        def _second():
+            with throttle.slot():
+                entered.set()
+
+        with throttle.slot():
+            t = threading.Thread(target=_second)
+            t.start()
+            assert not entered.wait(0.2)
+        assert entered.wait(2)
+        t.join()
+
+
+class TestFromDict:
+    def test_parses_caps(self):
+        cfg = ThrottleConfig.from_dict({
+            "enabled": True,
+            "ceiling": 6,
+            "caps": [{"from": "07:00", "to": 1020, "max": 1}],
+        })
+        assert cfg.caps[0].start == time(7, 0)
+        assert cfg.caps[0].end == time(17, 0)
+
+    def test_rejects_bad_bounds(self):
+        import pytest
+
+        with pytest.raises(ValueError):
+            ThrottleConfig.from_dict({"floor": 3, "ceiling": 2})